@@ -0,0 +1,59 @@
+"""
+Balance aggregate benchmark.
+
+Builds synthetic repositories, times the O(1) balance summary against the
+previous recompute (sum over the customer's accounts plus a second fetch to
+count them), times incremental balance updates, then runs the consistency
+checker after a burst of random updates.
+
+    python -m benchmarks.bench_balance_aggregates [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import random
+import time
+
+from mcp_server.synthetic import account_id, generate_repository, sample_customer_ids
+
+
+def _per_call_us(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incrementally maintained balance aggregates.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--accounts-per-customer", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--updates", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'accounts':>10} {'summary':>10} {'recompute':>10} {'update':>10} {'check':>10} {'problems':>9}")
+    for size in args.sizes:
+        repo = generate_repository(size, args.accounts_per_customer)
+        customers = [(c,) for c in sample_customer_ids(size, args.lookups, args.accounts_per_customer)]
+
+        def recompute(cid):
+            total = sum(acc["balance"] for acc in repo.get_accounts_by_customer(cid))
+            return total, len(repo.get_accounts_by_customer(cid))
+
+        summary_us = _per_call_us(repo.get_balance_summary, customers)
+        recompute_us = _per_call_us(recompute, customers)
+
+        rng = random.Random(0)
+        updates = [(account_id(rng.randrange(size)), round(rng.uniform(0, 50000), 2)) for _ in range(args.updates)]
+        update_us = _per_call_us(repo.update_balance, updates)
+
+        start = time.perf_counter()
+        problems = repo.check_aggregates()
+        check_s = time.perf_counter() - start
+        print(f"{size:>10} {summary_us:>8.2f}us {recompute_us:>8.2f}us {update_us:>8.2f}us "
+              f"{check_s:>9.2f}s {len(problems):>9}")
+        del repo
+
+
+if __name__ == "__main__":
+    main()
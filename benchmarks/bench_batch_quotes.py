@@ -0,0 +1,73 @@
+"""
+Batch quote benchmark.
+
+Compares fetching N symbols one at a time (the old get_multiple_stock_prices
+loop) with QuoteCache.get_many, and with aget_quotes (what the multi-symbol
+tools call: one get_many on the blocking executor), against a FakeQuoteSource
+with fixed upstream latency. Every run starts with a cold cache so each
+symbol costs one fetch.
+
+    python -m benchmarks.bench_batch_quotes [--latency 0.05] [--workers 16]
+"""
+
+import os
+import time
+import asyncio
+import argparse
+
+from mcp_server.quotes import FakeQuoteSource, QuoteCache, aget_quotes, set_quote_source
+
+
+def _symbols(n: int):
+    return [f"SYM{i}" for i in range(n)]
+
+
+def bench_sequential(n: int, latency: float) -> float:
+    source = FakeQuoteSource(latency=latency)
+    cache = QuoteCache(source)
+    start = time.perf_counter()
+    for symbol in _symbols(n):
+        cache.get(symbol)
+    return time.perf_counter() - start
+
+
+def bench_batch(n: int, latency: float, workers: int) -> float:
+    source = FakeQuoteSource(latency=latency)
+    cache = QuoteCache(source, batch_workers=workers)
+    start = time.perf_counter()
+    results = cache.get_many(_symbols(n), deadline=60)
+    elapsed = time.perf_counter() - start
+    assert [r.symbol for r in results] == _symbols(n)
+    assert all(r.error is None for r in results)
+    return elapsed
+
+
+def bench_async(n: int, latency: float) -> float:
+    set_quote_source(FakeQuoteSource(latency=latency))  # shared cache, emptied
+    start = time.perf_counter()
+    results = asyncio.run(aget_quotes(_symbols(n), deadline=60))
+    elapsed = time.perf_counter() - start
+    assert [r.symbol for r in results] == _symbols(n)
+    assert all(r.error is None for r in results)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch quote fetching.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake upstream latency per symbol (s)")
+    parser.add_argument("--workers", type=int, default=16, help="Batch thread pool size")
+    args = parser.parse_args()
+    # The shared cache (aget_quotes) reads its batch pool size on first use
+    os.environ["QUOTE_BATCH_WORKERS"] = str(args.workers)
+
+    print(f"Upstream latency: {args.latency * 1000:.0f} ms/symbol, batch workers: {args.workers}")
+    print(f"{'symbols':>8} {'sequential':>12} {'batch':>10} {'aget_quotes':>12} {'speedup':>8}")
+    for n in (1, 10, 100):
+        seq = bench_sequential(n, args.latency)
+        batch = bench_batch(n, args.latency, args.workers)
+        tool = bench_async(n, args.latency)
+        print(f"{n:>8} {seq * 1000:>10.1f}ms {batch * 1000:>8.1f}ms {tool * 1000:>10.1f}ms {seq / tool:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
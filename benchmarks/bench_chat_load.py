@@ -0,0 +1,246 @@
+"""
+/chat load test.
+
+Starts the MCP server and the agent service in this process (uvicorn on
+local ports, one event loop) with the scripted fake LLM (LLM_PROVIDER=fake)
+and fake quotes (QUOTE_SOURCE=fake), then runs N concurrent streaming /chat
+sessions per concurrency level. Reports throughput, p50/p95/p99
+time-to-first-event and time-to-final, and LLM and tool calls per query
+(from the `usage` of each final event), overall and per message. Results are
+written as JSON so runs can be compared across commits.
+
+    python -m benchmarks.bench_chat_load [--concurrency 1 8 32] [--requests 200]
+        [--llm-latency 0.2] [--quote-latency 0.05] [--history 0] [--output chat_load.json]
+
+--history N sends N earlier user/assistant turns with every request, to
+exercise history folding (prompt tokens saved show up under `context` in
+the service stats).
+
+Other settings (MCP_POOL_SIZE, FAST_PATH_ENABLED, QUOTE_CACHE_TTL, ...) are
+read from the environment as usual. The load generator shares the event
+loop (and CPU) with both services, so compare runs made on the same machine.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+DEFAULT_MESSAGES = [
+    "What is my checking balance?",
+    "Show my recent transactions and my total portfolio value",
+    "What are the prices of AAPL, MSFT and gold?",
+    "How much did I spend last quarter?",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "p50": round(rank(50), 2), "p95": round(rank(95), 2), "p99": round(rank(99), 2),
+        "mean": round(sum(ordered) / len(ordered), 2), "max": round(ordered[-1], 2),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _serve(app, port: int):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()  # raises the startup error
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+def _history(turns: int) -> List[Dict[str, str]]:
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"What did I spend on groceries in month {i + 1}, and on dining?"})
+        history.append({"role": "assistant", "content": (
+            f"In month {i + 1} you spent:\n\n| Category | Amount |\n|---|---|\n"
+            f"| Groceries | ${300 + i:,.2f} |\n| Dining | ${120 + i:,.2f} |\n| Transport | ${80 + i:,.2f} |"
+        )})
+    return history
+
+
+async def _chat(client, message: str, customer_id: str, history=()) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = {"message": message, "ttfe_ms": None, "final_ms": None, "usage": {}, "error": None, "fast_path": False}
+    payload = {"message": message, "customer_id": customer_id, "history": list(history)}
+    try:
+        async with client.stream("POST", "/chat", json=payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                elapsed = (time.perf_counter() - started) * 1000
+                if result["ttfe_ms"] is None:
+                    result["ttfe_ms"] = elapsed
+                event = json.loads(line)
+                if event["type"] == "final":
+                    result["final_ms"] = elapsed
+                    result["usage"] = event.get("usage", {})
+                    result["fast_path"] = any(s.get("title") == "Fast Path" for s in event.get("steps", []))
+                elif event["type"] == "error":
+                    result["error"] = event["content"]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    if result["final_ms"] is None and result["error"] is None:
+        result["error"] = "stream ended without a final event"
+    return result
+
+
+def _summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ok = [r for r in results if r["error"] is None]
+    llm = [r["usage"].get("llm_calls", 0) for r in ok]
+    tools = [r["usage"].get("tool_calls", 0) for r in ok]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "fast_path_share": round(sum(r["fast_path"] for r in ok) / len(ok), 3) if ok else 0,
+        "ttfe_ms": _percentiles([r["ttfe_ms"] for r in ok]),
+        "final_ms": _percentiles([r["final_ms"] for r in ok]),
+        "llm_calls_per_query": round(sum(llm) / len(ok), 2) if ok else 0,
+        "tool_calls_per_query": round(sum(tools) / len(ok), 2) if ok else 0,
+    }
+
+
+async def _run_level(client, messages: List[str], customer_id: str, concurrency: int, requests: int, history):
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(messages[i % len(messages)])
+    results: List[Dict[str, Any]] = []
+
+    async def worker():
+        while not queue.empty():
+            results.append(await _chat(client, queue.get_nowait(), customer_id, history))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    by_message = defaultdict(list)
+    for r in results:
+        by_message[r["message"]].append(r)
+    summary = {"concurrency": concurrency, "wall_s": round(wall, 3),
+               "throughput_rps": round(len(results) / wall, 2), **_summarize(results)}
+    summary["by_message"] = {m: _summarize(rs) for m, rs in by_message.items()}
+    errors = [r["error"] for r in results if r["error"]]
+    if errors:
+        summary["sample_errors"] = errors[:5]
+    return summary
+
+
+async def _main(args) -> Dict[str, Any]:
+    import httpx
+    from mcp_server.main import mcp
+    from mcp_client.agent_service import app
+
+    mcp_server, mcp_task = await _serve(mcp.http_app(transport="sse"), args.mcp_port)
+    agent_server, agent_task = await _serve(app, args.app_port)
+    runs = []
+    try:
+        base_url = f"http://127.0.0.1:{args.app_port}"
+        limits = httpx.Limits(max_connections=max(args.concurrency) + 4)
+        history = _history(args.history)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            for message in args.messages:  # warm-up: connections, tool list, graph build
+                await _chat(client, message, args.customer, history)
+            for level in args.concurrency:
+                run = await _run_level(client, args.messages, args.customer, level, args.requests, history)
+                runs.append(run)
+                print(f"c={level:<4} {run['throughput_rps']:>7.2f} req/s  "
+                      f"ttfe p50/p95/p99 {run['ttfe_ms'].get('p50')}/{run['ttfe_ms'].get('p95')}/"
+                      f"{run['ttfe_ms'].get('p99')} ms  final p50/p95/p99 {run['final_ms'].get('p50')}/"
+                      f"{run['final_ms'].get('p95')}/{run['final_ms'].get('p99')} ms  "
+                      f"llm/q {run['llm_calls_per_query']}  tools/q {run['tool_calls_per_query']}  "
+                      f"errors {run['errors']}")
+            stats = (await client.get("/stats")).json()
+    finally:
+        if not args.verbose:
+            # The MCP SDK's SSE transport logs errors for connections closed at shutdown
+            logging.disable(logging.CRITICAL)
+        agent_server.should_exit = True
+        await agent_task
+        mcp_server.should_exit = True
+        await mcp_task
+    return {"runs": runs, "service_stats": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /chat with a fake LLM and in-process MCP server.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--messages", nargs="+", default=DEFAULT_MESSAGES)
+    parser.add_argument("--customer", default="C001")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds per streamed token")
+    parser.add_argument("--quote-latency", type=float, default=0.05, help="Seconds per fake quote fetch")
+    parser.add_argument("--history", type=int, default=0, help="Earlier turns sent with each request")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--mcp-port", type=int, default=0, help="Default: a free port")
+    parser.add_argument("--app-port", type=int, default=0, help="Default: a free port")
+    parser.add_argument("--output", default="chat_load.json")
+    parser.add_argument("--verbose", action="store_true", help="Keep the services' INFO logs")
+    args = parser.parse_args()
+    args.mcp_port = args.mcp_port or _free_port()
+    args.app_port = args.app_port or _free_port()
+
+    # Read when the services start, so they must be set before importing them
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_TOKEN_DELAY"] = str(args.token_delay)
+    os.environ["QUOTE_SOURCE"] = "fake"
+    os.environ["FAKE_QUOTE_LATENCY"] = str(args.quote_latency)
+    os.environ["MCP_SERVER_URL"] = f"http://127.0.0.1:{args.mcp_port}/sse"
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    report = asyncio.run(_main(args))
+    report["meta"] = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("mcp_port", "app_port", "verbose")},
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Conversation state benchmark.
+
+Plays the same long conversation against /chat twice, with both services
+in-process and the fake LLM: once stateless (the client resends the full
+`history` every turn) and once with a server-side conversation
+(`conversation_id` only). Reports the request payload and the prompt tokens
+of each turn (from the `usage` of the final event), and the prompt tokens
+the context manager saved by folding history.
+
+    python -m benchmarks.bench_conversation_state [--turns 40] [--budget 1000]
+        [--store memory|sqlite]
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.bench_chat_load import _free_port, _serve
+
+MESSAGES = [
+    "Show my recent transactions and my total portfolio value",
+    "How much did I spend last quarter?",
+    "What are the prices of AAPL, MSFT and gold?",
+]
+
+
+async def _turn(client, payload: Dict[str, Any]) -> Dict[str, Any]:
+    body = json.dumps(payload).encode()
+    started = time.perf_counter()
+    async with client.stream("POST", "/chat", content=body, headers={"Content-Type": "application/json"}) as resp:
+        resp.raise_for_status()
+        events = [json.loads(line) async for line in resp.aiter_lines() if line]
+    final = events[-1]
+    if final["type"] != "final":
+        raise RuntimeError(final.get("content"))
+    return {
+        "payload_bytes": len(body),
+        "prompt_tokens": final["usage"].get("prompt_tokens", 0),
+        "ms": (time.perf_counter() - started) * 1000,
+        "content": final["content"],
+        "conversation_id": final.get("conversation_id"),
+    }
+
+
+async def _conversation(client, turns: int, customer: str, stateful: bool) -> List[Dict[str, Any]]:
+    history: List[Dict[str, str]] = []
+    conversation_id = None
+    results = []
+    for i in range(turns):
+        message = MESSAGES[i % len(MESSAGES)]
+        payload = {"message": message, "customer_id": customer}
+        if stateful:
+            payload["conversation_id"] = conversation_id
+        else:
+            payload["history"] = history
+        result = await _turn(client, payload)
+        conversation_id = result["conversation_id"]
+        history = history + [{"role": "user", "content": message}, {"role": "assistant", "content": result["content"]}]
+        results.append(result)
+    return results
+
+
+def _total(rows: List[Dict[str, Any]], key: str) -> int:
+    return sum(r[key] for r in rows)
+
+
+async def _main(args):
+    import httpx
+    from mcp_server.main import mcp
+    from mcp_client.agent_service import app
+
+    mcp_server, mcp_task = await _serve(mcp.http_app(transport="sse"), args.mcp_port)
+    agent_server, agent_task = await _serve(app, args.app_port)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.app_port}", timeout=120) as client:
+            stateless = await _conversation(client, args.turns, args.customer, stateful=False)
+            stateful = await _conversation(client, args.turns, args.customer, stateful=True)
+            stats = (await client.get("/stats")).json()
+    finally:
+        logging.disable(logging.CRITICAL)
+        agent_server.should_exit = True
+        await agent_task
+        mcp_server.should_exit = True
+        await mcp_task
+    return stateless, stateful, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare stateless and server-side conversations on /chat.")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--budget", type=int, default=1000,
+                        help="CONTEXT_TOKEN_BUDGET (small, so the history gets folded)")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--customer", default="C001")
+    args = parser.parse_args()
+    args.mcp_port, args.app_port = _free_port(), _free_port()
+
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["QUOTE_SOURCE"] = "fake"
+    os.environ["FAST_PATH_ENABLED"] = "false"  # every turn goes through the graph
+    os.environ["CONTEXT_TOKEN_BUDGET"] = str(args.budget)
+    os.environ["CONVERSATION_STORE"] = args.store
+    os.environ["CONVERSATION_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "conversations.db")
+    os.environ["MCP_SERVER_URL"] = f"http://127.0.0.1:{args.mcp_port}/sse"
+    logging.disable(logging.INFO)
+
+    stateless, stateful, stats = asyncio.run(_main(args))
+
+    print(f"{'turn':>5} {'payload stateless':>18} {'stateful':>9} {'prompt tok stateless':>21} {'stateful':>9}")
+    shown = sorted({1, 2, 5, 10, 20, 40, 80, args.turns} & set(range(1, args.turns + 1)))
+    for turn in shown:
+        a, b = stateless[turn - 1], stateful[turn - 1]
+        print(f"{turn:>5} {a['payload_bytes']:>16} B {b['payload_bytes']:>7} B "
+              f"{a['prompt_tokens']:>21} {b['prompt_tokens']:>9}")
+    print(f"{'total':>5} {_total(stateless, 'payload_bytes'):>16} B {_total(stateful, 'payload_bytes'):>7} B "
+          f"{_total(stateless, 'prompt_tokens'):>21} {_total(stateful, 'prompt_tokens'):>9}")
+    context = stats["context"]
+    print(f"\nContext manager (both runs): {context['prompt_tokens_saved']:,} prompt tokens saved of "
+          f"{context['prompt_tokens_in']:,}, {context['summaries_built']} summaries built, "
+          f"{context['summary_cache_hits']} cache hits")
+    print(f"Conversations: {stats['conversations']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Data access lookup benchmark.
+
+Builds synthetic repositories of increasing size and times the per-customer
+lookups used by the balance and account tools, against the previous linear
+scan over all accounts.
+
+    python -m benchmarks.bench_data_lookups [--sizes 1000 10000 100000 1000000]
+
+10M accounts need roughly 12 GB of RAM with dict records.
+"""
+
+import argparse
+import time
+
+from mcp_server.synthetic import generate_repository, sample_customer_ids
+
+
+def _per_call_us(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed vs scanning data lookups.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--scan-lookups", type=int, default=20, help="Lookups for the (slow) linear scan")
+    args = parser.parse_args()
+
+    print(f"{'accounts':>10} {'by_customer':>12} {'by_type':>10} {'total_bal':>10} {'by_id':>8} {'scan (old)':>12}")
+    for size in args.sizes:
+        repo = generate_repository(size)
+        customers = sample_customer_ids(size, args.lookups)
+        accounts = list(repo.accounts)[:: max(1, size // args.lookups)]
+
+        by_customer = _per_call_us(repo.get_accounts_by_customer, [(c,) for c in customers])
+        by_type = _per_call_us(repo.get_accounts_by_type, [(c, "savings") for c in customers])
+        total = _per_call_us(repo.get_total_balance, [(c,) for c in customers])
+        by_id = _per_call_us(repo.get_account, [(a,) for a in accounts])
+
+        def scan(cid):
+            return [acc for acc in repo.accounts.values() if acc.customer_id == cid]
+
+        scanned = _per_call_us(scan, [(c,) for c in customers[: args.scan_lookups]])
+        print(f"{size:>10} {by_customer:>10.2f}us {by_type:>8.2f}us {total:>8.2f}us {by_id:>6.2f}us {scanned:>10.0f}us")
+        del repo
+
+
+if __name__ == "__main__":
+    main()
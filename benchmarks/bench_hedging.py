@@ -0,0 +1,143 @@
+"""
+LLM hedging and failover benchmark.
+
+Calls fake models with injected latency (lognormal around a median, heavy
+tail for the primary) through ResilientChatModel, offline:
+
+1. primary only (no fallback, nothing to hedge to)
+2. primary hedged to a fallback after its p95 latency
+3. primary failing every call: failover, then its circuit breaker opens
+
+and reports latency percentiles, how many calls were sent twice and how
+the calls ended.
+
+    python -m benchmarks.bench_hedging [--requests 400] [--concurrency 8]
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, List, Optional
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+async def _run(llm, requests: int, concurrency: int, stream: bool) -> Dict[str, Any]:
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from mcp_client.llm_resilience import resilience_stats
+
+    messages = [SystemMessage("Decide the next action"), HumanMessage("What is my balance?")]
+    config = {"metadata": {"langgraph_node": "agent"}}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if stream:
+                    async for _ in llm.astream(messages, config=config):
+                        pass
+                else:
+                    await llm.ainvoke(messages, config=config)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    before = resilience_stats()
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    after = resilience_stats()
+    counters = {k: after[k] - before[k] for k in ("calls", "hedged", "hedges_won_by_fallback", "failovers")}
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "p50": _percentile(latencies, 0.5),
+        "p95": _percentile(latencies, 0.95),
+        "p99": _percentile(latencies, 0.99),
+        "max": max(latencies, default=0.0),
+        "throughput": requests / elapsed,
+        "circuits": after["circuits"],
+        **counters,
+    }
+
+
+def _model(name: str, fallback: Optional[str], policy):
+    from mcp_client.llm_config import get_llm
+    from mcp_client.llm_resilience import ResilientChatModel
+
+    return ResilientChatModel(
+        primary=get_llm(0, provider="fake", model=name),
+        fallback=get_llm(0, provider="fake", model=fallback) if fallback else None,
+        policy=policy,
+    )
+
+
+def _print(name: str, result: Dict[str, Any]):
+    calls = result["calls"] or 1
+    print(f"{name:<26}{result['ok']:>6}{sum(result['errors'].values()):>7}"
+          f"{result['p50'] * 1000:>9.0f}{result['p95'] * 1000:>9.0f}{result['p99'] * 1000:>9.0f}"
+          f"{result['max'] * 1000:>9.0f}{result['hedged'] / calls * 100:>8.1f}%"
+          f"{result['hedges_won_by_fallback']:>8}{result['failovers']:>10}")
+
+
+async def _bench(args):
+    from mcp_client.llm_resilience import ResiliencePolicy
+
+    policy = ResiliencePolicy(
+        deadline=args.deadline, hedge_quantile=args.quantile, hedge_min_delay=0.01,
+        hedge_initial_delay=args.median * 4, hedge_min_samples=20,
+        breaker_failures=5, breaker_reset=args.deadline * 10,
+    )
+    print(f"{'scenario':<26}{'ok':>6}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'hedged':>9}{'won':>8}{'failover':>10}")
+    for kind in ("invoke", "stream"):
+        stream = kind == "stream"
+        # Fresh model names per run: breakers and latency windows are kept per model
+        alone = _model(f"primary-{kind}-alone", None, policy)
+        _print(f"{kind}: primary only", await _run(alone, args.requests, args.concurrency, stream))
+
+        hedged = _model(f"primary-{kind}-hedged", f"backup-{kind}-hedged", policy)
+        # Warm up the primary's latency window so the hedge delay is its p95
+        await _run(hedged.model_copy(update={"fallback": None}), 50, args.concurrency, stream)
+        _print(f"{kind}: hedged", await _run(hedged, args.requests, args.concurrency, stream))
+
+        down = _model(f"primary-{kind}-down", f"backup-{kind}-down", policy)
+        down.primary.model.failure_rate = 1.0
+        result = await _run(down, args.requests, args.concurrency, stream)
+        _print(f"{kind}: primary down", result)
+        breaker = result["circuits"][f"fake/primary-{kind}-down"]
+        print(f"{'':<26}primary circuit {breaker['state']}, {breaker['rejected']} calls skipped it")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedged LLM calls against fake models.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--median", type=float, default=0.05, help="Median latency of both models (s)")
+    parser.add_argument("--sigma", type=float, default=1.0, help="Lognormal sigma of the primary's latency")
+    parser.add_argument("--quantile", type=float, default=0.95, help="Hedge after this latency quantile")
+    parser.add_argument("--deadline", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Same median latency; primaries have a heavy tail, backups a narrow spread
+    os.environ["FAKE_LLM_LATENCY"] = f"{args.median:g}"
+    os.environ["FAKE_LLM_LATENCY_SIGMA"] = ",".join(
+        f"{model}-{kind}-{run}:{args.sigma if model == 'primary' else 0.2:g}"
+        for model in ("primary", "backup") for kind in ("invoke", "stream") for run in ("alone", "hedged", "down")
+    )
+    os.environ["LLM_CONCURRENCY"] = "fake:64"
+    logging.disable(logging.WARNING)
+
+    asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Memory footprint benchmark.
+
+Reports bytes per account and per transaction for the previous
+representation (one dict per record, with its own formatted date strings)
+against InMemoryRepository's compact storage (slotted account records,
+struct-of-arrays transactions, interned enum codes, integer dates).
+The full-repository account figure also includes the customer index and
+the per-customer balance aggregates, which the dict baseline does not have.
+
+    python -m benchmarks.bench_memory_footprint [--records 1000000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from mcp_server.data import InMemoryRepository
+from mcp_server.synthetic import iter_accounts, iter_transactions
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def _dict_accounts(n):
+    return {a["account_id"]: a for a in iter_accounts(n)}
+
+
+def _repo_accounts(n):
+    repo = InMemoryRepository()
+    for account in iter_accounts(n):
+        repo.add_account(account)
+    return repo
+
+
+def _repo_account_records(n):
+    # Keeps only the records and the enum vocabulary they point into
+    repo = _repo_accounts(n)
+    return repo.accounts, repo._enums
+
+
+def _dict_transactions(n, num_accounts):
+    transactions = {}
+    for txn in iter_transactions(n, num_accounts):
+        transactions.setdefault(txn.pop("customer_id"), []).append(txn)
+    return transactions
+
+
+def _repo_transactions(n, num_accounts):
+    repo = InMemoryRepository()
+    for txn in iter_transactions(n, num_accounts):
+        repo.add_transaction(txn.pop("customer_id"), txn)
+    return repo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bytes per account and per transaction.")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.records
+
+    print(f"{n:,} records, bytes per record")
+    print(f"{'':<38} {'dicts':>8} {'compact':>8} {'saved':>7}")
+    rows = [
+        ("accounts (records)", lambda: _dict_accounts(n), lambda: _repo_account_records(n)),
+        ("accounts (full repository)", lambda: _dict_accounts(n), lambda: _repo_accounts(n)),
+        ("transactions (1 customer)", lambda: _dict_transactions(n, 3), lambda: _repo_transactions(n, 3)),
+        ("transactions (~10 per customer)",
+         lambda: _dict_transactions(n, n * 3 // 10), lambda: _repo_transactions(n, n * 3 // 10)),
+    ]
+    for name, before, after in rows:
+        result, before_bytes = _measure(before)
+        del result
+        result, after_bytes = _measure(after)
+        del result
+        print(f"{name:<38} {before_bytes / n:>8.0f} {after_bytes / n:>8.0f} {1 - after_bytes / before_bytes:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
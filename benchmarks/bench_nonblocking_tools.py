@@ -0,0 +1,90 @@
+"""
+Event-loop blocking benchmark for the MCP server.
+
+Starts an in-process FastMCP server with the balance tools and a quote tool,
+fires a burst of slow quote calls (FakeQuoteSource with upstream latency) and
+measures check_balance latency while they are in flight. The "blocking"
+variant registers the quote tool as a plain sync function doing the upstream
+fetch inline (the old behaviour); the "async" variant uses the real
+stock_prices tools, which offload to the blocking executor.
+
+    python -m benchmarks.bench_nonblocking_tools [--latency 0.5] [--slow-calls 8]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastmcp import Client, FastMCP
+
+from mcp_server.quotes import FakeQuoteSource, set_quote_source
+from mcp_server.tools import balance, stock_prices
+
+
+def _blocking_server(source: FakeQuoteSource) -> FastMCP:
+    mcp = FastMCP("blocking")
+    balance.register(mcp)
+
+    @mcp.tool()
+    def get_stock_price(symbol: str) -> str:
+        info = source.fetch(symbol.upper())
+        return f"{symbol}: {info['currentPrice']}"
+
+    return mcp
+
+
+def _async_server() -> FastMCP:
+    mcp = FastMCP("async")
+    balance.register(mcp)
+    stock_prices.register(mcp)
+    return mcp
+
+
+async def _measure(mcp: FastMCP, slow_calls: int, probes: int) -> dict:
+    async with Client(mcp) as client:
+        # Baseline with nothing else in flight
+        idle = []
+        for _ in range(probes):
+            start = time.perf_counter()
+            await client.call_tool("check_balance", {"customer_id": "C001"})
+            idle.append((time.perf_counter() - start) * 1000)
+
+        slow = [
+            asyncio.create_task(client.call_tool("get_stock_price", {"symbol": f"SLOW{i}"}))
+            for i in range(slow_calls)
+        ]
+        await asyncio.sleep(0.01)
+        busy = []
+        for _ in range(probes):
+            start = time.perf_counter()
+            await client.call_tool("check_balance", {"customer_id": "C001"})
+            busy.append((time.perf_counter() - start) * 1000)
+        await asyncio.gather(*slow)
+
+    return {
+        "idle_p50_ms": statistics.median(idle),
+        "busy_p50_ms": statistics.median(busy),
+        "busy_max_ms": max(busy),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark balance-tool latency during slow quote calls.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake upstream latency per quote (s)")
+    parser.add_argument("--slow-calls", type=int, default=8, help="Concurrent slow quote calls")
+    parser.add_argument("--probes", type=int, default=10, help="check_balance calls to time")
+    args = parser.parse_args()
+
+    blocking = await _measure(_blocking_server(FakeQuoteSource(latency=args.latency)), args.slow_calls, args.probes)
+    set_quote_source(FakeQuoteSource(latency=args.latency))
+    offloaded = await _measure(_async_server(), args.slow_calls, args.probes)
+
+    print(f"Upstream latency: {args.latency * 1000:.0f} ms, slow quote calls in flight: {args.slow_calls}")
+    print(f"{'variant':>10} {'idle p50':>10} {'busy p50':>10} {'busy max':>10}")
+    for name, r in (("blocking", blocking), ("async", offloaded)):
+        print(f"{name:>10} {r['idle_p50_ms']:>8.1f}ms {r['busy_p50_ms']:>8.1f}ms {r['busy_max_ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Spending analytics benchmark.
+
+Loads one customer with millions of synthetic transactions and times the
+spending summary tool path: the first (cold) call that builds the columnar
+NumPy layout, then cached calls over the full history and over a 90-day
+window, against the same summary computed with a plain Python loop over
+the transaction dicts.
+
+    python -m benchmarks.bench_spending_analytics [--sizes 1000000 2000000]
+"""
+
+import argparse
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from mcp_server.data import InMemoryRepository, set_repository
+from mcp_server.synthetic import customer_id, iter_transactions
+from mcp_server.tools.spending import categorize, load_columns, summarize
+
+CUSTOMER = customer_id(0)
+
+
+def _python_summary(records):
+    """The loop the vectorized path replaces (and what the LLM was doing by hand)"""
+    spent = received = 0
+    by_description = defaultdict(int)
+    monthly = defaultdict(lambda: [0, 0])
+    for t in records:
+        cents = round(t["amount"] * 100)
+        month = monthly[t["date"][:7]]
+        if cents < 0:
+            spent -= cents
+            by_description[t["description"]] -= cents
+            month[0] -= cents
+        else:
+            received += cents
+            month[1] += cents
+    by_category = defaultdict(int)
+    for description, cents in by_description.items():
+        by_category[categorize(description)] += cents
+    return spent / 100, received / 100, by_category, monthly
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _vectorized(start_date=None):
+    return summarize(load_columns(CUSTOMER).between(start_date, None))
+
+
+def _loop(repo, start_date=None):
+    return _python_summary(repo.get_transactions_in_range(CUSTOMER, start_date, None))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized spending summary.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 2_000_000])
+    parser.add_argument("--days", type=int, default=3650)
+    args = parser.parse_args()
+
+    quarter = (date.today() - timedelta(days=89)).isoformat()
+    print(f"{'txns':>10} {'cold':>9} {'all':>9} {'loop all':>10} {'90 days':>9} {'loop 90d':>10} {'match':>6}")
+    for size in args.sizes:
+        repo = InMemoryRepository()
+        for txn in iter_transactions(size, num_accounts=3, days=args.days):
+            repo.add_transaction(txn.pop("customer_id"), txn)
+        repo.get_transactions_in_range(CUSTOMER)  # one-off sort of the index
+        set_repository(repo)
+
+        _, cold_ms = _timed(_vectorized)
+        summary, all_ms = _timed(_vectorized)
+        (spent, received, _, _), loop_ms = _timed(_loop, repo)
+        _, quarter_ms = _timed(_vectorized, quarter)
+        _, loop_quarter_ms = _timed(_loop, repo, quarter)
+
+        match = abs(summary.spent - spent) < 0.005 and abs(summary.received - received) < 0.005
+        print(f"{size:>10} {cold_ms:>7.0f}ms {all_ms:>7.0f}ms {loop_ms:>8.0f}ms "
+              f"{quarter_ms:>7.1f}ms {loop_quarter_ms:>8.1f}ms {str(match):>6}")
+        set_repository(None)
+        del repo
+
+
+if __name__ == "__main__":
+    main()
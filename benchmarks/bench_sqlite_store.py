@@ -0,0 +1,89 @@
+"""
+SQLite store benchmark.
+
+Writes synthetic accounts and transactions to CSV and JSONL, bulk loads them
+into a fresh SQLite database and times indexed lookups through the reader
+pool, including concurrent readers on the blocking executor.
+
+    python -m benchmarks.bench_sqlite_store [--accounts 300000] [--transactions 1000000]
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import time
+
+from mcp_server.executor import run_blocking
+from mcp_server.sqlite_store import COLUMNS, SQLiteRepository
+from mcp_server.synthetic import iter_accounts, iter_customers, iter_transactions, sample_customer_ids
+
+
+def _write_csv(path, table, records):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS[table])
+        for r in records:
+            writer.writerow([r[c] for c in COLUMNS[table]])
+
+
+def _write_jsonl(path, records):
+    with open(path, "w") as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+
+
+def _load(repo, table, path):
+    start = time.perf_counter()
+    count = repo.bulk_load(table, path)
+    elapsed = time.perf_counter() - start
+    print(f"  {table:<13} {os.path.basename(path):<18} {count:>10,} rows {elapsed:>6.2f}s {count / elapsed:>12,.0f} rows/s")
+
+
+async def _concurrent_lookups(repo, customers, workers):
+    start = time.perf_counter()
+    await asyncio.gather(*(run_blocking(repo.get_accounts_by_customer, c) for c in customers))
+    return (time.perf_counter() - start) / len(customers) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite backend.")
+    parser.add_argument("--accounts", type=int, default=300_000)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        num_customers = -(-args.accounts // 3)
+        _write_csv(os.path.join(tmp, "customers.csv"), "customers", iter_customers(num_customers))
+        _write_csv(os.path.join(tmp, "accounts.csv"), "accounts", iter_accounts(args.accounts))
+        _write_jsonl(os.path.join(tmp, "transactions.jsonl"), iter_transactions(args.transactions, args.accounts))
+
+        repo = SQLiteRepository(os.path.join(tmp, "bench.db"))
+        print("Bulk load:")
+        _load(repo, "customers", os.path.join(tmp, "customers.csv"))
+        _load(repo, "accounts", os.path.join(tmp, "accounts.csv"))
+        _load(repo, "transactions", os.path.join(tmp, "transactions.jsonl"))
+
+        customers = sample_customer_ids(args.accounts, args.lookups)
+        print("Lookups (per call):")
+        for name, fn, call_args in (
+            ("get_accounts_by_customer", repo.get_accounts_by_customer, [(c,) for c in customers]),
+            ("get_accounts_by_type", repo.get_accounts_by_type, [(c, "savings") for c in customers]),
+            ("get_total_balance", repo.get_total_balance, [(c,) for c in customers]),
+            ("get_transactions_by_customer", repo.get_transactions_by_customer, [(c, 10) for c in customers]),
+        ):
+            start = time.perf_counter()
+            for a in call_args:
+                fn(*a)
+            print(f"  {name:<30} {(time.perf_counter() - start) / len(call_args) * 1e6:>8.1f} us")
+
+        per_call = asyncio.run(_concurrent_lookups(repo, customers, 4))
+        print(f"  {'concurrent (executor) by_customer':<30} {per_call:>8.1f} us")
+        repo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Tool output encoding benchmark.
+
+1. Calls every tool in-process with fake quotes and reports the estimated
+   tokens (about 4 characters per token, as the context manager counts) of
+   its result in each TOOL_OUTPUT_ENCODING: markdown, json and compact.
+2. Sends the benchmark conversations' messages (bench_chat_load and
+   bench_conversation_state) to /chat once per encoding, with both services
+   in-process, the fake LLM and the fast path off, and reports the prompt
+   tokens of each query (from the `usage` of the final event).
+
+    python -m benchmarks.bench_tool_encoding [--customer C001]
+"""
+
+import os
+import json
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.bench_chat_load import DEFAULT_MESSAGES, _free_port, _serve
+from benchmarks.bench_conversation_state import MESSAGES as CONVERSATION_MESSAGES
+
+ENCODINGS = ("markdown", "json", "compact")
+
+
+def _tool_calls(customer: str) -> List[Tuple[str, Dict[str, Any]]]:
+    return [
+        ("get_account_info", {"customer_id": customer}),
+        ("get_account_types", {"customer_id": customer}),
+        ("check_balance", {"customer_id": customer}),
+        ("get_recent_transactions", {"customer_id": customer, "limit": 20}),
+        ("get_total_portfolio_value", {"customer_id": customer}),
+        ("get_spending_summary", {"customer_id": customer}),
+        ("get_stock_price", {"symbol": "AAPL"}),
+        ("get_multiple_stock_prices", {"symbols": "AAPL,MSFT,GOOGL,AMZN,NVDA"}),
+        ("get_gold_price", {}),
+        ("get_precious_metals_prices", {}),
+    ]
+
+
+async def _tool_sizes(customer: str) -> List[Tuple[str, Dict[str, int]]]:
+    from fastmcp import Client
+    from mcp_server.main import mcp
+    from mcp_client.context import estimate_tokens
+    from mcp_client.tool_encoding import encode_result
+
+    rows = []
+    async with Client(mcp) as client:
+        for name, args in _tool_calls(customer):
+            result = await client.call_tool_mcp(name, args)
+            rows.append((name, {e: estimate_tokens(encode_result(result, e)) for e in ENCODINGS}))
+    return rows
+
+
+async def _prompt_tokens(messages: List[str], customer: str) -> Dict[str, List[int]]:
+    import httpx
+    from mcp_server.main import mcp
+    from mcp_client.agent_service import app
+
+    mcp_port = _free_port()
+    os.environ["MCP_SERVER_URL"] = f"http://127.0.0.1:{mcp_port}/sse"
+    mcp_server, mcp_task = await _serve(mcp.http_app(transport="sse"), mcp_port)
+    tokens: Dict[str, List[int]] = {}
+    try:
+        for encoding in ENCODINGS:
+            # The agent service reads TOOL_OUTPUT_ENCODING at startup
+            os.environ["TOOL_OUTPUT_ENCODING"] = encoding
+            app_port = _free_port()
+            agent_server, agent_task = await _serve(app, app_port)
+            try:
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", timeout=120) as client:
+                    tokens[encoding] = []
+                    for message in messages:
+                        async with client.stream("POST", "/chat", json={"message": message, "customer_id": customer}) as resp:
+                            resp.raise_for_status()
+                            final = [json.loads(line) async for line in resp.aiter_lines() if line][-1]
+                        if final["type"] != "final":
+                            raise RuntimeError(final.get("content"))
+                        tokens[encoding].append(final["usage"].get("prompt_tokens", 0))
+            finally:
+                agent_server.should_exit = True
+                await agent_task
+    finally:
+        logging.disable(logging.CRITICAL)
+        mcp_server.should_exit = True
+        await mcp_task
+    return tokens
+
+
+def _saved(before: int, after: int) -> str:
+    return f"{(1 - after / before) * 100:.0f}%" if before else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt tokens of tool output encodings.")
+    parser.add_argument("--customer", default="C001")
+    args = parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["QUOTE_SOURCE"] = "fake"
+    os.environ["FAST_PATH_ENABLED"] = "false"  # every query goes through the graph
+    os.environ["QUOTE_PREFETCH_ENABLED"] = "false"
+    logging.disable(logging.INFO)
+
+    sizes = asyncio.run(_tool_sizes(args.customer))
+    print(f"{'tool output tokens':<28}" + "".join(f"{e:>10}" for e in ENCODINGS) + f"{'saved':>8}")
+    for name, row in sizes:
+        print(f"{name:<28}" + "".join(f"{row[e]:>10}" for e in ENCODINGS) + f"{_saved(row['markdown'], row['compact']):>8}")
+    totals = {e: sum(row[e] for _, row in sizes) for e in ENCODINGS}
+    print(f"{'total':<28}" + "".join(f"{totals[e]:>10}" for e in ENCODINGS)
+          + f"{_saved(totals['markdown'], totals['compact']):>8}")
+
+    messages = list(dict.fromkeys(DEFAULT_MESSAGES + CONVERSATION_MESSAGES))
+    tokens = asyncio.run(_prompt_tokens(messages, args.customer))
+    print(f"\n{'prompt tokens per query':<60}" + "".join(f"{e:>10}" for e in ENCODINGS) + f"{'saved':>8}")
+    for i, message in enumerate(messages):
+        row = {e: tokens[e][i] for e in ENCODINGS}
+        print(f"{message[:58]:<60}" + "".join(f"{row[e]:>10}" for e in ENCODINGS)
+              + f"{_saved(row['markdown'], row['compact']):>8}")
+    totals = {e: sum(tokens[e]) for e in ENCODINGS}
+    print(f"{'total':<60}" + "".join(f"{totals[e]:>10}" for e in ENCODINGS)
+          + f"{_saved(totals['markdown'], totals['compact']):>8}")
+
+
+if __name__ == "__main__":
+    main()
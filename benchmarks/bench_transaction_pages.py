@@ -0,0 +1,91 @@
+"""
+Transaction range query benchmark.
+
+Loads one customer with a large transaction history (spread over ten years)
+and times date-range page queries through the sorted index, for the
+in-memory and SQLite backends, against filtering and sorting the full list.
+
+    python -m benchmarks.bench_transaction_pages [--sizes 100000 1000000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from mcp_server.data import InMemoryRepository
+from mcp_server.sqlite_store import SQLiteRepository
+from mcp_server.synthetic import customer_id, iter_transactions
+
+CUSTOMER = customer_id(0)
+DAYS = 3650
+
+
+def _windows(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    today = date.today()
+    for _ in range(count):
+        end = today - timedelta(days=rng.randrange(DAYS))
+        yield (end - timedelta(days=30)).isoformat(), end.isoformat()
+
+
+def _time_pages(repo, windows, limit: int) -> float:
+    start = time.perf_counter()
+    for start_date, end_date in windows:
+        repo.get_transactions_page(CUSTOMER, start_date, end_date, None, limit)
+    return (time.perf_counter() - start) / len(windows) * 1e6
+
+
+def _time_walk(repo, pages: int, limit: int) -> float:
+    """Follows next_cursor through `pages` consecutive pages."""
+    cursor = None
+    start = time.perf_counter()
+    for _ in range(pages):
+        page = repo.get_transactions_page(CUSTOMER, None, None, cursor, limit)
+        cursor = page.next_cursor
+    return (time.perf_counter() - start) / pages * 1e6
+
+
+def _time_scan(transactions, windows, limit: int) -> float:
+    start = time.perf_counter()
+    for start_date, end_date in windows:
+        matching = [t for t in transactions if start_date <= t["date"] <= end_date]
+        matching.sort(key=lambda t: (t["date"], t["transaction_id"]), reverse=True)
+        matching[:limit]
+    return (time.perf_counter() - start) / len(windows) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark paginated transaction range queries.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    windows = list(_windows(args.queries))
+    print(f"30-day window, {args.limit} per page (per query)")
+    print(f"{'txns':>10} {'memory':>10} {'sqlite':>10} {'mem walk':>10} {'sql walk':>10} {'scan (old)':>12}")
+    for size in args.sizes:
+        transactions = list(iter_transactions(size, num_accounts=3, days=DAYS))
+        memory = InMemoryRepository()
+        for txn in transactions:
+            memory.add_transaction(CUSTOMER, txn)
+        memory.get_transactions_page(CUSTOMER)  # one-off sort of the index
+
+        with tempfile.TemporaryDirectory() as tmp:
+            sqlite = SQLiteRepository(os.path.join(tmp, "bench.db"), readers=1)
+            sqlite._insert("transactions", transactions)
+
+            mem_us = _time_pages(memory, windows, args.limit)
+            sql_us = _time_pages(sqlite, windows, args.limit)
+            mem_walk = _time_walk(memory, 200, args.limit)
+            sql_walk = _time_walk(sqlite, 200, args.limit)
+            scan_us = _time_scan(transactions, windows[:10], args.limit)
+            sqlite.close()
+        print(f"{size:>10} {mem_us:>8.1f}us {sql_us:>8.1f}us {mem_walk:>8.1f}us {sql_walk:>8.1f}us {scan_us:>10.0f}us")
+
+
+if __name__ == "__main__":
+    main()
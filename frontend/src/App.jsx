@@ -11,6 +11,8 @@ const App = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [currentStatus, setCurrentStatus] = useState('');
   const messagesEndRef = useRef(null);
+  // Set by the server on the first answer; later turns only send the new message
+  const conversationIdRef = useRef(null);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -38,7 +40,7 @@ const App = () => {
         },
         body: JSON.stringify({
           message: currentInput,
-          history: messages.map(m => ({ role: m.role, content: m.content })),
+          conversation_id: conversationIdRef.current,
           customer_id: 'C001',
         }),
       });
@@ -65,12 +67,26 @@ const App = () => {
             const event = JSON.parse(line);
             if (event.type === 'status') {
               setCurrentStatus(event.content);
+            } else if (event.type === 'delta') {
+              setMessages((prev) => {
+                const last = prev[prev.length - 1];
+                if (last?.streaming) {
+                  return [...prev.slice(0, -1), { ...last, content: last.content + event.content }];
+                }
+                return [...prev, { role: 'assistant', content: event.content, steps: [], streaming: true }];
+              });
+            } else if (event.type === 'delta_reset') {
+              setMessages((prev) => (prev[prev.length - 1]?.streaming ? prev.slice(0, -1) : prev));
             } else if (event.type === 'final') {
-              setMessages((prev) => [...prev, {
-                role: 'assistant',
-                content: event.content,
-                steps: event.steps || []
-              }]);
+              conversationIdRef.current = event.conversation_id || conversationIdRef.current;
+              setMessages((prev) => {
+                const rest = prev[prev.length - 1]?.streaming ? prev.slice(0, -1) : prev;
+                return [...rest, {
+                  role: 'assistant',
+                  content: event.content,
+                  steps: event.steps || []
+                }];
+              });
             } else if (event.type === 'error') {
               throw new Error(event.content);
             }
@@ -1,22 +1,44 @@
-from typing import List, Literal
-from langchain_core.messages import SystemMessage, AIMessage
+import asyncio
+from typing import List, Literal, Optional
+from langchain_core.messages import SystemMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
 
-from mcp_client.llm_config import get_llm
+from mcp_client.context import ContextManager
+from mcp_client.llm_config import get_role_llm
 from mcp_client.models import AgentState
 
-def create_agent_graph(tools: List[StructuredTool], llm=None):
+def create_agent_graph(
+    tools: List[StructuredTool],
+    llm=None,
+    tool_concurrency: int = 4,
+    tool_timeout: float = 30.0,
+    context: Optional[ContextManager] = None,
+    checkpointer=None,
+):
     """
     Constructs the LangGraph StateGraph for a robust Banking agent.
     Incorporates Planning, Execution, and Reflection nodes.
+
+    All tool calls requested in one agent turn run concurrently (at most
+    `tool_concurrency` at a time, each bounded by `tool_timeout` seconds)
+    and are reflected on as a single batch.
+
+    Planner, agent and reflector each use their role's model (see
+    llm_config.role_spec) unless one `llm` is given for all three.
+
+    With a `context` manager, every LLM prompt is trimmed to its token
+    budget before the call. With a `checkpointer`, state is saved per
+    conversation (config["configurable"]["thread_id"]).
     """
-    # Get LLM from configuration if not provided
-    if llm is None:
-        llm = get_llm(temperature=0.8)
-    
-    llm_with_tools = llm.bind_tools(tools)
+    planner_llm = llm or get_role_llm("planner")
+    reflector_llm = llm or get_role_llm("reflector")
+    llm_with_tools = (llm or get_role_llm("agent")).bind_tools(tools)
+    tools_by_name = {t.name: t for t in tools}
+
+    def fit(prompt, node: str, folded_tokens: int = 0):
+        return context.fit(prompt, node, folded_tokens) if context is not None else prompt
 
     async def planner_node(state: AgentState):
         """Creates an initial plan based on the user request."""
@@ -24,7 +46,7 @@ def create_agent_graph(tools: List[StructuredTool], llm=None):
         planner_prompt = """Based on the user's request and history, create a concise step-by-step plan to resolve the query. Identify specific tools likely needed."""
         
         plan_messages = [SystemMessage(content=planner_prompt)] + messages
-        response = await llm.ainvoke(plan_messages)
+        response = await planner_llm.ainvoke(fit(plan_messages, "planner", state.history_tokens_folded))
         return {"plan": response.content}
 
     async def agent_node(state: AgentState):
@@ -38,18 +60,43 @@ def create_agent_graph(tools: List[StructuredTool], llm=None):
         Steps Taken: {steps}
         Recent Reflections: {reflections}
         
-        Decide the next action. If the plan is fulfilled, provide the final answer."""
+        Decide the next action. If several independent tools are needed, call them all in this turn.
+        If the plan is fulfilled, provide the final answer."""
         
         # Inject context into messages for the LLM
         context_msg = SystemMessage(content=agent_prompt)
-        response = await llm_with_tools.ainvoke([context_msg] + messages)
+        response = await llm_with_tools.ainvoke(fit([context_msg] + messages, "agent", state.history_tokens_folded))
         return {"messages": [response]}
 
+    async def tools_node(state: AgentState, config: RunnableConfig):
+        """Executes every tool call of the last AI message concurrently."""
+        tool_calls = state.messages[-1].tool_calls
+        semaphore = asyncio.Semaphore(tool_concurrency)
+
+        async def run(tool_call) -> ToolMessage:
+            name = tool_call["name"]
+            tool = tools_by_name.get(name)
+            if tool is None:
+                return ToolMessage(content=f"Error: unknown tool {name}", name=name,
+                                   tool_call_id=tool_call["id"], status="error")
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(tool.ainvoke(tool_call, config), tool_timeout)
+                except asyncio.TimeoutError:
+                    return ToolMessage(content=f"Error: {name} timed out after {tool_timeout:g}s", name=name,
+                                       tool_call_id=tool_call["id"], status="error")
+                except Exception as e:
+                    return ToolMessage(content=f"Error executing tool: {e}", name=name,
+                                       tool_call_id=tool_call["id"], status="error")
+
+        results = await asyncio.gather(*(run(tc) for tc in tool_calls))
+        return {"messages": list(results)}
+
     async def reflector_node(state: AgentState):
-        """Analyzes tool output and updates the state."""
+        """Analyzes the outputs of the last batch of tool calls and updates the state."""
         messages = state.messages
         
-        reflection_prompt = """Analyze the recent tool output. Determine if it satisfies the sub-query/plan step and if further tools are needed. Provide a brief reflection."""
+        reflection_prompt = """Analyze the recent tool outputs. Determine if they satisfy the sub-query/plan steps and if further tools are needed. Provide a brief reflection."""
         
         # We look at the messages since the last AI message
         relevant_messages = []
@@ -58,15 +105,17 @@ def create_agent_graph(tools: List[StructuredTool], llm=None):
             if isinstance(msg, AIMessage) and msg.tool_calls:
                 break
         
-        response = await llm.ainvoke([SystemMessage(content=reflection_prompt)] + list(reversed(relevant_messages)))
+        prompt = [SystemMessage(content=reflection_prompt)] + list(reversed(relevant_messages))
+        response = await reflector_llm.ainvoke(fit(prompt, "reflector"))
         
-        # Record the step taken (the tool call)
+        # Record the step taken (the batch of tool calls)
         last_ai_msg = [m for m in messages if isinstance(m, AIMessage) and m.tool_calls][-1]
-        tool_call = last_ai_msg.tool_calls[0]['name']
+        tool_names = ", ".join(tc['name'] for tc in last_ai_msg.tool_calls)
+        label = "tools" if len(last_ai_msg.tool_calls) > 1 else "tool"
         
         return {
             "reflections": [response.content],
-            "steps_taken": [f"Called tool: {tool_call}"]
+            "steps_taken": [f"Called {label}: {tool_names}"]
         }
 
     def should_continue(state: AgentState) -> Literal["tools", "reflector", "__end__"]:
@@ -90,7 +139,7 @@ def create_agent_graph(tools: List[StructuredTool], llm=None):
     
     workflow.add_node("planner", planner_node)
     workflow.add_node("agent", agent_node)
-    workflow.add_node("tools", ToolNode(tools))
+    workflow.add_node("tools", tools_node)
     workflow.add_node("reflector", reflector_node)
 
     workflow.add_edge(START, "planner")
@@ -111,4 +160,37 @@ def create_agent_graph(tools: List[StructuredTool], llm=None):
         after_reflection,
     )
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+
+class AgentGraphCache:
+    """
+    Holds the compiled agent graph for the current tool-set version.
+    Building the graph (bind_tools, compile) is only repeated
+    when the MCP server's tool list changes.
+    """
+
+    def __init__(self, llm=None, tool_concurrency: int = 4, tool_timeout: float = 30.0,
+                 context: Optional[ContextManager] = None, checkpointer=None):
+        self.llm = llm
+        self.context = context
+        self.checkpointer = checkpointer
+        self.tool_concurrency = tool_concurrency
+        self.tool_timeout = tool_timeout
+        self.version = None
+        self.graph = None
+        self.builds = 0
+
+    def get(self, tool_set):
+        if self.graph is None or tool_set.version != self.version:
+            self.graph = create_agent_graph(
+                tool_set.tools,
+                llm=self.llm,
+                tool_concurrency=self.tool_concurrency,
+                tool_timeout=self.tool_timeout,
+                context=self.context,
+                checkpointer=self.checkpointer,
+            )
+            self.version = tool_set.version
+            self.builds += 1
+        return self.graph
@@ -1,16 +1,34 @@
 import os
+import time
+import asyncio
 import logging
 import json
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 from mcp import ClientSession
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, AIMessageChunk, RemoveMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from mcp_client.models import ChatRequest
-from mcp_client.mcp_utils import get_mcp_session, convert_mcp_to_langchain_tool
-from mcp_client.agent_graph import create_agent_graph
+from mcp_client.mcp_utils import MCPSessionPool, ToolRegistry, get_mcp_session
+from mcp_client.agent_graph import AgentGraphCache
+from mcp_client.context import ContextManager
+from mcp_client.conversations import (
+    ConversationOwnershipError, ConversationStore, completed_turns, new_conversation_id,
+)
+from mcp_client.intent_router import IntentRouter, RouteMatch, FORMAT_PROMPT
+from mcp_client.tool_encoding import render_markdown
+from mcp_client.llm_config import (
+    LLMOverloadedError, get_role_llm, get_scheduler, role_providers, role_stats, scheduler_stats,
+)
+from mcp_client.llm_resilience import resilience_stats
+from mcp_client.usage import AbandonStats, UsageCallback
+from mcp_client.metrics import REGISTRY, REQUEST_SECONDS, MetricsCallback, new_trace_id
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
@@ -26,7 +44,33 @@ logging.getLogger("mcp").setLevel(logging.WARNING)
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Banking Agent Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Long-lived MCP sessions shared by all requests
+    app.state.mcp_pool = MCPSessionPool.from_env()
+    app.state.tool_registry = ToolRegistry.from_env()
+    app.state.context = ContextManager.from_env()
+    app.state.conversations = ConversationStore.from_env()
+    await app.state.conversations.start()
+    app.state.agent_cache = AgentGraphCache(
+        tool_concurrency=int(os.getenv("AGENT_TOOL_CONCURRENCY", "4")),
+        tool_timeout=float(os.getenv("AGENT_TOOL_TIMEOUT", "30")),
+        context=app.state.context,
+        checkpointer=app.state.conversations.checkpointer,
+    )
+    app.state.intent_router = IntentRouter.from_env()
+    app.state.fast_path_llm = None  # created on first fast-path answer
+    app.state.abandoned = AbandonStats()
+    # Every provider some model role calls
+    app.state.llm_schedulers = [get_scheduler(provider) for provider in role_providers()]
+    await app.state.mcp_pool.start()
+    try:
+        yield
+    finally:
+        await app.state.mcp_pool.close()
+        await app.state.conversations.close()
+
+app = FastAPI(title="Banking Agent Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,24 +78,225 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "X-Conversation-Id"],
 )
 
-@app.post("/chat")
-async def chat(request: ChatRequest, session: ClientSession = Depends(get_mcp_session)):
-    async def event_generator():
+def _chunk_text(chunk) -> str:
+    """Text part of a streamed message chunk (some providers send content blocks)."""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+def _event(payload: dict) -> str:
+    return json.dumps(payload) + "\n"
+
+_END = object()
+
+async def _relay_until_disconnect(request: Request, events: AsyncIterator[str],
+                                  unwind_timeout: float = 5.0) -> AsyncIterator[str]:
+    """
+    Runs `events` (one answer) in its own task and relays them to the client.
+    When the client disconnects, the task is cancelled wherever it is, along
+    with the LLM requests and MCP tool calls it has in flight.
+
+    Starlette cancels a streaming response on disconnect too, but through an
+    anyio cancel scope that keeps cancelling: LangGraph's own cleanup (which
+    cancels running nodes) would be cancelled as well and the nodes left
+    running. A single cancel of our own task lets it unwind. The response,
+    and with it the MCP session, is only released once it has.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
         try:
-            # Discover Tools
-            logger.info("Discovering tools...")
-            tools_result = await session.list_tools()
-            mcp_tools = tools_result.tools
-            
-            # Convert to LangChain Tools
-            lc_tools = [convert_mcp_to_langchain_tool(t, session) for t in mcp_tools]
+            async for event in events:
+                queue.put_nowait(event)
+        finally:
+            queue.put_nowait(_END)
+
+    async def watch():
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+        producer.cancel()
+
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(watch())
+    try:
+        while (event := await queue.get()) is not _END:
+            yield event
+        if not producer.cancelled():
+            producer.result()
+    finally:
+        watcher.cancel()
+        producer.cancel()
+        # Wait out the unwinding even while Starlette's cancel scope keeps cancelling us
+        deadline = time.monotonic() + unwind_timeout
+        cancelled = False
+        while not producer.done() and time.monotonic() < deadline:
+            try:
+                await asyncio.wait({producer}, timeout=deadline - time.monotonic())
+            except asyncio.CancelledError:
+                cancelled = True
+        if not producer.done():
+            logger.warning(f"Abandoned answer still unwinding after {unwind_timeout:g}s")
+        if cancelled:
+            raise asyncio.CancelledError()
+
+async def _fast_path_events(app: FastAPI, request: ChatRequest, match: RouteMatch, tool, run_config: dict,
+                            usage: UsageCallback, agent):
+    """
+    Answers a routed single-tool intent: one MCP tool call, then either one
+    formatting LLM call (streamed as deltas) or the tool output rendered as
+    Markdown. The turn is appended to the conversation's graph state.
+    """
+    yield _event({"type": "status", "content": f"Fast path: calling {match.tool}"})
+    result = await tool.ainvoke(
+        {"type": "tool_call", "id": f"fast-path-{new_trace_id()}", "name": match.tool, "args": match.args},
+        config=run_config,
+    )
+    output = result.content
+
+    if app.state.intent_router.answer_format == "template":
+        content = render_markdown(result.artifact) if result.artifact else output
+    else:
+        if app.state.fast_path_llm is None:
+            app.state.fast_path_llm = get_role_llm("fast_path")
+        prompt = [
+            SystemMessage(content=FORMAT_PROMPT.format(tool_output=output)),
+            HumanMessage(content=request.message),
+        ]
+        content = ""
+        llm_config = {
+            "callbacks": run_config["callbacks"],
+            "metadata": {"stage": "fast_path", "trace_id": run_config["configurable"]["trace_id"]},
+        }
+        async for chunk in app.state.fast_path_llm.astream(prompt, config=llm_config):
+            text = _chunk_text(chunk)
+            if text:
+                content += text
+                if request.stream_tokens:
+                    yield _event({"type": "delta", "content": text})
+
+    steps = [{
+        "title": "Fast Path",
+        "content": f"Matched intent `{match.intent}` (confidence {match.confidence:.2f})\n\nCalled tool: {match.tool}",
+        "type": "plan",
+    }]
+    await agent.aupdate_state(
+        run_config, {"messages": [HumanMessage(content=request.message), AIMessage(content=content)]}, as_node="agent"
+    )
+    yield _event({
+        "type": "final",
+        "content": content,
+        "steps": steps,
+        "usage": usage.as_dict(),
+        "conversation_id": run_config["configurable"]["thread_id"],
+    })
+
+@app.get("/stats")
+async def stats(request: Request):
+    return {
+        "mcp_pool": request.app.state.mcp_pool.metrics(),
+        "agent": {
+            "tools_version": request.app.state.agent_cache.version,
+            "graph_builds": request.app.state.agent_cache.builds,
+        },
+        "fast_path": request.app.state.intent_router.stats.as_dict(),
+        "context": {
+            "token_budget": request.app.state.context.token_budget,
+            "node_budgets": request.app.state.context.node_budgets,
+            **request.app.state.context.stats.as_dict(),
+        },
+        "conversations": request.app.state.conversations.metrics(),
+        "tool_coalescing": {
+            "tools": sorted(request.app.state.tool_registry.coalesce_tools),
+            **request.app.state.tool_registry.flight.stats(),
+        },
+        "llm_scheduler": scheduler_stats(),
+        "llm_roles": role_stats(),
+        "llm_resilience": resilience_stats(),
+        "abandoned": request.app.state.abandoned.as_dict(),
+    }
 
-            # Create Agent
-            agent = create_agent_graph(lc_tools)
+@app.get("/metrics")
+async def metrics():
+    """Latency histograms in Prometheus text format."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
 
-            # Prepare Input
+async def admit_llm_request(request: Request):
+    """
+    Turns a chat request away with 429 before it takes an MCP session when
+    the queue of a provider it calls could not start its calls within the deadline.
+    """
+    try:
+        for scheduler in request.app.state.llm_schedulers:
+            scheduler.admit()
+    except LLMOverloadedError as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+
+@app.post("/chat", dependencies=[Depends(admit_llm_request)])
+async def chat(request: ChatRequest, http_request: Request, session: ClientSession = Depends(get_mcp_session)):
+    tool_registry: ToolRegistry = http_request.app.state.tool_registry
+    agent_cache: AgentGraphCache = http_request.app.state.agent_cache
+    router: IntentRouter = http_request.app.state.intent_router
+    context: ContextManager = http_request.app.state.context
+    conversations: ConversationStore = http_request.app.state.conversations
+    abandoned: AbandonStats = http_request.app.state.abandoned
+    # Carried to the MCP server on every tool call; callers may pass their own
+    trace_id = http_request.headers.get("x-trace-id") or new_trace_id()
+    # Graph state is checkpointed per conversation; later turns only send the new message.
+    # Ids of new conversations are always minted here, an unknown (or evicted) id starts a new one
+    owner = conversations.owner(request.conversation_id) if request.conversation_id else None
+    if owner is not None and owner != request.customer_id:
+        raise HTTPException(status_code=403, detail="Conversation belongs to another customer")
+    conversation_id = request.conversation_id if owner is not None else new_conversation_id()
+
+    async def answer(resumed: bool):
+        started = time.perf_counter()
+        route = "graph"
+        usage = UsageCallback()
+        try:
+            run_config = {
+                "configurable": {"mcp_session": session, "trace_id": trace_id, "thread_id": conversation_id},
+                "callbacks": [usage, MetricsCallback()],
+            }
+
+            # Discover Tools (cached per tool-set version)
+            tool_set = await tool_registry.get_tools(session)
+
+            # Reuse the compiled Agent for this tool-set version
+            agent = agent_cache.get(tool_set)
+
+            # Simple single-tool intents skip the planner/reflector loop
+            match = router.route(request.message, request.customer_id)
+            tool = next((t for t in tool_set.tools if t.name == match.tool), None) if match else None
+            if tool is not None:
+                route = "fast_path"
+                async for event in _fast_path_events(http_request.app, request, match, tool, run_config, usage, agent):
+                    yield event
+                router.stats.record_fast_path(match.intent, (time.perf_counter() - started) * 1000)
+                abandoned.record_answered(route, usage)
+                REQUEST_SECONDS.labels(route, "ok").observe(time.perf_counter() - started)
+                return
+
+            # Prepare Input: earlier turns come from the checkpoint (or, for a new
+            # conversation, the client's history) and are folded into a summary
+            # once they exceed the budget
+            if resumed:
+                state = (await agent.aget_state(run_config)).values
+                history = await context.fold(
+                    completed_turns(state.get("messages", [])),
+                    run_config,
+                    summary=state.get("history_summary"),
+                    folded_tokens=state.get("history_tokens_folded", 0),
+                )
+            else:
+                history = await context.prepare_history(request.history, run_config)
             system_prompt = f"""You are a helpful Banking Agent. Use a Plan-Execute-Reflect cycle to resolve queries.
             
             ### RULES & IDENTITY
@@ -61,24 +306,55 @@ async def chat(request: ChatRequest, session: ClientSession = Depends(get_mcp_se
             - **IDs:** Never expose internal raw IDs to the user.
             - **Consistency:** Always use the provided customer_id for tool calls.
             """
-            
-            messages = [SystemMessage(content=system_prompt)]
-            for msg in request.history:
-                if msg.get("role") == "user":
-                    messages.append(HumanMessage(content=msg.get("content")))
-                elif msg.get("role") == "assistant":
-                    messages.append(AIMessage(content=msg.get("content")))
-            
-            messages.append(HumanMessage(content=request.message))
+            if history.summary:
+                system_prompt += f"\n### EARLIER CONVERSATION (summary)\n{history.summary}\n"
+
+            messages = [SystemMessage(content=system_prompt), *history.messages, HumanMessage(content=request.message)]
+            if resumed:
+                # The restored messages are replaced by their folded form
+                messages.insert(0, RemoveMessage(id=REMOVE_ALL_MESSAGES))
 
             # Execute Agent with Streaming
-            logger.info("Streaming agent execution...")
+            # "messages" forwards LLM tokens as they are generated; answer tokens
+            # from the agent node go out as `delta`, planner/reflector tokens as `thought`.
+            logger.info(f"[{trace_id}] Streaming agent execution...")
+            stream_mode = ["updates", "messages"] if request.stream_tokens else ["updates"]
             steps = []
             final_response = ""
+            answer_streamed = False
             
-            async for chunk in agent.astream({"messages": messages}, stream_mode="updates"):
+            graph_input = {
+                "messages": messages,
+                "plan": None,
+                "steps_taken": [],
+                "reflections": [],
+                "history_summary": history.summary,
+                "history_tokens_folded": history.folded_tokens,
+            }
+            # Checkpoint once per turn rather than after every step
+            async for mode, chunk in agent.astream(
+                graph_input,
+                config=run_config,
+                stream_mode=stream_mode,
+                durability="exit",
+            ):
+                if mode == "messages":
+                    msg_chunk, metadata = chunk
+                    if not isinstance(msg_chunk, (AIMessage, AIMessageChunk)):
+                        continue
+                    text = _chunk_text(msg_chunk)
+                    if not text:
+                        continue
+                    node = metadata.get("langgraph_node")
+                    if node == "agent":
+                        answer_streamed = True
+                        yield json.dumps({"type": "delta", "content": text}) + "\n"
+                    elif node in ("planner", "reflector"):
+                        yield json.dumps({"type": "thought", "node": node, "content": text}) + "\n"
+                    continue
+
                 for node, data in chunk.items():
-                    logger.info(f"Node complete: {node}")
+                    logger.info(f"[{trace_id}] Node complete: {node}")
                     
                     if node == "planner":
                         plan = data.get("plan", "")
@@ -89,14 +365,19 @@ async def chat(request: ChatRequest, session: ClientSession = Depends(get_mcp_se
                     elif node == "agent":
                         msg = data.get("messages", [])[-1]
                         if msg.tool_calls:
-                            tool = msg.tool_calls[0]['name']
-                            status = f"Decided to call {tool}"
+                            if answer_streamed:
+                                # Text streamed this turn was preamble to a tool call, not the answer
+                                yield json.dumps({"type": "delta_reset"}) + "\n"
+                                answer_streamed = False
+                            tools = ", ".join(tc['name'] for tc in msg.tool_calls)
+                            status = f"Decided to call {tools}"
                             yield json.dumps({"type": "status", "content": status}) + "\n"
                         else:
                             final_response = msg.content
                     
                     elif node == "tools":
-                        status = "Executed banking tool"
+                        count = len(data.get("messages", []))
+                        status = "Executed banking tool" if count == 1 else f"Executed {count} banking tools"
                         yield json.dumps({"type": "status", "content": status}) + "\n"
                     
                     elif node == "reflector":
@@ -106,18 +387,58 @@ async def chat(request: ChatRequest, session: ClientSession = Depends(get_mcp_se
                         yield json.dumps({"type": "status", "content": status}) + "\n"
                         steps.append({"title": "Reflection", "content": f"{step}\n\n{ref}", "type": "reflection"})
 
+            router.stats.record_full_graph((time.perf_counter() - started) * 1000)
+            abandoned.record_answered(route, usage)
+            REQUEST_SECONDS.labels(route, "ok").observe(time.perf_counter() - started)
+
             # Final response
             yield json.dumps({
                 "type": "final", 
                 "content": final_response,
-                "steps": steps
+                "steps": steps,
+                "usage": usage.as_dict(),
+                "conversation_id": conversation_id,
             }) + "\n"
 
+        except asyncio.CancelledError:
+            # The client disconnected (see _relay_until_disconnect)
+            elapsed = time.perf_counter() - started
+            REQUEST_SECONDS.labels(route, "abandoned").observe(elapsed)
+            saved = abandoned.record_abandoned(route, usage)
+            logger.info(
+                f"[{trace_id}] Client disconnected after {elapsed:.2f}s: cancelled {saved['llm_cancelled']} LLM "
+                f"and {saved['tool_cancelled']} tool calls in flight, ~{saved['tokens']:.0f} tokens saved"
+            )
+            raise
         except Exception as e:
-            logger.exception("Error in streaming response")
+            logger.exception(f"[{trace_id}] Error in streaming response")
+            REQUEST_SECONDS.labels(route, "error").observe(time.perf_counter() - started)
             yield json.dumps({"type": "error", "content": str(e)}) + "\n"
 
-    return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+    async def event_generator():
+        try:
+            async with conversations.turn(conversation_id, request.customer_id) as resumed:
+                async for event in answer(resumed):
+                    yield event
+        except ConversationOwnershipError as e:
+            yield _event({"type": "error", "content": str(e)})
+
+    return StreamingResponse(
+        _relay_until_disconnect(http_request, event_generator()),
+        media_type="application/x-ndjson",
+        headers={"X-Trace-Id": trace_id, "X-Conversation-Id": conversation_id},
+    )
+
+@app.delete("/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str, customer_id: str, request: Request):
+    """Ends a conversation and deletes its checkpointed state."""
+    try:
+        deleted = await request.app.state.conversations.delete(conversation_id, customer_id)
+    except ConversationOwnershipError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {"deleted": conversation_id}
 
 if __name__ == "__main__":
     import uvicorn
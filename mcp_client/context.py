@@ -0,0 +1,314 @@
+"""
+Prompt Context Manager
+Keeps every LLM prompt within a per-provider token budget. Conversation
+history beyond the most recent turns is folded into a running summary
+(cached by conversation prefix, so each turn is summarized once), and
+inside the graph, bulky outputs of earlier tool batches are dropped first,
+then the oldest turns, when a prompt would exceed the budget.
+"""
+
+import os
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from mcp_client.metrics import CONTEXT_TOKENS_SAVED, get_trace_id
+
+logger = logging.getLogger(__name__)
+
+# Prompt budgets per LLM_PROVIDER, well inside each provider's usual context window
+DEFAULT_TOKEN_BUDGETS = {
+    "azure_openai": 16000,
+    "openai": 16000,
+    "gemini": 32000,
+    "ollama": 4000,
+    "fake": 4000,
+}
+
+SUMMARY_PROMPT = """Summarize the earlier conversation between a banking customer and their assistant.
+Keep facts the assistant may need later (accounts, amounts, dates, symbols, open requests) and drop small talk.
+If a previous summary is given, extend it. Answer in at most {max_words} words."""
+
+# Per-message overhead (role, separators) in the token estimate
+_MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Provider-independent estimate (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    tokens = estimate_tokens(content) + _MESSAGE_OVERHEAD
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += sum(estimate_tokens(f"{tc['name']}{tc['args']}") for tc in message.tool_calls)
+    return tokens
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+@dataclass
+class HistoryContext:
+    """Prompt-ready history: an optional summary of older turns plus the recent turns verbatim."""
+    messages: List[BaseMessage]
+    summary: Optional[str] = None
+    folded_tokens: int = 0  # history tokens replaced by the summary
+
+
+@dataclass
+class ContextStats:
+    """Prompt sizes before and after budgeting, and summary cache use."""
+    prompts: int = 0
+    trimmed_prompts: int = 0
+    prompt_tokens_in: int = 0
+    prompt_tokens_out: int = 0
+    tool_outputs_dropped: int = 0
+    turns_dropped: int = 0
+    histories_folded: int = 0
+    summaries_built: int = 0
+    summary_cache_hits: int = 0
+    saved_by_node: Dict[str, int] = field(default_factory=dict)
+
+    def record_prompt(self, node: str, tokens_in: int, tokens_out: int):
+        self.prompts += 1
+        self.prompt_tokens_in += tokens_in
+        self.prompt_tokens_out += tokens_out
+        saved = tokens_in - tokens_out
+        if saved > 0:
+            self.trimmed_prompts += 1
+            self.saved_by_node[node] = self.saved_by_node.get(node, 0) + saved
+            CONTEXT_TOKENS_SAVED.labels(node).inc(saved)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "prompts": self.prompts,
+            "trimmed_prompts": self.trimmed_prompts,
+            "prompt_tokens_in": self.prompt_tokens_in,
+            "prompt_tokens_out": self.prompt_tokens_out,
+            "prompt_tokens_saved": self.prompt_tokens_in - self.prompt_tokens_out,
+            "saved_by_node": dict(self.saved_by_node),
+            "tool_outputs_dropped": self.tool_outputs_dropped,
+            "turns_dropped": self.turns_dropped,
+            "histories_folded": self.histories_folded,
+            "summaries_built": self.summaries_built,
+            "summary_cache_hits": self.summary_cache_hits,
+        }
+
+
+class ContextManager:
+    """
+    Token budgeting for agent prompts.
+
+    `prepare_history` runs once per request: when the chat history exceeds
+    `history_share` of the budget, everything but the last `keep_turns`
+    turns is folded into a summary. Summaries are cached under a hash of
+    the history prefix they cover, so the next request of the same
+    conversation reuses them and only folds the turns added since.
+
+    `fit` runs before each LLM call in the graph and only changes prompts
+    that are over budget. `node_budgets` overrides the budget per node,
+    for nodes whose model has a smaller context window.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 16000,
+        keep_turns: int = 4,
+        history_share: float = 0.5,
+        summarizer: str = "llm",
+        cache_size: int = 256,
+        llm=None,
+        node_budgets: Optional[Dict[str, int]] = None,
+    ):
+        self.token_budget = token_budget
+        self.node_budgets = node_budgets or {}
+        self.keep_turns = keep_turns
+        self.history_budget = int(token_budget * history_share)
+        self.summarizer = summarizer
+        self.cache_size = cache_size
+        self.llm = llm
+        self.stats = ContextStats()
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "ContextManager":
+        from mcp_client.llm_config import ROLES, role_spec
+
+        budget = os.getenv("CONTEXT_TOKEN_BUDGET")
+        # Without an explicit budget, each node gets its role's provider budget
+        budgets = {role: DEFAULT_TOKEN_BUDGETS.get(role_spec(role).provider, 16000) for role in ROLES}
+        return cls(
+            token_budget=int(budget) if budget else budgets["agent"],
+            node_budgets=None if budget else {r: b for r, b in budgets.items() if b != budgets["agent"]},
+            keep_turns=int(os.getenv("CONTEXT_KEEP_TURNS", "4")),
+            history_share=float(os.getenv("CONTEXT_HISTORY_SHARE", "0.5")),
+            summarizer=os.getenv("CONTEXT_SUMMARIZER", "llm").lower(),
+            cache_size=int(os.getenv("CONTEXT_SUMMARY_CACHE_SIZE", "256")),
+        )
+
+    # History (once per request)
+
+    async def prepare_history(
+        self, history: List[Dict[str, str]], config: Optional[Dict[str, Any]] = None
+    ) -> HistoryContext:
+        """Folds a client-sent history ({"role", "content"} dicts)."""
+        turns: List[BaseMessage] = []
+        for msg in history:
+            if msg.get("role") == "user":
+                turns.append(HumanMessage(content=msg.get("content")))
+            elif msg.get("role") == "assistant":
+                turns.append(AIMessage(content=msg.get("content")))
+        return await self.fold(turns, config)
+
+    async def fold(
+        self,
+        turns: List[BaseMessage],
+        config: Optional[Dict[str, Any]] = None,
+        summary: Optional[str] = None,
+        folded_tokens: int = 0,
+    ) -> HistoryContext:
+        """
+        Folds earlier user/assistant messages into a summary once they exceed
+        the history budget. `summary` and `folded_tokens` carry an existing
+        summary of the turns before `turns` (restored conversations).
+        """
+        base_tokens = estimate_tokens(summary) if summary else 0
+        tokens = [message_tokens(m) for m in turns]
+        if base_tokens + sum(tokens) <= self.history_budget:
+            return HistoryContext(messages=turns, summary=summary, folded_tokens=folded_tokens)
+
+        # Recent turns stay verbatim, as long as they alone leave room for a summary
+        keep_from = max(0, len(turns) - self.keep_turns * 2)
+        while keep_from < len(turns) - 1 and sum(tokens[keep_from:]) > self.history_budget * 3 // 4:
+            keep_from += 1
+        if keep_from == 0:
+            # A single oversized turn; left to `fit`
+            return HistoryContext(messages=turns, summary=summary, folded_tokens=folded_tokens)
+        self.stats.histories_folded += 1
+
+        prefixes = _prefix_hashes(turns, summary)
+        cached_at = next((i for i in range(keep_from, 0, -1) if prefixes[i] in self._summaries), 0)
+        if cached_at:
+            summary = self._summaries[prefixes[cached_at]]
+            self._summaries.move_to_end(prefixes[cached_at])
+            self.stats.summary_cache_hits += 1
+
+        # Reuse the summary as-is while it and the turns after it still fit
+        over_budget = estimate_tokens(summary or "") + sum(tokens[cached_at:]) > self.history_budget
+        if summary is None or (over_budget and cached_at < keep_from):
+            summary = await self._summarize(summary, turns[cached_at:keep_from], config)
+            self._remember(prefixes[keep_from], summary)
+            self.stats.summaries_built += 1
+            cached_at = keep_from
+
+        folded = folded_tokens + base_tokens + sum(tokens[:cached_at]) - estimate_tokens(summary)
+        return HistoryContext(messages=turns[cached_at:], summary=summary, folded_tokens=max(0, folded))
+
+    def _remember(self, key: str, summary: str):
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.cache_size:
+            self._summaries.popitem(last=False)
+
+    async def _summarize(self, previous: Optional[str], turns: List[BaseMessage], config) -> str:
+        max_words = max(50, self.history_budget // 8)
+        transcript = "\n".join(
+            f"{'User' if isinstance(m, HumanMessage) else 'Assistant'}: {m.content}" for m in turns
+        )
+        if previous:
+            transcript = f"Previous summary: {previous}\n\n{transcript}"
+        if self.summarizer == "llm":
+            try:
+                if self.llm is None:
+                    from mcp_client.llm_config import get_role_llm
+                    self.llm = get_role_llm("summarizer")
+                response = await self.llm.ainvoke(
+                    [SystemMessage(content=SUMMARY_PROMPT.format(max_words=max_words)), HumanMessage(content=transcript)],
+                    config={
+                        "callbacks": (config or {}).get("callbacks"),
+                        "metadata": {"stage": "summarizer", "trace_id": get_trace_id(config)},
+                    },
+                )
+                return _truncate_words(response.content, max_words)
+            except Exception as e:
+                logger.warning(f"History summarization failed, using an extractive summary: {e}")
+        return _truncate_words(_extractive_summary(previous, turns), max_words)
+
+    # Graph prompts (before each LLM call)
+
+    def fit(self, messages: List[BaseMessage], node: str, folded_tokens: int = 0) -> List[BaseMessage]:
+        """
+        Returns `messages` within the token budget. Outputs of tool batches
+        the agent has already moved past are replaced with a stub first
+        (oldest first), then whole earlier turns are dropped. The latest
+        user message and everything after it are always kept.
+        `folded_tokens` is what history summarization already saved for
+        this prompt, counted in the stats.
+        """
+        budget = self.node_budgets.get(node, self.token_budget)
+        tokens_in = count_tokens(messages)
+        total = tokens_in
+        out = list(messages)
+
+        if total > budget:
+            last_batch = max((i for i, m in enumerate(out) if isinstance(m, AIMessage) and m.tool_calls), default=-1)
+            for i in range(last_batch):
+                if total <= budget:
+                    break
+                m = out[i]
+                if not isinstance(m, ToolMessage):
+                    continue
+                stub = m.model_copy(update={
+                    "content": f"[{m.name} output omitted to fit the context budget; see later reflections]"
+                })
+                saved = message_tokens(m) - message_tokens(stub)
+                if saved > 0:
+                    out[i] = stub
+                    total -= saved
+                    self.stats.tool_outputs_dropped += 1
+
+        if total > budget:
+            last_human = max((i for i, m in enumerate(out) if isinstance(m, HumanMessage)), default=0)
+            turn_start = next((i for i, m in enumerate(out) if isinstance(m, HumanMessage)), last_human)
+            while total > budget and turn_start < last_human:
+                # A turn runs up to the next user message, so tool calls leave with their outputs
+                turn_end = next(i for i in range(turn_start + 1, last_human + 1) if isinstance(out[i], HumanMessage))
+                total -= count_tokens(out[turn_start:turn_end])
+                del out[turn_start:turn_end]
+                last_human -= turn_end - turn_start
+                self.stats.turns_dropped += 1
+
+        if total > budget:
+            logger.warning(f"{node} prompt is {total} tokens after trimming (budget {budget})")
+        self.stats.record_prompt(node, tokens_in + folded_tokens, total)
+        return out
+
+
+def _prefix_hashes(turns: List[BaseMessage], summary: Optional[str] = None) -> List[str]:
+    """prefixes[i] identifies `summary` plus turns[:i]; each hash chains on the previous one."""
+    prefixes = [hashlib.sha1(summary.encode()).hexdigest() if summary else ""]
+    for m in turns:
+        h = hashlib.sha1(f"{prefixes[-1]}|{m.type}|{m.content}".encode()).hexdigest()
+        prefixes.append(h)
+    return prefixes
+
+
+def _extractive_summary(previous: Optional[str], turns: List[BaseMessage]) -> str:
+    """No-LLM fallback: the first sentence of each folded turn."""
+    lines = [previous] if previous else []
+    for m in turns:
+        first = m.content.strip().split("\n")[0].split(". ")[0]
+        lines.append(f"{'User' if isinstance(m, HumanMessage) else 'Assistant'}: {first}")
+    return " ".join(lines)
+
+
+def _truncate_words(text: str, max_words: int) -> str:
+    words = text.split()
+    return text.strip() if len(words) <= max_words else " ".join(words[:max_words]) + " ..."
@@ -0,0 +1,217 @@
+"""
+Conversation Store
+Server-side conversation state: the LangGraph checkpointer the agent graph
+is compiled with (in-memory by default, SQLite optional), plus ownership,
+LRU/TTL eviction of idle conversations, and per-conversation turn locking.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationOwnershipError(PermissionError):
+    """The conversation id belongs to another customer."""
+
+
+def new_conversation_id() -> str:
+    return uuid.uuid4().hex
+
+
+def completed_turns(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    User questions and final answers of a restored conversation. Tool
+    calls, tool outputs and system prompts of finished turns are left out:
+    the answers already carry what the customer was told.
+    """
+    return [
+        m for m in messages
+        if isinstance(m, HumanMessage) or (isinstance(m, AIMessage) and not m.tool_calls and m.content)
+    ]
+
+
+class ConversationStore:
+    """
+    Owns the checkpointer and decides how long conversations live.
+
+    Only the latest checkpoint of each conversation is kept (the graph runs
+    with durability="exit" and older checkpoints are pruned after each
+    turn). Conversations idle for longer than `ttl` seconds, or beyond the
+    `max_conversations` most recently used, are deleted.
+    """
+
+    def __init__(
+        self,
+        backend: str = "memory",
+        path: str = "conversations.db",
+        max_conversations: int = 1000,
+        ttl: float = 3600.0,
+    ):
+        self.backend = backend
+        self.path = path
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self.checkpointer = None
+        self._conn = None
+        # conversation id -> (customer id, last used), least recently used first
+        self._conversations: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        self.created = 0
+        self.resumed = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    @classmethod
+    def from_env(cls) -> "ConversationStore":
+        return cls(
+            backend=os.getenv("CONVERSATION_STORE", "memory").lower(),
+            path=os.getenv("CONVERSATION_DB_PATH", "conversations.db"),
+            max_conversations=int(os.getenv("CONVERSATION_MAX", "1000")),
+            ttl=float(os.getenv("CONVERSATION_TTL", "3600")),
+        )
+
+    async def start(self):
+        if self.backend == "sqlite":
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+            self._conn = await aiosqlite.connect(self.path)
+            self.checkpointer = AsyncSqliteSaver(self._conn)
+            await self.checkpointer.setup()
+            await self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations "
+                "(conversation_id TEXT PRIMARY KEY, customer_id TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            await self._conn.commit()
+            async with self._conn.execute(
+                "SELECT conversation_id, customer_id, last_used FROM conversations ORDER BY last_used"
+            ) as cursor:
+                async for conversation_id, customer_id, last_used in cursor:
+                    self._conversations[conversation_id] = (customer_id, last_used)
+            logger.info(f"Conversation store: SQLite at {self.path} ({len(self._conversations)} conversations)")
+        else:
+            if self.backend != "memory":
+                logger.warning(f"Unknown CONVERSATION_STORE '{self.backend}', using memory")
+                self.backend = "memory"
+            self.checkpointer = InMemorySaver()
+        await self._evict()
+
+    async def close(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    @asynccontextmanager
+    async def turn(self, conversation_id: str, customer_id: str) -> AsyncIterator[bool]:
+        """
+        Serializes turns of one conversation. Yields whether the conversation
+        already exists; on exit it is marked as used and its older
+        checkpoints are pruned.
+        """
+        await self._evict()
+        owner = self._conversations.get(conversation_id)
+        if owner is not None and owner[0] != customer_id:
+            raise ConversationOwnershipError("Conversation belongs to another customer")
+
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        async with lock:
+            # A new conversation is only owned once its first turn ends; that turn may have held the lock
+            owner = self._conversations.get(conversation_id)
+            if owner is not None and owner[0] != customer_id:
+                raise ConversationOwnershipError("Conversation belongs to another customer")
+            exists = owner is not None
+            if exists:
+                self.resumed += 1
+            else:
+                self.created += 1
+            try:
+                yield exists
+            finally:
+                await self._prune(conversation_id)
+                await self._touch(conversation_id, customer_id)
+        await self._evict()
+
+    def owner(self, conversation_id: str) -> Optional[str]:
+        """Customer id of a live conversation."""
+        entry = self._conversations.get(conversation_id)
+        return entry[0] if entry is not None else None
+
+    async def delete(self, conversation_id: str, customer_id: Optional[str] = None) -> bool:
+        owner = self._conversations.get(conversation_id)
+        if owner is None:
+            return False
+        if customer_id is not None and owner[0] != customer_id:
+            raise ConversationOwnershipError("Conversation belongs to another customer")
+        await self._drop(conversation_id)
+        return True
+
+    async def _touch(self, conversation_id: str, customer_id: str):
+        now = time.time()
+        self._conversations[conversation_id] = (customer_id, now)
+        self._conversations.move_to_end(conversation_id)
+        if self._conn is not None:
+            await self._conn.execute(
+                "INSERT OR REPLACE INTO conversations (conversation_id, customer_id, last_used) VALUES (?, ?, ?)",
+                (conversation_id, customer_id, now),
+            )
+            await self._conn.commit()
+
+    async def _prune(self, conversation_id: str):
+        """Re-saves the latest checkpoint alone, dropping the ones before it."""
+        config = {"configurable": {"thread_id": conversation_id, "checkpoint_ns": ""}}
+        latest = await self.checkpointer.aget_tuple(config)
+        if latest is None or latest.parent_config is None:
+            return
+        checkpoint = latest.checkpoint
+        await self.checkpointer.adelete_thread(conversation_id)
+        await self.checkpointer.aput(config, checkpoint, latest.metadata, checkpoint["channel_versions"])
+
+    async def _drop(self, conversation_id: str):
+        await self.checkpointer.adelete_thread(conversation_id)
+        self._conversations.pop(conversation_id, None)
+        lock = self._locks.get(conversation_id)
+        if lock is not None and not lock.locked():
+            del self._locks[conversation_id]
+        if self._conn is not None:
+            await self._conn.execute("DELETE FROM conversations WHERE conversation_id = ?", (conversation_id,))
+            await self._conn.commit()
+
+    async def _evict(self):
+        cutoff = time.time() - self.ttl
+        excess = len(self._conversations) - self.max_conversations
+        for conversation_id, (_, last_used) in list(self._conversations.items()):  # least recent first
+            idle = last_used < cutoff
+            if not idle and excess <= 0:
+                break
+            lock = self._locks.get(conversation_id)
+            if lock is not None and lock.locked():
+                continue  # a turn is in progress; it becomes most recent when it ends
+            await self._drop(conversation_id)
+            excess -= 1
+            if idle:
+                self.evicted_idle += 1
+            else:
+                self.evicted_lru += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "active": len(self._conversations),
+            "max_conversations": self.max_conversations,
+            "ttl_s": self.ttl,
+            "created": self.created,
+            "resumed": self.resumed,
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+        }
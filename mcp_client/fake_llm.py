@@ -0,0 +1,181 @@
+"""
+Scripted Chat Model
+An offline, deterministic stand-in for a real LLM provider (LLM_PROVIDER=fake),
+for local runs and load tests. It recognizes the planner, agent, reflector,
+history summary and fast-path formatting prompts, picks tool calls from
+keywords in the user's message, and answers from the tool outputs. Latency is configurable:
+`latency` seconds before the first token (the median, log-normally spread by
+`latency_sigma`), then `token_delay` per token. `rate_limit_rate` of calls
+fail with a 429 (FakeRateLimitError) to exercise the scheduler's retries, and
+`failure_rate` with a 503 (FakeProviderError) to exercise failover.
+Token usage is the context manager's estimate (about 4 characters per token).
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from mcp_client.context import count_tokens, message_tokens
+
+# (keywords in the user's message, tool, extra args); every matching rule becomes one tool call
+TOOL_RULES: List[Tuple[Tuple[str, ...], str, Dict[str, Any]]] = [
+    (("balance",), "check_balance", {}),
+    (("transaction", "history"), "get_recent_transactions", {}),
+    (("portfolio", "net worth", "total value"), "get_total_portfolio_value", {}),
+    (("spend", "spent"), "get_spending_summary", {"last_days": 90}),
+    (("account type", "what accounts"), "get_account_types", {}),
+    (("gold",), "get_gold_price", {}),
+    (("silver",), "get_silver_price", {}),
+]
+_SYMBOL = re.compile(r"\b[A-Z]{2,5}\b")
+_CUSTOMER = re.compile(r"\bC\d+\b")
+
+
+class FakeRateLimitError(Exception):
+    """What a provider SDK raises for HTTP 429."""
+
+    status_code = 429
+
+
+class FakeProviderError(Exception):
+    """What a provider SDK raises for HTTP 503."""
+
+    status_code = 503
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic chat model that plans, calls tools and answers without a network."""
+
+    model_name: str = "scripted"
+    temperature: float = 0.0
+    latency: float = 0.0
+    latency_sigma: float = 0.0
+    token_delay: float = 0.0
+    rate_limit_rate: float = 0.0
+    failure_rate: float = 0.0
+    tool_names: Optional[List[str]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        return self.model_copy(update={"tool_names": [getattr(t, "name", None) or t["name"] for t in tools]})
+
+    def _tool_calls(self, question: str, customer_id: str) -> List[Dict[str, Any]]:
+        text = question.lower()
+        calls = [
+            (tool, {"customer_id": customer_id, **args})
+            for keywords, tool, args in TOOL_RULES if any(k in text for k in keywords)
+        ]
+        symbols = [s for s in _SYMBOL.findall(question) if s not in ("I", "USD")]
+        if len(symbols) == 1:
+            calls.append(("get_stock_price", {"symbol": symbols[0]}))
+        elif symbols:
+            calls.append(("get_multiple_stock_prices", {"symbols": ",".join(symbols)}))
+        available = set(self.tool_names or ())
+        return [
+            {"name": name, "args": args, "id": f"call_{i}"}
+            for i, (name, args) in enumerate(calls) if name in available
+        ]
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        system = messages[0].content if messages and isinstance(messages[0].content, str) else ""
+        if "step-by-step plan" in system:
+            return AIMessage(content="1. Call the tools for the requested data. 2. Summarize the results.")
+        if "Analyze the recent tool outputs" in system:
+            return AIMessage(content="The tool outputs answer the question; no further tools are needed.")
+        if "Summarize the earlier conversation" in system:
+            transcript = messages[-1].content if isinstance(messages[-1].content, str) else ""
+            asked = [" ".join(line[5:].split()[:8]) for line in transcript.splitlines() if line.startswith("User:")]
+            return AIMessage(content="Earlier the customer asked: " + "; ".join(asked))
+
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        question = messages[last_human].content if last_human >= 0 else ""
+        if "Decide the next action" not in system:
+            # Fast-path formatting: the tool output is embedded in the system prompt
+            return AIMessage(content=f"Here is what I found for \"{question}\": {_last_line(system)}")
+
+        outputs = [m.content for m in messages[last_human + 1:] if isinstance(m, ToolMessage)]
+        if not outputs:
+            customer = _CUSTOMER.search(" ".join(m.content for m in messages if isinstance(m.content, str)))
+            tool_calls = self._tool_calls(question, customer.group(0) if customer else "C001")
+            if tool_calls:
+                return AIMessage(content="", tool_calls=tool_calls)
+            return AIMessage(content="I can help with balances, transactions, spending and market prices.")
+        return AIMessage(content="Here is what I found: " + " ".join(_last_line(o) for o in outputs))
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.rate_limit_rate and random.random() < self.rate_limit_rate:
+            raise FakeRateLimitError("Rate limit exceeded (scripted)")
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise FakeProviderError("Service unavailable (scripted)")
+        message = self._reply(messages)
+        prompt_tokens = count_tokens(messages)
+        completion_tokens = message_tokens(message)
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return message
+
+    def _first_token_delay(self) -> float:
+        if self.latency_sigma:
+            return self.latency * random.lognormvariate(0, self.latency_sigma)
+        return self.latency
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._respond(messages)
+        time.sleep(self._first_token_delay() + self.token_delay * len(message.content.split()))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay() + self.token_delay * len(message.content.split()))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._first_token_delay())
+        for chunk in _chunks(self._respond(messages)):
+            time.sleep(self.token_delay)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._first_token_delay())
+        for chunk in _chunks(self._respond(messages)):
+            await asyncio.sleep(self.token_delay)
+            yield chunk
+
+
+def _last_line(text: str) -> str:
+    lines = [line.strip("*#- ") for line in text.splitlines() if line.strip("*#- ")]
+    return lines[-1] if lines else ""
+
+
+def _chunks(message: AIMessage) -> Iterator[ChatGenerationChunk]:
+    # Usage rides on the last chunk, as providers that stream usage do
+    if message.tool_calls:
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            usage_metadata=message.usage_metadata,
+            tool_call_chunks=[
+                {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                for i, tc in enumerate(message.tool_calls)
+            ],
+        ))
+        return
+    words = message.content.split(" ")
+    for i, word in enumerate(words):
+        last = i == len(words) - 1
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content=word if last else word + " ",
+            usage_metadata=message.usage_metadata if last else None,
+        ))
@@ -0,0 +1,170 @@
+import os
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_TYPES = ("checking", "savings", "investment")
+
+# Words that do not look like tickers even when written in capitals
+_NON_TICKERS = {
+    "I", "A", "AN", "THE", "MY", "OF", "IS", "WHAT", "WHATS", "PRICE", "STOCK", "SHARE", "QUOTE",
+    "USD", "ME", "FOR", "NOW", "TODAY", "CURRENT", "PLEASE", "HOW", "MUCH", "DOES", "COST",
+}
+
+# Cues that the question needs planning (several steps, comparisons, advice, follow-ups)
+_COMPLEX_CUES = re.compile(
+    r"\b(and|also|plus|compare|comparison|versus|vs|why|should|if|then|after|before|transfer|"
+    r"transactions?|spent|spend|history|portfolio|it|that|them|those)\b"
+)
+
+_BALANCE = re.compile(r"\b(balance|balances|how much (money )?(do i have|is in|have i got))\b")
+_ACCOUNT_TYPES = re.compile(r"\b(account types|types of accounts?|which accounts|what accounts)\b")
+_GOLD = re.compile(r"\bgold\b")
+_SILVER = re.compile(r"\bsilver\b")
+_PRICE = re.compile(r"\b(price|prices|quote|trading|worth|cost|spot|rate)\b")
+_STOCK = re.compile(r"\b(stock|stocks|share|shares|ticker|quote|trading)\b")
+_TICKER = re.compile(r"\$?\b([A-Z]{1,5})\b")
+
+
+@dataclass
+class RouteMatch:
+    """A single-tool intent recognized without an LLM call."""
+    intent: str
+    tool: str
+    args: Dict[str, Any]
+    confidence: float
+
+
+@dataclass
+class FastPathStats:
+    """Hit rate and estimated latency saved by the fast path."""
+    queries: int = 0
+    hits: int = 0
+    fallbacks: int = 0
+    hits_by_intent: Dict[str, int] = field(default_factory=dict)
+    fast_path_ms_avg: float = 0.0
+    full_graph_ms_avg: float = 0.0
+    latency_saved_ms: float = 0.0
+
+    # Weight of the newest sample in the running averages
+    _alpha = 0.1
+
+    def _ewma(self, current: float, sample: float) -> float:
+        return sample if current == 0.0 else current + self._alpha * (sample - current)
+
+    def record_fast_path(self, intent: str, elapsed_ms: float):
+        self.hits += 1
+        self.hits_by_intent[intent] = self.hits_by_intent.get(intent, 0) + 1
+        self.fast_path_ms_avg = self._ewma(self.fast_path_ms_avg, elapsed_ms)
+        if self.full_graph_ms_avg:
+            self.latency_saved_ms += max(0.0, self.full_graph_ms_avg - elapsed_ms)
+
+    def record_full_graph(self, elapsed_ms: float):
+        self.fallbacks += 1
+        self.full_graph_ms_avg = self._ewma(self.full_graph_ms_avg, elapsed_ms)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(self.hits / self.queries, 4) if self.queries else 0.0,
+            "hits_by_intent": dict(self.hits_by_intent),
+            "fast_path_ms_avg": round(self.fast_path_ms_avg, 1),
+            "full_graph_ms_avg": round(self.full_graph_ms_avg, 1),
+            "latency_saved_ms": round(self.latency_saved_ms, 1),
+        }
+
+
+class IntentRouter:
+    """
+    Cheap pre-graph router based on keyword and pattern matching.
+
+    Simple single-tool questions (balance, account types, gold/silver price,
+    a single stock quote) are sent straight to the matching MCP tool instead
+    of the Plan-Execute-Reflect graph. Anything ambiguous scores below
+    `threshold` and falls back to the full graph.
+    """
+
+    def __init__(self, threshold: float = 0.8, answer_format: str = "llm", enabled: bool = True):
+        if answer_format not in ("llm", "template"):
+            raise ValueError(f"Unknown fast path answer format: {answer_format}")
+        self.threshold = threshold
+        self.answer_format = answer_format
+        self.enabled = enabled
+        self.stats = FastPathStats()
+
+    @classmethod
+    def from_env(cls) -> "IntentRouter":
+        return cls(
+            threshold=float(os.getenv("FAST_PATH_THRESHOLD", "0.8")),
+            answer_format=os.getenv("FAST_PATH_FORMAT", "llm").lower(),
+            enabled=os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def classify(self, message: str, customer_id: str) -> Optional[RouteMatch]:
+        """Returns the best single-tool match for `message`, or None."""
+        text = message.lower()
+        candidates: List[RouteMatch] = []
+
+        if _BALANCE.search(text):
+            mentioned = [t for t in ACCOUNT_TYPES if t in text]
+            account_type = mentioned[0] if len(mentioned) == 1 else "all"
+            confidence = 0.9 if len(mentioned) <= 1 else 0.4
+            candidates.append(RouteMatch("balance", "check_balance",
+                                         {"customer_id": customer_id, "account_type": account_type}, confidence))
+
+        if _ACCOUNT_TYPES.search(text):
+            candidates.append(RouteMatch("account_types", "get_account_types",
+                                         {"customer_id": customer_id}, 0.9))
+
+        gold, silver = bool(_GOLD.search(text)), bool(_SILVER.search(text))
+        if gold or silver:
+            confidence = 0.9 if _PRICE.search(text) else 0.6
+            if gold and silver:
+                candidates.append(RouteMatch("precious_metals", "get_precious_metals_prices", {}, confidence))
+            elif gold:
+                candidates.append(RouteMatch("gold_price", "get_gold_price", {}, confidence))
+            else:
+                candidates.append(RouteMatch("silver_price", "get_silver_price", {}, confidence))
+
+        if _STOCK.search(text) or _PRICE.search(text):
+            tickers = [t for t in _TICKER.findall(message) if t not in _NON_TICKERS]
+            if len(tickers) == 1 and not (gold or silver):
+                confidence = 0.9 if _STOCK.search(text) else 0.8
+                candidates.append(RouteMatch("stock_quote", "get_stock_price", {"symbol": tickers[0]}, confidence))
+
+        if not candidates:
+            return None
+
+        best = max(candidates, key=lambda c: c.confidence)
+        # Several competing intents or multi-step cues mean the planner is needed
+        if len(candidates) > 1:
+            best.confidence -= 0.5
+        # "gold and silver" is itself a single intent
+        if _COMPLEX_CUES.search(re.sub(r"\b(gold and silver|silver and gold)\b", "", text)):
+            best.confidence -= 0.4
+        if len(text.split()) > 20:
+            best.confidence -= 0.2
+        return best
+
+    def route(self, message: str, customer_id: str) -> Optional[RouteMatch]:
+        """Classifies and applies the confidence threshold; records the query."""
+        self.stats.queries += 1
+        if not self.enabled:
+            return None
+        match = self.classify(message, customer_id)
+        if match is None or match.confidence < self.threshold:
+            return None
+        logger.info(f"Fast path: {match.intent} -> {match.tool} (confidence {match.confidence:.2f})")
+        return match
+
+
+FORMAT_PROMPT = """You are a helpful Banking Agent. Answer the user's question using only the tool output below.
+Use Markdown tables for data. Be professional and concise. Never expose internal raw IDs to the user.
+
+Tool output:
+{tool_output}"""
@@ -1,50 +1,734 @@
+"""
+LLM Providers
+`get_llm` builds a chat model for a provider, wrapped so that every call
+(graph nodes, fast path, history summaries) goes through the provider's
+LLMScheduler: a bounded number of concurrent calls, an optional
+tokens-per-minute budget, a priority queue with a deadline, and retries
+with jittered backoff when the provider answers 429.
+
+Each role (planner, agent, reflector, summarizer, fast path) can use its
+own provider and model (`LLM_<ROLE>_MODEL`), e.g. a small local model for
+reflection and the large deployment for the answer; `get_role_llm` shares
+one client between roles with the same configuration. Calls, latency and
+token usage are kept per role (`role_stats`).
+"""
+
 import os
+import time
+import heapq
+import random
+import asyncio
 import logging
-from typing import Any
+import itertools
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.ai import UsageMetadata, add_usage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableBinding, RunnableConfig, ensure_config
+
+from mcp_client.context import count_tokens
+from mcp_client.metrics import (
+    LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS, LLM_RATE_LIMIT_RETRIES, LLM_REJECTED,
+)
 
 logger = logging.getLogger(__name__)
 
+PROVIDERS = ("azure_openai", "gemini", "ollama", "openai", "fake")
+
+# Concurrent calls per provider (LLM_CONCURRENCY overrides)
+DEFAULT_CONCURRENCY = {
+    "azure_openai": 8,
+    "openai": 8,
+    "gemini": 8,
+    "ollama": 2,
+    "fake": 16,
+}
+
+# Queue priority by graph node or call stage, lower first: calls that write
+# the answer go ahead of planning, history summaries and reflection
+CALL_PRIORITIES = {
+    "agent": 0,
+    "fast_path": 0,
+    "planner": 1,
+    "summarizer": 2,
+    "reflector": 3,
+}
+_DEFAULT_PRIORITY = 2
+
+# Model roles (graph nodes and call stages). Sampling temperature per role;
+# the graph nodes keep the temperature they always had
+ROLES = ("planner", "agent", "reflector", "summarizer", "fast_path")
+DEFAULT_ROLE_TEMPERATURES = {
+    "planner": 0.8,
+    "agent": 0.8,
+    "reflector": 0.8,
+    "summarizer": 0.0,
+    "fast_path": 0.0,
+}
+# The fast path writes answers, so it uses the agent's model settings unless set
+_ROLE_INHERITS = {"fast_path": "agent"}
+
+
+def current_provider() -> str:
+    """LLM_PROVIDER, with unknown values resolved the way `get_llm` does."""
+    provider = os.getenv("LLM_PROVIDER", "azure_openai").lower()
+    return provider if provider in PROVIDERS else "azure_openai"
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """Provider, model (None: the provider's configured default) and temperature of a role."""
+    provider: str
+    model: Optional[str] = None
+    temperature: float = 0.0
+
+
+def _role_setting(role: str, setting: str) -> Optional[str]:
+    """`LLM_<ROLE>_<SETTING>`; the fast path inherits the agent's."""
+    value = os.getenv(f"LLM_{role.upper()}_{setting}")
+    if not value and role in _ROLE_INHERITS:
+        value = os.getenv(f"LLM_{_ROLE_INHERITS[role].upper()}_{setting}")
+    return value
+
+
+def _parse_spec(value: str, setting: str, temperature: float) -> ModelSpec:
+    provider, _, model = value.partition("/")
+    provider = provider.strip().lower()
+    if provider not in PROVIDERS:
+        raise ValueError(f"{setting}: unknown provider '{provider}'")
+    return ModelSpec(provider, model.strip() or None, temperature)
+
+
+def role_spec(role: str) -> ModelSpec:
+    """
+    `LLM_<ROLE>_MODEL` as `provider` or `provider/model` (e.g. `ollama/llama3.2:1b`,
+    `azure_openai/gpt-4o-mini`), defaulting to LLM_PROVIDER and its model
+    setting; `LLM_<ROLE>_TEMPERATURE` overrides the role's temperature.
+    """
+    temperature = os.getenv(f"LLM_{role.upper()}_TEMPERATURE")
+    return _parse_spec(
+        _role_setting(role, "MODEL") or current_provider(),
+        f"LLM_{role.upper()}_MODEL",
+        float(temperature) if temperature else DEFAULT_ROLE_TEMPERATURES.get(role, 0.0),
+    )
+
+
+def fallback_spec(role: str) -> Optional[ModelSpec]:
+    """
+    The role's fallback for hedging and failover: `LLM_<ROLE>_FALLBACK`, else
+    LLM_FALLBACK_MODEL (same format as the model; `none` turns it off).
+    """
+    value = _role_setting(role, "FALLBACK") or os.getenv("LLM_FALLBACK_MODEL")
+    if not value or value.lower() == "none":
+        return None
+    primary = role_spec(role)
+    spec = _parse_spec(value, f"LLM_{role.upper()}_FALLBACK", primary.temperature)
+    return spec if spec != primary else None
+
+
+def role_providers() -> List[str]:
+    """Every provider some role calls."""
+    return sorted({role_spec(role).provider for role in ROLES})
+
+
+def _provider_setting(name: str, provider: str, default: float) -> float:
+    """
+    `NAME=8` applies to every provider, `NAME=azure_openai:8,ollama:2` to the
+    listed ones (fake model settings are keyed by fake model name instead).
+    """
+    value = os.getenv(name, "").strip()
+    if not value:
+        return default
+    if ":" not in value:
+        return float(value)
+    for item in value.split(","):
+        key, _, number = item.partition(":")
+        if key.strip().lower() == provider:
+            return float(number)
+    return default
+
+
+class LLMOverloadedError(RuntimeError):
+    """A provider's queue cannot start a call within the queue deadline."""
+
+    def __init__(self, provider: str, retry_after: float, message: Optional[str] = None):
+        super().__init__(message or f"LLM provider '{provider}' is overloaded, retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("role", "tokens", "future")
+
+    def __init__(self, role: str, tokens: int, future: asyncio.Future):
+        self.role = role
+        self.tokens = tokens
+        self.future = future
+
+
+class LLMScheduler:
+    """
+    Admission control for one provider.
+
+    At most `concurrency` calls run at once and, with `tpm` set, calls
+    start only while the tokens-per-minute bucket covers their estimate
+    (prompt tokens plus `completion_tokens`; corrected by the usage the
+    provider reports). Calls that cannot start wait in a priority queue
+    (CALL_PRIORITIES); within a priority, calls of the request that arrived
+    first go first, so a burst of new requests cannot starve ones already
+    half answered. A call still queued after `queue_deadline` seconds
+    fails with LLMOverloadedError, and `admit` turns away new requests
+    whose expected queue wait is already past the deadline.
+
+    Calls answered with 429 are retried up to `max_retries` times after a
+    jittered exponential backoff (or the provider's Retry-After), with
+    their slot released while they wait.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        concurrency: int = 8,
+        tpm: int = 0,
+        queue_deadline: float = 30.0,
+        completion_tokens: int = 512,
+        max_retries: int = 3,
+        retry_base: float = 0.5,
+        retry_max: float = 20.0,
+    ):
+        self.provider = provider
+        self.concurrency = max(1, concurrency)
+        self.tpm = tpm
+        self.queue_deadline = queue_deadline
+        self.completion_tokens = completion_tokens
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self._queue: List[Tuple[int, float, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._requests: "OrderedDict[str, float]" = OrderedDict()
+        self._tokens = float(tpm)
+        self._refilled_at = time.monotonic()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._service_time: Optional[float] = None
+
+        self.active = 0
+        self.waiting = 0
+        self.calls = 0
+        self.queued = 0
+        self.wait_total = 0.0
+        self.max_wait = 0.0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls, provider: str) -> "LLMScheduler":
+        return cls(
+            provider,
+            concurrency=int(_provider_setting("LLM_CONCURRENCY", provider, DEFAULT_CONCURRENCY.get(provider, 8))),
+            tpm=int(_provider_setting("LLM_TPM", provider, 0)),
+            queue_deadline=float(os.getenv("LLM_QUEUE_DEADLINE", "30")),
+            completion_tokens=int(os.getenv("LLM_COMPLETION_TOKENS", "512")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+            retry_base=float(os.getenv("LLM_RETRY_BASE", "0.5")),
+            retry_max=float(os.getenv("LLM_RETRY_MAX", "20")),
+        )
+
+    def estimate(self, messages: Sequence[BaseMessage]) -> int:
+        """Tokens reserved for a call: its prompt plus the expected completion."""
+        return count_tokens(messages) + self.completion_tokens
+
+    # Queue
+
+    def _arrival(self, trace_id: Optional[str]) -> float:
+        """When the request a call belongs to made its first call (calls without a trace rank as new)."""
+        now = time.monotonic()
+        if trace_id is None:
+            return now
+        arrived = self._requests.get(trace_id)
+        if arrived is None:
+            arrived = self._requests[trace_id] = now
+            while len(self._requests) > 4096:
+                self._requests.popitem(last=False)
+        return arrived
+
+    def _refill(self):
+        if not self.tpm:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.tpm, self._tokens + (now - self._refilled_at) * self.tpm / 60)
+        self._refilled_at = now
+
+    def _start(self, tokens: int):
+        self.active += 1
+        self._tokens -= tokens
+        LLM_IN_FLIGHT.labels(self.provider).set(self.active)
+
+    def _dispatch(self):
+        """Starts queued calls, best first, while there are free slots and tokens."""
+        self._refill()
+        while self._queue and self.active < self.concurrency:
+            waiter = self._queue[0][-1]
+            if waiter.future.done():  # timed out or cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            if self.tpm and waiter.tokens > self._tokens:
+                self._wake_in((waiter.tokens - self._tokens) * 60 / self.tpm)
+                break
+            heapq.heappop(self._queue)
+            self._start(waiter.tokens)
+            waiter.future.set_result(None)
+
+    def _wake_in(self, delay: float):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(max(delay, 0.01), self._dispatch)
+
+    async def acquire(self, role: str, trace_id: Optional[str], tokens: int) -> int:
+        """Waits for a slot (and tokens) for one call; returns the tokens reserved for it."""
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        priority = CALL_PRIORITIES.get(role, _DEFAULT_PRIORITY)
+        arrival = self._arrival(trace_id)
+        self.calls += 1
+        self._refill()
+        if not self.waiting and self.active < self.concurrency and (not self.tpm or tokens <= self._tokens):
+            self._start(tokens)
+            LLM_QUEUE_WAIT_SECONDS.labels(self.provider, role).observe(0)
+            return tokens
+
+        waiter = _Waiter(role, tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, (priority, arrival, next(self._seq), waiter))
+        # Nothing may be in flight to release a slot: arm the refill timer (or start it) now
+        self._dispatch()
+        self.queued += 1
+        self.waiting += 1
+        LLM_QUEUE_DEPTH.labels(self.provider).set(self.waiting)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_deadline)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            LLM_REJECTED.labels(self.provider, "queue_timeout").inc()
+            raise LLMOverloadedError(
+                self.provider, self.expected_wait(),
+                f"LLM provider '{self.provider}' queue wait exceeded {self.queue_deadline:g}s",
+            )
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(tokens)  # granted as the caller went away
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.waiting -= 1
+            self.wait_total += waited
+            self.max_wait = max(self.max_wait, waited)
+            LLM_QUEUE_DEPTH.labels(self.provider).set(self.waiting)
+            LLM_QUEUE_WAIT_SECONDS.labels(self.provider, role).observe(waited)
+        return tokens
+
+    def release(self, reserved: int, used: Optional[int] = None, service_time: Optional[float] = None):
+        """Frees a call's slot; `used` (reported tokens) settles its token reservation."""
+        self.active -= 1
+        LLM_IN_FLIGHT.labels(self.provider).set(self.active)
+        if self.tpm and used is not None:
+            self._tokens = min(self.tpm, self._tokens + reserved - used)
+        if service_time is not None:
+            previous = self._service_time
+            self._service_time = service_time if previous is None else 0.8 * previous + 0.2 * service_time
+        self._dispatch()
+
+    # Admission
+
+    def expected_wait(self) -> float:
+        """Rough queue wait of a call arriving now, from the backlog and the average call time."""
+        wait = 0.0
+        if self._service_time is not None and self.active + self.waiting >= self.concurrency:
+            wait = (self.waiting + 1) / self.concurrency * self._service_time
+        if self.tpm:
+            self._refill()
+            backlog = sum(w.tokens for *_, w in self._queue if not w.future.done())
+            deficit = backlog + self.completion_tokens - self._tokens
+            wait = max(wait, deficit * 60 / self.tpm)
+        return wait
+
+    def admit(self):
+        """Raises LLMOverloadedError when a new request's calls would wait past the queue deadline."""
+        wait = self.expected_wait()
+        if wait > self.queue_deadline:
+            self.rejected += 1
+            LLM_REJECTED.labels(self.provider, "admission").inc()
+            raise LLMOverloadedError(self.provider, wait - self.queue_deadline)
+
+    # Retries
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Full-jitter exponential backoff, at least the provider's Retry-After."""
+        self.retries += 1
+        LLM_RATE_LIMIT_RETRIES.labels(self.provider).inc()
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = min(self.retry_max, retry_after) + random.uniform(0, self.retry_base)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "concurrency": self.concurrency,
+            "tpm": self.tpm or None,
+            "tokens_available": round(self._tokens) if self.tpm else None,
+            "in_flight": self.active,
+            "queue_depth": self.waiting,
+            "calls": self.calls,
+            "queued": self.queued,
+            "avg_wait_ms": round(self.wait_total / self.queued * 1000, 1) if self.queued else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "expected_wait_s": round(self.expected_wait(), 2),
+            "avg_call_ms": round(self._service_time * 1000, 1) if self._service_time is not None else None,
+            "rejected": self.rejected,
+            "queue_timeouts": self.queue_timeouts,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+        }
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+
 
-def get_llm(temperature: float = 0):
+def get_scheduler(provider: str) -> LLMScheduler:
+    """The process-wide scheduler for a provider, configured from LLM_* environment variables."""
+    scheduler = _schedulers.get(provider)
+    if scheduler is None:
+        scheduler = _schedulers[provider] = LLMScheduler.from_env(provider)
+    return scheduler
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    return {provider: scheduler.stats() for provider, scheduler in _schedulers.items()}
+
+
+def _is_rate_limited(error: BaseException) -> bool:
+    """A 429 from any provider SDK: a status code on the error or its response, or a rate-limit error type."""
+    while error is not None:
+        status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+        if status == 429 or type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _result_usage(result: ChatResult) -> Optional[UsageMetadata]:
+    """Token usage of a ChatResult: message usage_metadata, else the provider's llm_output."""
+    for generation in result.generations:
+        usage = getattr(generation.message, "usage_metadata", None)
+        if usage:
+            return usage
+    reported = (result.llm_output or {}).get("token_usage")
+    if reported:
+        return {
+            "input_tokens": reported.get("prompt_tokens", 0),
+            "output_tokens": reported.get("completion_tokens", 0),
+            "total_tokens": reported.get("total_tokens", 0),
+        }
+    return None
+
+
+def _total(usage: Optional[UsageMetadata]) -> Optional[int]:
+    return usage.get("total_tokens", 0) if usage else None
+
+
+class _RoleRecord:
+    __slots__ = ("calls", "errors", "latencies", "prompt_tokens", "completion_tokens")
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.latencies: deque = deque(maxlen=window)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+
+class RoleStats:
+    """
+    LLM calls per role and model: call and error counts, latency
+    percentiles (queue wait and 429 retries included, over the last
+    `window` calls) and reported token usage.
+    """
+
+    def __init__(self, window: int = 512):
+        self.window = window
+        self._records: Dict[Tuple[str, str], _RoleRecord] = {}
+
+    def record(self, role: str, model: str, seconds: float, usage: Optional[UsageMetadata], ok: bool):
+        record = self._records.get((role, model))
+        if record is None:
+            record = self._records[(role, model)] = _RoleRecord(self.window)
+        record.calls += 1
+        if not ok:
+            record.errors += 1
+            return
+        record.latencies.append(seconds)
+        if usage:
+            record.prompt_tokens += usage.get("input_tokens", 0)
+            record.completion_tokens += usage.get("output_tokens", 0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        roles: Dict[str, Dict[str, Any]] = {}
+        for (role, model), record in self._records.items():
+            latencies = sorted(record.latencies)
+            ok = record.calls - record.errors
+
+            def pct(p: float) -> Optional[float]:
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+            roles.setdefault(role, {})[model] = {
+                "calls": record.calls,
+                "errors": record.errors,
+                "p50_ms": pct(0.5),
+                "p95_ms": pct(0.95),
+                "prompt_tokens": record.prompt_tokens,
+                "completion_tokens": record.completion_tokens,
+                "avg_prompt_tokens": round(record.prompt_tokens / ok) if ok else 0,
+                "avg_completion_tokens": round(record.completion_tokens / ok) if ok else 0,
+            }
+        return roles
+
+
+_role_stats = RoleStats()
+
+
+def role_stats() -> Dict[str, Any]:
+    return _role_stats.as_dict()
+
+
+def _call_context(config: RunnableConfig) -> Tuple[str, Optional[str]]:
+    """The calling graph node or stage, and the request's trace id, from the run config."""
+    metadata = config.get("metadata") or {}
+    trace_id = (config.get("configurable") or {}).get("trace_id") or metadata.get("trace_id")
+    return metadata.get("langgraph_node") or metadata.get("stage", "other"), trace_id
+
+
+def bind_model_tools(model: BaseChatModel, tools: Sequence[Any], **kwargs: Any) -> Tuple[BaseChatModel, Dict[str, Any]]:
+    """`model.bind_tools` as a model plus the provider-formatted call kwargs (tools) to pass with each call."""
+    bound = model.bind_tools(tools, **kwargs)
+    if isinstance(bound, RunnableBinding):
+        return bound.bound, dict(bound.kwargs)
+    return bound, {}
+
+
+class RoutedChatModel(BaseChatModel):
+    """
+    Base of the wrappers around provider models. The role and trace id of a
+    call come from the caller's config (inside the graph, the node's) and
+    are passed down to `_agenerate`/`_astream` as the `call_context` kwarg:
+    streamed calls never see their run manager.
+    """
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, *, stop=None, **kwargs: Any):
+        config = ensure_config(config)
+        return await super().ainvoke(input, config, stop=stop, call_context=_call_context(config), **kwargs)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, *, stop=None, **kwargs: Any):
+        config = ensure_config(config)
+        async for chunk in super().astream(input, config, stop=stop, call_context=_call_context(config), **kwargs):
+            yield chunk
+
+    @staticmethod
+    def _context(run_manager, kwargs: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        return kwargs.pop("call_context", None) or _call_context({"metadata": getattr(run_manager, "metadata", None)})
+
+
+class ScheduledChatModel(RoutedChatModel):
+    """Chat model wrapper that runs every call of `model` through its provider's LLMScheduler."""
+
+    model: BaseChatModel
+    provider: str
+    label: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return self.model._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        return self.model._get_ls_params(stop=stop, **kwargs)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        model, call_kwargs = bind_model_tools(self.model, tools, **kwargs)
+        if model is self.model:
+            # Provider-formatted tools become call kwargs, passed through to the model
+            return self.bind(**call_kwargs)
+        return self.model_copy(update={"model": model}).bind(**call_kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # The service only makes async calls; sync calls are not scheduled
+        kwargs.pop("call_context", None)
+        return self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        scheduler = get_scheduler(self.provider)
+        role, trace_id = self._context(run_manager, kwargs)
+        started = time.perf_counter()
+        for attempt in itertools.count():
+            reserved = await scheduler.acquire(role, trace_id, scheduler.estimate(messages))
+            called = time.perf_counter()
+            usage = delay = None
+            ok = cancelled = False
+            try:
+                result = await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                usage, ok = _result_usage(result), True
+                return result
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            except Exception as e:
+                delay = self._retry_delay(scheduler, attempt, e)
+            finally:
+                scheduler.release(reserved, _total(usage), time.perf_counter() - called if ok else None)
+                if delay is None and not cancelled:
+                    _role_stats.record(role, self.label, time.perf_counter() - started, usage, ok)
+            await asyncio.sleep(delay)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        scheduler = get_scheduler(self.provider)
+        role, trace_id = self._context(run_manager, kwargs)
+        started = time.perf_counter()
+        for attempt in itertools.count():
+            reserved = await scheduler.acquire(role, trace_id, scheduler.estimate(messages))
+            called = time.perf_counter()
+            usage = delay = None
+            ok = streamed = cancelled = False
+            try:
+                async for chunk in self.model._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    streamed = True
+                    if getattr(chunk.message, "usage_metadata", None):
+                        usage = add_usage(usage, chunk.message.usage_metadata)
+                    yield chunk
+                ok = True
+                return
+            except (asyncio.CancelledError, GeneratorExit):
+                cancelled = True
+                raise
+            except Exception as e:
+                if streamed:  # part of the answer is already out; not retryable
+                    raise
+                delay = self._retry_delay(scheduler, attempt, e)
+            finally:
+                scheduler.release(reserved, _total(usage), time.perf_counter() - called if ok else None)
+                if delay is None and not cancelled:
+                    _role_stats.record(role, self.label, time.perf_counter() - started, usage, ok)
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, scheduler: LLMScheduler, attempt: int, error: Exception) -> float:
+        """Backoff before retrying a rate-limited call; re-raises anything else."""
+        if not _is_rate_limited(error):
+            raise error
+        scheduler.rate_limited += 1
+        if attempt >= scheduler.max_retries:
+            raise error
+        delay = scheduler.backoff(attempt, error)
+        logger.warning(f"LLM provider '{self.provider}' rate limited, retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+
+def get_llm(temperature: float = 0, provider: Optional[str] = None, model: Optional[str] = None):
     """
     Get configured LLM based on environment variable LLM_PROVIDER.
     
     Args:
         temperature: Temperature setting for LLM (default: 0)
+        provider: Provider to use instead of LLM_PROVIDER
+        model: Model (Azure deployment) instead of the provider's configured one
         
     Returns:
-        Configured LLM instance
+        Configured LLM instance, scheduled per provider (see LLMScheduler)
         
     Supported providers:
         - azure_openai: Azure OpenAI (default)
         - gemini: Google Gemini
         - ollama: Ollama (local models)
         - openai: OpenAI
+        - fake: scripted offline model for local runs and load tests
     """
-    provider = os.getenv("LLM_PROVIDER", "azure_openai").lower()
+    provider = (provider or os.getenv("LLM_PROVIDER", "azure_openai")).lower()
     
     logger.info(f"Initializing LLM provider: {provider}")
     
     if provider == "azure_openai":
-        return _get_azure_openai(temperature)
+        llm = _get_azure_openai(temperature, model)
     elif provider == "gemini":
-        return _get_gemini(temperature)
+        llm = _get_gemini(temperature, model)
     elif provider == "ollama":
-        return _get_ollama(temperature)
+        llm = _get_ollama(temperature, model)
     elif provider == "openai":
-        return _get_openai(temperature)
+        llm = _get_openai(temperature, model)
+    elif provider == "fake":
+        llm = _get_fake(temperature, model)
     else:
         logger.warning(f"Unknown provider '{provider}', falling back to azure_openai")
-        return _get_azure_openai(temperature)
+        provider = "azure_openai"
+        llm = _get_azure_openai(temperature, model)
+    name = llm._get_ls_params().get("ls_model_name") or llm._llm_type
+    return ScheduledChatModel(model=llm, provider=provider, label=f"{provider}/{name}")
 
 
-def _get_azure_openai(temperature: float) -> Any:
+_role_clients: Dict[ModelSpec, ScheduledChatModel] = {}
+_role_models: Dict[Tuple[ModelSpec, Optional[ModelSpec]], BaseChatModel] = {}
+
+
+def _client(spec: ModelSpec) -> ScheduledChatModel:
+    llm = _role_clients.get(spec)
+    if llm is None:
+        llm = _role_clients[spec] = get_llm(spec.temperature, provider=spec.provider, model=spec.model)
+    return llm
+
+
+def get_role_llm(role: str) -> BaseChatModel:
+    """
+    The model configured for a role (see `role_spec`), with a deadline, a
+    circuit breaker and, with a `fallback_spec`, hedging and failover (see
+    llm_resilience). Roles with the same spec share one client.
+    """
+    from mcp_client.llm_resilience import ResiliencePolicy, ResilientChatModel
+
+    spec, fallback = role_spec(role), fallback_spec(role)
+    llm = _role_models.get((spec, fallback))
+    if llm is None:
+        llm = _role_models[(spec, fallback)] = ResilientChatModel(
+            primary=_client(spec),
+            fallback=_client(fallback) if fallback else None,
+            policy=ResiliencePolicy.from_env(),
+        )
+        backup = f", fallback {llm.fallback.label}" if fallback else ""
+        logger.info(f"LLM for {role}: {llm.label} (temperature {spec.temperature:g}){backup}")
+    return llm
+
+
+def _get_azure_openai(temperature: float, model: Optional[str] = None) -> Any:
     """Configure Azure OpenAI"""
     from langchain_openai import AzureChatOpenAI
     
     api_key = os.getenv("AZURE_OPENAI_API_KEY")
     endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+    deployment = model or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
     api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
     
     if not all([api_key, endpoint, deployment]):
@@ -64,12 +748,12 @@ def _get_azure_openai(temperature: float) -> Any:
     )
 
 
-def _get_gemini(temperature: float) -> Any:
+def _get_gemini(temperature: float, model: Optional[str] = None) -> Any:
     """Configure Google Gemini"""
     from langchain_google_genai import ChatGoogleGenerativeAI
     
     api_key = os.getenv("GOOGLE_API_KEY")
-    model = os.getenv("GEMINI_MODEL", "gemini-pro")
+    model = model or os.getenv("GEMINI_MODEL", "gemini-pro")
     
     if not api_key:
         raise ValueError("Google Gemini requires: GOOGLE_API_KEY")
@@ -83,12 +767,12 @@ def _get_gemini(temperature: float) -> Any:
     )
 
 
-def _get_ollama(temperature: float) -> Any:
+def _get_ollama(temperature: float, model: Optional[str] = None) -> Any:
     """Configure Ollama (local)"""
     from langchain_ollama import ChatOllama
     
     base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-    model = os.getenv("OLLAMA_MODEL", "llama2")
+    model = model or os.getenv("OLLAMA_MODEL", "llama2")
     
     logger.info(f"Using Ollama model: {model} at {base_url}")
     
@@ -99,12 +783,12 @@ def _get_ollama(temperature: float) -> Any:
     )
 
 
-def _get_openai(temperature: float) -> Any:
+def _get_openai(temperature: float, model: Optional[str] = None) -> Any:
     """Configure OpenAI"""
     from langchain_openai import ChatOpenAI
     
     api_key = os.getenv("OPENAI_API_KEY")
-    model = os.getenv("OPENAI_MODEL", "gpt-4")
+    model = model or os.getenv("OPENAI_MODEL", "gpt-4")
     
     if not api_key:
         raise ValueError("OpenAI requires: OPENAI_API_KEY")
@@ -116,3 +800,22 @@ def _get_openai(temperature: float) -> Any:
         openai_api_key=api_key,
         temperature=temperature,
     )
+
+
+def _get_fake(temperature: float, model: Optional[str] = None) -> Any:
+    """Configure the scripted offline model (FAKE_LLM_* settings can differ per fake model name)"""
+    from mcp_client.fake_llm import ScriptedChatModel
+
+    name = model or "scripted"
+    latency = _provider_setting("FAKE_LLM_LATENCY", name, 0)
+    latency_sigma = _provider_setting("FAKE_LLM_LATENCY_SIGMA", name, 0)
+    token_delay = _provider_setting("FAKE_LLM_TOKEN_DELAY", name, 0)
+    rate_limit_rate = _provider_setting("FAKE_LLM_RATE_LIMIT_RATE", name, 0)
+    failure_rate = _provider_setting("FAKE_LLM_FAILURE_RATE", name, 0)
+
+    logger.info(f"Using scripted fake model '{name}' (latency {latency}s, {token_delay}s per token)")
+
+    return ScriptedChatModel(
+        model_name=name, latency=latency, latency_sigma=latency_sigma, token_delay=token_delay,
+        rate_limit_rate=rate_limit_rate, failure_rate=failure_rate, temperature=temperature,
+    )
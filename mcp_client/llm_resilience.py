@@ -0,0 +1,409 @@
+"""
+LLM Resilience
+Deadlines, hedging and failover for LLM calls. Every role's model
+(llm_config.get_role_llm) is a ResilientChatModel around its scheduled
+client and, when one is configured, a fallback model (usually on another
+provider):
+
+- Every call has a deadline (LLM_CALL_DEADLINE) and is cancelled when it
+  passes.
+- When the primary has not answered (streamed calls: sent their first
+  chunk) within the hedge delay, the same call goes to the fallback as
+  well; the first answer wins and the other call is cancelled. The delay
+  is the primary's recent p95 latency (LLM_HEDGE_QUANTILE), so about one
+  call in twenty is sent twice.
+- A call whose primary fails (after the scheduler's 429 retries) fails
+  over to the fallback.
+- Each model has a circuit breaker: after consecutive failures the model
+  is skipped until a trial call succeeds.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from mcp_client.llm_config import LLMOverloadedError, RoutedChatModel, bind_model_tools
+from mcp_client.metrics import LLM_CIRCUIT_OPEN, LLM_DEADLINE_EXCEEDED, LLM_FAILOVERS, LLM_HEDGED
+
+logger = logging.getLogger(__name__)
+
+
+class LLMDeadlineError(TimeoutError):
+    """An LLM call did not finish within its deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Every model that could answer a call has an open circuit breaker."""
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    deadline: float = 60.0
+    hedge: bool = True
+    hedge_quantile: float = 0.95
+    hedge_min_delay: float = 0.25
+    hedge_initial_delay: float = 2.0
+    hedge_min_samples: int = 20
+    breaker_failures: int = 5
+    breaker_reset: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "ResiliencePolicy":
+        return cls(
+            deadline=float(os.getenv("LLM_CALL_DEADLINE", "60")),
+            hedge=os.getenv("LLM_HEDGE", "true").lower() == "true",
+            hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.95")),
+            hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.25")),
+            hedge_initial_delay=float(os.getenv("LLM_HEDGE_DELAY", "2")),
+            hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+            breaker_failures=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            breaker_reset=float(os.getenv("LLM_BREAKER_RESET", "30")),
+        )
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker for one model. After `failures` failed calls
+    in a row it opens and calls skip the model. `reset_timeout` seconds
+    later one trial call is let through (half-open); its outcome closes or
+    re-opens the breaker. Cancelled calls (hedge losers, callers that went
+    away) count as neither.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, model: str, failures: int = 5, reset_timeout: float = 30.0):
+        self.model = model
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._trial:
+            self._trial = True
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.model} closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial = False
+        LLM_CIRCUIT_OPEN.labels(self.model).set(0)
+
+    def failure(self):
+        self.consecutive_failures += 1
+        self._trial = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failures:
+            if self.state != self.OPEN:
+                self.opened += 1
+                logger.warning(f"Circuit for {self.model} opened after {self.consecutive_failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            LLM_CIRCUIT_OPEN.labels(self.model).set(1)
+
+    def abandon(self):
+        self._trial = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyWindow:
+    """The last `size` latencies of one model and call kind, for the hedge delay."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float:
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class ResilienceStats:
+    def __init__(self):
+        self.calls = 0
+        self.hedged = 0
+        self.hedges_won = 0  # by the fallback
+        self.failovers = 0
+        self.deadline_exceeded = 0
+        self.circuit_rejected = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedges_won_by_fallback": self.hedges_won,
+            "failovers": self.failovers,
+            "deadline_exceeded": self.deadline_exceeded,
+            "circuit_rejected": self.circuit_rejected,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[Tuple[str, str], LatencyWindow] = {}
+_stats = ResilienceStats()
+
+
+def get_breaker(model: str, policy: ResiliencePolicy) -> CircuitBreaker:
+    breaker = _breakers.get(model)
+    if breaker is None:
+        breaker = _breakers[model] = CircuitBreaker(model, policy.breaker_failures, policy.breaker_reset)
+    return breaker
+
+
+def latency_window(model: str, kind: str) -> LatencyWindow:
+    window = _latencies.get((model, kind))
+    if window is None:
+        window = _latencies[(model, kind)] = LatencyWindow()
+    return window
+
+
+def resilience_stats() -> Dict[str, Any]:
+    return {**_stats.as_dict(), "circuits": {model: b.stats() for model, b in _breakers.items()}}
+
+
+def _label(model: BaseChatModel) -> str:
+    return getattr(model, "label", None) or model._llm_type
+
+
+_END = object()
+
+
+class _Attempt:
+    __slots__ = ("index", "model", "breaker", "task", "started", "settled")
+
+    def __init__(self, index: int, model: str, breaker: CircuitBreaker, started: float):
+        self.index = index
+        self.model = model
+        self.breaker = breaker
+        self.task: Optional[asyncio.Task] = None
+        self.started = started
+        self.settled = False
+
+
+async def _pump(attempt: _Attempt, items: AsyncIterator[Any], queue: asyncio.Queue):
+    """Forwards one attempt's results (or stream chunks), then an end marker or its error."""
+    try:
+        async for item in items:
+            queue.put_nowait((attempt, item))
+        queue.put_nowait((attempt, _END))
+    except Exception as e:
+        queue.put_nowait((attempt, e))
+
+
+class ResilientChatModel(RoutedChatModel):
+    """Runs calls on `primary` with a deadline, hedging and failing over to `fallback` (see module doc)."""
+
+    primary: BaseChatModel
+    fallback: Optional[BaseChatModel] = None
+    primary_kwargs: Dict[str, Any] = {}
+    fallback_kwargs: Dict[str, Any] = {}
+    policy: ResiliencePolicy = ResiliencePolicy()
+
+    @property
+    def label(self) -> str:
+        return _label(self.primary)
+
+    @property
+    def _llm_type(self) -> str:
+        return self.primary._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.primary._identifying_params
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        return self.primary._get_ls_params(stop=stop, **kwargs)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ResilientChatModel":
+        # Each model formats the tools for its own provider
+        update: Dict[str, Any] = {}
+        update["primary"], update["primary_kwargs"] = bind_model_tools(self.primary, tools, **kwargs)
+        if self.fallback is not None:
+            update["fallback"], update["fallback_kwargs"] = bind_model_tools(self.fallback, tools, **kwargs)
+        return self.model_copy(update=update)
+
+    def hedge_delay(self, model: str, kind: str) -> float:
+        window = latency_window(model, kind)
+        if len(window) < self.policy.hedge_min_samples:
+            return self.policy.hedge_initial_delay
+        return max(self.policy.hedge_min_delay, window.quantile(self.policy.hedge_quantile))
+
+    async def _race(
+        self, kind: str, role: str, run: Callable[[BaseChatModel, Dict[str, Any]], AsyncIterator[Any]],
+    ) -> AsyncIterator[Any]:
+        """
+        Yields the items of the first model to produce one: the result, or
+        the chunks of a stream. `kind` ("invoke" or "stream") keeps the
+        latencies of whole answers and of first chunks apart.
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.policy.deadline
+        queue: asyncio.Queue = asyncio.Queue()
+        pending = [(self.primary, self.primary_kwargs)]
+        if self.fallback is not None:
+            pending.append((self.fallback, self.fallback_kwargs))
+        attempts: List[_Attempt] = []
+        _stats.calls += 1
+
+        def start_next() -> bool:
+            while pending:
+                model, model_kwargs = pending.pop(0)
+                breaker = get_breaker(_label(model), self.policy)
+                if not breaker.allow():
+                    continue
+                attempt = _Attempt(len(attempts), _label(model), breaker, loop.time())
+                attempt.task = asyncio.ensure_future(_pump(attempt, run(model, model_kwargs), queue))
+                attempts.append(attempt)
+                return True
+            return False
+
+        def running() -> List[_Attempt]:
+            return [a for a in attempts if not a.settled]
+
+        def deadline_exceeded() -> LLMDeadlineError:
+            _stats.deadline_exceeded += 1
+            LLM_DEADLINE_EXCEEDED.labels(role).inc()
+            for a in running():
+                a.settled = True
+                a.breaker.failure()
+            return LLMDeadlineError(f"LLM call ({role}) exceeded its {self.policy.deadline:g}s deadline")
+
+        try:
+            if not start_next():
+                _stats.circuit_rejected += 1
+                raise CircuitOpenError(f"No LLM available for {role}: circuit open for {self.label}")
+            if attempts[0].model != self.label:
+                _stats.failovers += 1
+                LLM_FAILOVERS.labels(role, "circuit_open").inc()
+            hedged = False
+            hedge_at = None
+            if self.policy.hedge and pending:
+                hedge_at = loop.time() + self.hedge_delay(attempts[0].model, kind)
+
+            # First item: hedge after the delay, fail over on errors
+            while True:
+                timeout = deadline_at - loop.time()
+                if hedge_at is not None:
+                    timeout = min(timeout, hedge_at - loop.time())
+                try:
+                    attempt, item = await asyncio.wait_for(queue.get(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    if loop.time() >= deadline_at:
+                        raise deadline_exceeded()
+                    hedge_at = None
+                    if start_next():
+                        hedged = True
+                        _stats.hedged += 1
+                    continue
+                if item is _END or isinstance(item, Exception):
+                    attempt.settled = True
+                    error = item if isinstance(item, Exception) else RuntimeError(f"{attempt.model} returned nothing")
+                    if isinstance(error, LLMOverloadedError):
+                        attempt.breaker.abandon()  # our own queue, not the provider
+                    else:
+                        attempt.breaker.failure()
+                    if running():
+                        continue
+                    hedge_at = None
+                    if start_next():
+                        _stats.failovers += 1
+                        LLM_FAILOVERS.labels(role, "error").inc()
+                        logger.warning(f"LLM call ({role}) failed on {attempt.model}, failing over: {error}")
+                        continue
+                    raise error
+                break
+
+            winner = attempt
+            winner.settled = True
+            winner.breaker.success()
+            latency_window(winner.model, kind).add(loop.time() - winner.started)
+            for loser in running():
+                # Hedge losers count with the time they ran, so their slow tail keeps the delay honest
+                loser.settled = True
+                loser.task.cancel()
+                loser.breaker.abandon()
+                latency_window(loser.model, kind).add(loop.time() - loser.started)
+            if hedged:
+                winner_name = "primary" if winner.index == 0 else "fallback"
+                LLM_HEDGED.labels(role, winner_name).inc()
+                if winner_name == "fallback":
+                    _stats.hedges_won += 1
+            yield item
+
+            # The rest of the winner's stream
+            while True:
+                try:
+                    attempt, item = await asyncio.wait_for(queue.get(), max(deadline_at - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    raise deadline_exceeded()
+                if attempt is not winner:
+                    continue
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    winner.breaker.failure()
+                    raise item
+                yield item
+        finally:
+            for a in attempts:
+                if not a.task.done():
+                    a.task.cancel()
+                if not a.settled:
+                    a.breaker.abandon()
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self.primary._generate(messages, stop=stop, run_manager=run_manager, **{**self.primary_kwargs, **kwargs})
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        role = kwargs.get("call_context", ("other", None))[0]
+
+        async def once(model: BaseChatModel, model_kwargs: Dict[str, Any]):
+            yield await model._agenerate(messages, stop=stop, **{**model_kwargs, **kwargs})
+
+        async with aclosing(self._race("invoke", role, once)) as results:
+            async for result in results:
+                return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        role = kwargs.get("call_context", ("other", None))[0]
+
+        def stream(model: BaseChatModel, model_kwargs: Dict[str, Any]):
+            return model._astream(messages, stop=stop, **{**model_kwargs, **kwargs})
+
+        async with aclosing(self._race("stream", role, stream)) as chunks:
+            async for chunk in chunks:
+                yield chunk
@@ -1,30 +1,273 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, AsyncGenerator
-from fastapi import HTTPException
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncGenerator, AsyncIterator, FrozenSet, List, Optional, Set, Tuple
+from fastapi import HTTPException, Request
 from pydantic import Field, create_model
 from mcp import ClientSession
 from mcp.client.sse import sse_client
-from mcp.types import CallToolResult, Tool as McpToolDef
+from mcp.types import (
+    CallToolResult, CancelledNotification, CancelledNotificationParams, ClientNotification, Tool as McpToolDef,
+)
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool
 
+from mcp_common.singleflight import SingleFlight, call_key, coalesce_tools_from_env
+from mcp_client.tool_encoding import encode_result, encoding_from_env, structured_payload
+from mcp_client.metrics import (
+    POOL_WAIT_SECONDS, SESSION_SETUP_SECONDS, TOOL_COALESCED, TOOL_SECONDS, get_trace_id,
+)
+
 logger = logging.getLogger(__name__)
 
+
+class _PooledConnection:
+    """
+    A single long-lived MCP session.
+    The SSE transport is opened and closed by a dedicated background task so
+    its cancel scopes never cross task boundaries, which lets any request
+    task trigger a reconnect.
+    """
+
+    def __init__(self, url: str, index: int):
+        self.url = url
+        self.index = index
+        self.session: Optional[ClientSession] = None
+        self.last_used = 0.0
+        self.broken = False
+        self.users = 0  # requests currently sharing the session
+        self.lock = asyncio.Lock()  # one health check or reconnect at a time
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: Optional[BaseException] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def open(self, timeout: float):
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error = None
+        self.broken = False
+        self._task = asyncio.create_task(self._run(), name=f"mcp-session-{self.index}")
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            SESSION_SETUP_SECONDS.labels("timeout").observe(time.perf_counter() - started)
+            await self.close()
+            raise ConnectionError(f"Timed out connecting to MCP Server at {self.url}")
+        if self._error is not None:
+            SESSION_SETUP_SECONDS.labels("error").observe(time.perf_counter() - started)
+            await self.close()
+            raise ConnectionError(f"Failed to connect to MCP Server: {self._error}")
+        SESSION_SETUP_SECONDS.labels("ok").observe(time.perf_counter() - started)
+        self.last_used = time.monotonic()
+
+    async def _run(self):
+        try:
+            async with sse_client(self.url) as (read, write):
+                async with CancellingClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+            if self.session is not None:
+                logger.warning(f"MCP session {self.index} dropped: {e}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._closing.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), 5)
+        except Exception:
+            self._task.cancel()
+        self._task = None
+        self.session = None
+
+    async def ping(self, timeout: float) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP session {self.index} failed health check: {e}")
+            return False
+
+
+class MCPSessionPool:
+    """
+    Fixed-size pool of long-lived MCP client sessions, shared by all requests.
+
+    An MCP session multiplexes concurrent requests (responses are matched by
+    request id), so checking one out does not take it exclusively: a request
+    gets the session with the fewest requests on it (ties go round-robin)
+    and keeps it for its whole turn, LLM calls included. Connections are
+    opened lazily, pinged before reuse once they have been idle longer than
+    `health_check_interval`, and transparently reopened when the MCP server
+    goes away (e.g. restarts); a request waits at most `acquire_timeout` for
+    its session to (re)connect.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        size: int = 4,
+        acquire_timeout: float = 10.0,
+        connect_timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+    ):
+        self.url = url
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+
+        self._connections: List[_PooledConnection] = [_PooledConnection(url, i) for i in range(max(1, size))]
+        self._next = 0
+
+        self.in_use = 0
+        self.waiting = 0
+        self.reconnects = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.failed_health_checks = 0
+
+    @classmethod
+    def from_env(cls) -> "MCPSessionPool":
+        """Build a pool from MCP_* environment variables."""
+        return cls(
+            url=os.getenv("MCP_SERVER_URL", "http://localhost:8001/sse"),
+            size=int(os.getenv("MCP_POOL_SIZE", "4")),
+            acquire_timeout=float(os.getenv("MCP_POOL_ACQUIRE_TIMEOUT", "10")),
+            connect_timeout=float(os.getenv("MCP_POOL_CONNECT_TIMEOUT", "10")),
+            health_check_interval=float(os.getenv("MCP_POOL_HEALTH_CHECK_INTERVAL", "30")),
+        )
+
+    async def start(self):
+        """Eagerly open one connection so misconfiguration shows up at startup."""
+        logger.info(f"Starting MCP session pool (size={self.size}) for {self.url}")
+        conn = self._connections[0]
+        async with conn.lock:
+            try:
+                await conn.open(self.connect_timeout)
+            except ConnectionError as e:
+                logger.warning(f"MCP Server not reachable yet, will connect on demand: {e}")
+
+    async def close(self):
+        logger.info("Closing MCP session pool")
+        await asyncio.gather(*(conn.close() for conn in self._connections), return_exceptions=True)
+
+    async def _ensure_healthy(self, conn: _PooledConnection):
+        # Caller holds conn.lock
+        if conn.alive and not conn.broken:
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for < self.health_check_interval or await conn.ping(self.connect_timeout):
+                return
+            self.failed_health_checks += 1
+
+        reconnect = conn.session is not None or conn.broken or conn._task is not None
+        await conn.close()
+        await conn.open(self.connect_timeout)
+        if reconnect:
+            self.reconnects += 1
+            logger.info(f"Reconnected MCP session {conn.index}")
+
+    def _pick(self) -> _PooledConnection:
+        """The least shared connection, starting the search after the last one picked."""
+        n = len(self._connections)
+        start = self._next
+        conn = min(
+            (self._connections[(start + i) % n] for i in range(n)),
+            key=lambda c: c.users,
+        )
+        self._next = (conn.index + 1) % n
+        return conn
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[ClientSession]:
+        """A healthy session, shared with other requests, for the duration of the block."""
+        conn = self._pick()
+        conn.users += 1
+        failed = False
+        try:
+            self.waiting += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(conn.lock.acquire(), self.acquire_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise TimeoutError("Timed out waiting for an MCP session")
+            finally:
+                self.waiting -= 1
+            try:
+                await self._ensure_healthy(conn)
+            except ConnectionError:
+                conn.broken = True
+                raise
+            finally:
+                conn.lock.release()
+                POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+            self.in_use += 1
+            self.checkouts += 1
+            try:
+                yield conn.session
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self.in_use -= 1
+        finally:
+            conn.users -= 1
+            # A session that saw an error mid-request is pinged on its next checkout
+            conn.last_used = 0.0 if failed else time.monotonic()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "connected": sum(1 for c in self._connections if c.alive),
+            "in_use": self.in_use,
+            "idle": sum(1 for c in self._connections if not c.users),
+            "max_shared": max(c.users for c in self._connections),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "reconnects": self.reconnects,
+            "acquire_timeouts": self.timeouts,
+            "failed_health_checks": self.failed_health_checks,
+        }
+
+
 # Dependency for MCP Session
-async def get_mcp_session() -> AsyncGenerator[ClientSession, None]:
+async def get_mcp_session(request: Request) -> AsyncGenerator[ClientSession, None]:
     """
-    Creates a fresh MCP session for each request.
-    Connects via SSE to the standalone MCP server.
+    A pooled MCP session (shared with concurrent requests) for the duration
+    of the request. The pool is owned by the app lifespan (see agent_service).
     """
-    mcp_url = "http://localhost:8001/sse"
-    logger.info(f"Connecting to MCP Server at {mcp_url}...")
-    
+    pool: MCPSessionPool = request.app.state.mcp_pool
+    acquired = False
     try:
-        async with sse_client(mcp_url) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                yield session
-    except Exception as e:
-        logger.error(f"Failed to connect to MCP Server: {e}")
+        async with pool.session() as session:
+            acquired = True
+            yield session
+    except (ConnectionError, TimeoutError) as e:
+        if acquired:
+            raise
+        logger.error(f"Failed to acquire MCP session: {e}")
         raise HTTPException(status_code=503, detail="MCP Server unavailable")
 
 def _create_pydantic_model_from_schema(name: str, schema: Dict[str, Any]) -> Any:
@@ -51,30 +294,93 @@ def _create_pydantic_model_from_schema(name: str, schema: Dict[str, Any]) -> Any
     
     return create_model(f"{name}Schema", **fields)
 
-def convert_mcp_to_langchain_tool(mcp_tool: McpToolDef, session: ClientSession) -> StructuredTool:
+def get_session_from_config(config: RunnableConfig) -> ClientSession:
+    """Returns the MCP session passed to the graph run via config["configurable"]."""
+    session = (config or {}).get("configurable", {}).get("mcp_session")
+    if session is None:
+        raise RuntimeError("No MCP session in run config (expected configurable.mcp_session)")
+    return session
+
+# Cancellation notices in flight (the event loop only keeps weak references to tasks)
+_notices: Set[asyncio.Task] = set()
+
+
+class CancellingClientSession(ClientSession):
+    """
+    ClientSession that, when the caller of a request is cancelled (client
+    gone, tool timeout), sends the server `notifications/cancelled` for it so
+    the server stops working on it instead of running it to completion.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The request id counter is not public API; mcp is pinned to versions that have it
+        if not isinstance(getattr(self, "_request_id", None), int):
+            raise RuntimeError("Unsupported mcp version: ClientSession has no _request_id counter")
+
+    async def send_request(self, request, result_type, *args, **kwargs):
+        # BaseSession.send_request takes this id before its first await, so it is the one sent
+        request_id = self._request_id
+        try:
+            return await super().send_request(request, result_type, *args, **kwargs)
+        except asyncio.CancelledError:
+            notice = ClientNotification(CancelledNotification(
+                params=CancelledNotificationParams(requestId=request_id, reason="Caller cancelled"),
+            ))
+            # Sent from its own task: the cancelled caller must not wait on it
+            task = asyncio.ensure_future(self.send_notification(notice))
+            _notices.add(task)
+            task.add_done_callback(_notices.discard)
+            raise
+
+def convert_mcp_to_langchain_tool(
+    mcp_tool: McpToolDef, flight: Optional[SingleFlight] = None, encoding: str = "compact"
+) -> StructuredTool:
     """
     Converts an MCP Tool definition into a LangChain StructuredTool.
-    Wraps the MCP session.call_tool method.
+    The MCP session is resolved from the run config at call time, so one
+    tool instance (and one compiled graph) can serve every request. The
+    request's trace id travels to the server in the call's `_meta`.
+    With a `flight`, identical concurrent calls (from any request) share
+    one server round trip. A cancelled call is cancelled on the server too
+    (see CancellingClientSession).
+
+    The tool's content is the result in the given `encoding` (see
+    tool_encoding); its artifact is the structured content, if any.
     """
-    async def _tool_func(**kwargs) -> str:
-        logger.info(f"Executing MCP Tool: {mcp_tool.name} with args: {kwargs}")
+    async def _tool_func(config: RunnableConfig, **kwargs) -> Tuple[str, Optional[Dict[str, Any]]]:
+        trace_id = get_trace_id(config)
+        logger.info(f"[{trace_id}] Executing MCP Tool: {mcp_tool.name} with args: {kwargs}")
+        started = time.perf_counter()
         try:
-            result: CallToolResult = await session.call_tool(mcp_tool.name, arguments=kwargs)
-            output = ""
-            for content in result.content:
-                if content.type == "text":
-                    output += content.text
-                elif content.type == "image":
-                     output += "[Image Content]"
-                elif content.type == "resource":
-                     output += f"[Resource: {content.uri}]"
+            session = get_session_from_config(config)
+            # Unset optional args are left to the server-side defaults
+            arguments = {k: v for k, v in kwargs.items() if v is not None}
+            meta = {"trace_id": trace_id} if trace_id else None
+            call = lambda: session.call_tool(mcp_tool.name, arguments=arguments, meta=meta)
+            if flight is None:
+                result: CallToolResult = await call()
+            else:
+                result, shared = await flight.do(call_key(mcp_tool.name, arguments), call)
+                if shared:
+                    TOOL_COALESCED.labels(mcp_tool.name).inc()
+                    logger.info(f"[{trace_id}] Tool {mcp_tool.name} joined an identical call in flight")
+            TOOL_SECONDS.labels(mcp_tool.name, "error" if result.isError else "ok").observe(
+                time.perf_counter() - started
+            )
+            output = encode_result(result, encoding)
             logger.info("="*50)
-            logger.info(f"Tool {mcp_tool.name} || Output: {output}")
+            logger.info(f"[{trace_id}] Tool {mcp_tool.name} || Output: {output}")
             logger.info("="*50)
-            return output
+            return output, structured_payload(result)
+        except asyncio.CancelledError:
+            TOOL_SECONDS.labels(mcp_tool.name, "cancelled").observe(time.perf_counter() - started)
+            logger.info(f"[{trace_id}] Tool {mcp_tool.name} cancelled")
+            raise
         except Exception as e:
-            logger.error(f"Error executing tool {mcp_tool.name}: {e}")
-            return f"Error executing tool: {str(e)}"
+            TOOL_SECONDS.labels(mcp_tool.name, "error").observe(time.perf_counter() - started)
+            logger.error(f"[{trace_id}] Error executing tool {mcp_tool.name}: {e}")
+            return f"Error executing tool: {str(e)}", None
 
     schema = _create_pydantic_model_from_schema(mcp_tool.name, mcp_tool.inputSchema)
     
@@ -83,5 +389,82 @@ def convert_mcp_to_langchain_tool(mcp_tool: McpToolDef, session: ClientSession)
         coroutine=_tool_func,
         name=mcp_tool.name,
         description=mcp_tool.description,
-        args_schema=schema
+        args_schema=schema,
+        response_format="content_and_artifact",
     )
+
+
+def _hash_tool_list(mcp_tools: List[McpToolDef]) -> str:
+    """Stable hash over the parts of the tool list that affect the agent."""
+    payload = sorted(
+        (t.name, t.description or "", json.dumps(t.inputSchema, sort_keys=True))
+        for t in mcp_tools
+    )
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class ToolSet:
+    version: str
+    tools: List[StructuredTool]
+
+
+class ToolRegistry:
+    """
+    Caches converted LangChain tools keyed by a hash of the MCP tool list.
+    The server is asked for its tool list at most once per
+    `refresh_interval`; tools are only rebuilt when the hash changes.
+    Calls of the `coalesce_tools` are deduplicated across requests while
+    in flight. Tool results reach the prompt in the given `encoding`.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = 60.0,
+        coalesce_tools: FrozenSet[str] = frozenset(),
+        encoding: str = "compact",
+    ):
+        self.refresh_interval = refresh_interval
+        self.coalesce_tools = coalesce_tools
+        self.encoding = encoding
+        self.flight = SingleFlight()
+        self._tool_set: Optional[ToolSet] = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ToolRegistry":
+        return cls(
+            refresh_interval=float(os.getenv("MCP_TOOLS_REFRESH_INTERVAL", "60")),
+            coalesce_tools=coalesce_tools_from_env(),
+            encoding=encoding_from_env(),
+        )
+
+    def invalidate(self):
+        self._fetched_at = 0.0
+
+    async def get_tools(self, session: ClientSession) -> ToolSet:
+        if self._tool_set is not None and time.monotonic() - self._fetched_at < self.refresh_interval:
+            return self._tool_set
+
+        async with self._lock:
+            # Another request may have refreshed while we waited
+            if self._tool_set is not None and time.monotonic() - self._fetched_at < self.refresh_interval:
+                return self._tool_set
+
+            logger.info("Discovering tools...")
+            tools_result = await session.list_tools()
+            version = _hash_tool_list(tools_result.tools)
+            if self._tool_set is None or self._tool_set.version != version:
+                logger.info(f"Tool list changed (version {version}), rebuilding tools")
+                self._tool_set = ToolSet(
+                    version=version,
+                    tools=[
+                        convert_mcp_to_langchain_tool(
+                            t, self.flight if t.name in self.coalesce_tools else None, self.encoding
+                        )
+                        for t in tools_result.tools
+                    ],
+                )
+            self._fetched_at = time.monotonic()
+            return self._tool_set
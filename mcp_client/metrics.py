@@ -0,0 +1,196 @@
+"""
+Agent Service Metrics
+Latency histograms for graph nodes, LLM calls, MCP tool calls and MCP
+session setup, prompt tokens saved by the context manager, LLM
+scheduler queue depth, wait times, rejections and rate-limit retries, and
+LLM hedging, failover, deadline and circuit breaker events, and requests
+abandoned by their client with the work saved, exported in Prometheus text
+format at GET /metrics.
+"""
+
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+# Own registry, so /metrics only shows this service even when the MCP server
+# runs in the same process (load tests)
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768)
+
+REQUEST_SECONDS = Histogram(
+    "banking_agent_request_duration_seconds", "Time to answer one /chat request",
+    ["route", "outcome"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+NODE_SECONDS = Histogram(
+    "banking_agent_node_duration_seconds", "Time spent in one graph node run",
+    ["node", "outcome"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+LLM_SECONDS = Histogram(
+    "banking_agent_llm_call_duration_seconds", "Time for one LLM call, including streaming",
+    ["node", "model", "outcome"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+LLM_TOKENS = Histogram(
+    "banking_agent_llm_tokens", "Tokens per LLM call, as reported by the provider",
+    ["node", "model", "kind"], buckets=_TOKEN_BUCKETS, registry=REGISTRY,
+)
+TOOL_SECONDS = Histogram(
+    "banking_agent_mcp_tool_duration_seconds", "Client-side time for one MCP tool call",
+    ["tool", "outcome"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+SESSION_SETUP_SECONDS = Histogram(
+    "banking_agent_mcp_session_setup_seconds", "Time to open and initialize one MCP session",
+    ["outcome"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+CONTEXT_TOKENS_SAVED = Counter(
+    "banking_agent_context_tokens_saved", "Prompt tokens removed by history folding and context trimming",
+    ["node"], registry=REGISTRY,
+)
+TOOL_COALESCED = Counter(
+    "banking_agent_mcp_tool_coalesced", "MCP tool calls answered by an identical call already in flight",
+    ["tool"], registry=REGISTRY,
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "banking_agent_llm_queue_depth", "LLM calls waiting in the provider's scheduler queue",
+    ["provider"], registry=REGISTRY,
+)
+LLM_IN_FLIGHT = Gauge(
+    "banking_agent_llm_in_flight", "LLM calls running against the provider",
+    ["provider"], registry=REGISTRY,
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "banking_agent_llm_queue_wait_seconds", "Time an LLM call waited for a scheduler slot",
+    ["provider", "node"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+LLM_REJECTED = Counter(
+    "banking_agent_llm_rejected", "Requests and LLM calls turned away by the LLM scheduler",
+    ["provider", "reason"], registry=REGISTRY,
+)
+LLM_RATE_LIMIT_RETRIES = Counter(
+    "banking_agent_llm_rate_limit_retries", "LLM calls retried after the provider answered 429",
+    ["provider"], registry=REGISTRY,
+)
+LLM_HEDGED = Counter(
+    "banking_agent_llm_hedged", "LLM calls duplicated to the fallback model after the hedge delay, by winner",
+    ["node", "winner"], registry=REGISTRY,
+)
+LLM_FAILOVERS = Counter(
+    "banking_agent_llm_failovers", "LLM calls sent to the fallback model because the primary failed or was open",
+    ["node", "reason"], registry=REGISTRY,
+)
+LLM_DEADLINE_EXCEEDED = Counter(
+    "banking_agent_llm_deadline_exceeded", "LLM calls cancelled at their deadline",
+    ["node"], registry=REGISTRY,
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "banking_agent_llm_circuit_open", "1 while a model's circuit breaker is open or half-open",
+    ["model"], registry=REGISTRY,
+)
+ABANDONED_REQUESTS = Counter(
+    "banking_agent_chat_abandoned", "/chat requests cancelled because the client disconnected before the answer",
+    ["route"], registry=REGISTRY,
+)
+ABANDONED_CALLS = Counter(
+    "banking_agent_abandoned_calls",
+    "LLM and tool calls of abandoned requests: cancelled in flight, or saved (estimated not made)",
+    ["kind", "state"], registry=REGISTRY,
+)
+ABANDONED_TOKENS_SAVED = Counter(
+    "banking_agent_abandoned_tokens_saved", "LLM tokens abandoned requests did not spend (estimated)",
+    registry=REGISTRY,
+)
+POOL_WAIT_SECONDS = Histogram(
+    "banking_agent_mcp_pool_wait_seconds", "Time spent waiting for a pooled MCP session",
+    buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def get_trace_id(config: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Trace id of the request this run belongs to (config["configurable"]["trace_id"])."""
+    return (config or {}).get("configurable", {}).get("trace_id")
+
+
+class MetricsCallback(BaseCallbackHandler):
+    """
+    Times graph nodes and LLM calls of one request from LangChain callback
+    events, and records prompt/completion token counts when the provider
+    reports them. LLM calls outside the graph are labelled with the
+    `stage` run metadata (e.g. fast_path).
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._nodes: Dict[UUID, Tuple[str, float]] = {}
+        self._llm_calls: Dict[UUID, Tuple[str, str, float]] = {}
+
+    @staticmethod
+    def _node(metadata: Optional[Dict[str, Any]]) -> str:
+        metadata = metadata or {}
+        return metadata.get("langgraph_node") or metadata.get("stage", "other")
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, metadata=None, **kwargs: Any):
+        # Node runs are the chains named after their node; edges and nested runnables are skipped
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and kwargs.get("name") == node:
+            self._nodes[run_id] = (node, time.perf_counter())
+
+    def _end_node(self, run_id: UUID, outcome: str):
+        started = self._nodes.pop(run_id, None)
+        if started is not None:
+            NODE_SECONDS.labels(started[0], outcome).observe(time.perf_counter() - started[1])
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        self._end_node(run_id, "ok")
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs: Any):
+        self._end_node(run_id, "error")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "unknown")
+        self._llm_calls[run_id] = (self._node(metadata), model, time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs: Any):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata, **kwargs)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        started = self._llm_calls.pop(run_id, None)
+        if started is None:
+            return
+        node, model, t0 = started
+        LLM_SECONDS.labels(node, model, "ok").observe(time.perf_counter() - t0)
+        usage = token_usage(response)
+        if usage:
+            LLM_TOKENS.labels(node, model, "prompt").observe(usage.get("input_tokens", 0))
+            LLM_TOKENS.labels(node, model, "completion").observe(usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any):
+        started = self._llm_calls.pop(run_id, None)
+        if started is not None:
+            node, model, t0 = started
+            LLM_SECONDS.labels(node, model, "error").observe(time.perf_counter() - t0)
+
+
+def token_usage(response) -> Optional[Dict[str, int]]:
+    """Token usage of an LLMResult: message usage_metadata, else the provider's llm_output."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage
+    reported = (response.llm_output or {}).get("token_usage")
+    if reported:
+        return {
+            "input_tokens": reported.get("prompt_tokens", 0),
+            "output_tokens": reported.get("completion_tokens", 0),
+        }
+    return None
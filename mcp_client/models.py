@@ -5,8 +5,10 @@ from langgraph.graph.message import add_messages
 
 class ChatRequest(BaseModel):
     message: str
-    history: List[Dict[str, str]] = []
+    history: List[Dict[str, str]] = []  # only needed without a conversation_id
+    conversation_id: Optional[str] = None  # continue a server-side conversation
     customer_id: str = "C001"  # Default customer ID
+    stream_tokens: bool = True  # Emit answer tokens as `delta` events while generating
 
 class ChatResponse(BaseModel):
     response: str
@@ -17,3 +19,5 @@ class AgentState(BaseModel):
     plan: Optional[str] = None
     steps_taken: List[str] = Field(default_factory=list)
     reflections: List[str] = Field(default_factory=list)
+    history_summary: Optional[str] = None  # summary of turns older than `messages`
+    history_tokens_folded: int = 0  # history tokens the summary replaced
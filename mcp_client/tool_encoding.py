@@ -0,0 +1,171 @@
+"""
+Tool Output Encoding
+MCP tools return structured JSON (MCP structured content). Before a result
+goes into a prompt it is encoded once:
+
+- `compact` (default): every value, none of the JSON punctuation. Objects
+  become `key: value` lines (nested objects indented by one space), lists
+  of objects become a table: a `key[rows]{col,col}:` header and one
+  comma-separated row per line. Null values are left out.
+- `json`: the structured content as minified JSON.
+- `markdown`: bullets and tables, the way the tools used to format results.
+
+Markdown is otherwise only rendered for text shown to the customer as-is
+(the template fast path); the LLM writes the final answer itself.
+"""
+
+import os
+import json
+from typing import Any, Dict, List, Optional
+
+from mcp.types import CallToolResult
+
+ENCODINGS = ("compact", "json", "markdown")
+
+
+def encoding_from_env() -> str:
+    encoding = os.getenv("TOOL_OUTPUT_ENCODING", "compact").lower()
+    if encoding not in ENCODINGS:
+        raise ValueError(f"TOOL_OUTPUT_ENCODING must be one of {', '.join(ENCODINGS)}")
+    return encoding
+
+
+def structured_payload(result: CallToolResult) -> Optional[Dict[str, Any]]:
+    """The result's structured content, or None for tools that only return text."""
+    payload = result.structuredContent
+    return payload if isinstance(payload, dict) else None
+
+
+def text_content(result: CallToolResult) -> str:
+    """Plain concatenation of a result's content blocks (tools without structured content)."""
+    output = ""
+    for content in result.content:
+        if content.type == "text":
+            output += content.text
+        elif content.type == "image":
+            output += "[Image Content]"
+        elif content.type == "resource":
+            output += f"[Resource: {content.uri}]"
+    return output
+
+
+def encode_result(result: CallToolResult, encoding: str = "compact") -> str:
+    payload = structured_payload(result)
+    if payload is None:
+        return text_content(result)
+    return encode(payload, encoding)
+
+
+def encode(payload: Dict[str, Any], encoding: str = "compact") -> str:
+    if encoding == "json":
+        return json.dumps(payload, separators=(",", ":"), default=str)
+    if encoding == "markdown":
+        return render_markdown(payload)
+    return "\n".join(_compact_fields(payload, ""))
+
+
+# Compact encoding
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        text = repr(value)
+        return text[:-2] if text.endswith(".0") else text
+    return str(value)
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    text = _scalar(value)
+    if not text or any(c in text for c in ',"\n') or text != text.strip():
+        return json.dumps(text)
+    return text
+
+
+def _is_flat(item: Any) -> bool:
+    return isinstance(item, dict) and not any(isinstance(v, (dict, list)) for v in item.values())
+
+
+def _compact_fields(obj: Dict[str, Any], indent: str) -> List[str]:
+    lines = []
+    for key, value in obj.items():
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            lines.append(f"{indent}{key}:")
+            lines.extend(_compact_fields(value, indent + " "))
+        elif isinstance(value, list):
+            lines.extend(_compact_list(key, value, indent))
+        elif isinstance(value, str) and "\n" in value:
+            lines.append(f"{indent}{key}: {json.dumps(value)}")
+        else:
+            lines.append(f"{indent}{key}: {_scalar(value)}")
+    return lines
+
+
+def _compact_list(key: str, items: List[Any], indent: str) -> List[str]:
+    if not items:
+        return [f"{indent}{key}[0]:"]
+    if all(_is_flat(item) for item in items):
+        columns = list(dict.fromkeys(k for item in items for k, v in item.items() if v is not None))
+        lines = [f"{indent}{key}[{len(items)}]{{{','.join(columns)}}}:"]
+        lines.extend(f"{indent} {','.join(_cell(item.get(c)) for c in columns)}" for item in items)
+        return lines
+    if not any(isinstance(item, (dict, list)) for item in items):
+        return [f"{indent}{key}[{len(items)}]: {','.join(_cell(item) for item in items)}"]
+    lines = [f"{indent}{key}[{len(items)}]:"]
+    for item in items:
+        if isinstance(item, dict):
+            lines.append(f"{indent} -")
+            lines.extend(_compact_fields(item, indent + "  "))
+        else:
+            lines.append(f"{indent} - {json.dumps(item, separators=(',', ':'), default=str)}")
+    return lines
+
+
+# Markdown
+
+def _title(key: str) -> str:
+    return key.replace("_", " ").capitalize()
+
+
+def _markdown_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
+
+
+def render_markdown(payload: Dict[str, Any]) -> str:
+    """Bullets for values, a section per nested object and a table per list of objects."""
+    if set(payload) == {"error"}:
+        return str(payload["error"])
+    return "\n".join(_markdown_fields(payload)).strip()
+
+
+def _markdown_fields(obj: Dict[str, Any]) -> List[str]:
+    lines = []
+    for key, value in obj.items():
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            lines += ["", f"**{_title(key)}**"] + _markdown_fields(value)
+        elif isinstance(value, list) and value and all(_is_flat(item) for item in value):
+            columns = list(dict.fromkeys(k for item in value for k, v in item.items() if v is not None))
+            lines += ["", f"**{_title(key)}**", "",
+                      "| " + " | ".join(_title(c) for c in columns) + " |",
+                      "|" + "---|" * len(columns)]
+            lines += ["| " + " | ".join(_markdown_value(item[c]) if item.get(c) is not None else "" for c in columns)
+                      + " |" for item in value]
+            lines.append("")
+        elif isinstance(value, list):
+            items = ", ".join(_markdown_value(v) for v in value) or "none"
+            lines.append(f"- **{_title(key)}:** {items}")
+        else:
+            lines.append(f"- **{_title(key)}:** {_markdown_value(value)}")
+    return lines
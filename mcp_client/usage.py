@@ -0,0 +1,126 @@
+import asyncio
+from typing import Any, Dict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from mcp_client.metrics import ABANDONED_CALLS, ABANDONED_REQUESTS, ABANDONED_TOKENS_SAVED, token_usage
+
+
+class UsageCallback(BaseCallbackHandler):
+    """
+    Counts the LLM and tool calls, and the tokens the provider reports,
+    made while answering one request.
+    Passed in the run config's callbacks, so it sees every model and tool
+    run in the graph (or on the fast path) for that request only.
+    """
+
+    # Plain counters; no need to hop to a thread for each event
+    run_inline = True
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # Calls that finished, successfully or not; the rest were cancelled
+        self.llm_finished = 0
+        self.tool_finished = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs: Any):
+        self.llm_calls += 1
+
+    def on_llm_start(self, serialized, prompts, **kwargs: Any):
+        self.llm_calls += 1
+
+    def on_llm_end(self, response, **kwargs: Any):
+        self.llm_finished += 1
+        usage = token_usage(response)
+        if usage:
+            self.prompt_tokens += usage.get("input_tokens", 0)
+            self.completion_tokens += usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any):
+        if not isinstance(error, asyncio.CancelledError):
+            self.llm_finished += 1
+
+    def on_tool_start(self, serialized, input_str, **kwargs: Any):
+        self.tool_calls += 1
+
+    def on_tool_end(self, output, **kwargs: Any):
+        self.tool_finished += 1
+
+    def on_tool_error(self, error: BaseException, **kwargs: Any):
+        if not isinstance(error, asyncio.CancelledError):
+            self.tool_finished += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+class AbandonStats:
+    """
+    Requests whose client disconnected before the answer, and the work that
+    was not done for them: LLM and tool calls cancelled in flight, and calls
+    and tokens never spent, estimated from the mean of answered requests on
+    the same route (graph or fast path).
+    """
+
+    def __init__(self):
+        # route -> [requests, llm calls, tool calls, tokens]
+        self._answered: Dict[str, list] = {}
+        self.abandoned: Dict[str, int] = {}
+        self.llm_cancelled = 0
+        self.tool_cancelled = 0
+        self.llm_calls_saved = 0.0
+        self.tool_calls_saved = 0.0
+        self.tokens_saved = 0.0
+
+    def record_answered(self, route: str, usage: UsageCallback):
+        totals = self._answered.setdefault(route, [0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += usage.llm_calls
+        totals[2] += usage.tool_calls
+        totals[3] += usage.prompt_tokens + usage.completion_tokens
+
+    def record_abandoned(self, route: str, usage: UsageCallback) -> Dict[str, float]:
+        """Counts one abandoned request; returns the work saved by stopping it."""
+        llm_cancelled = usage.llm_calls - usage.llm_finished
+        tool_cancelled = usage.tool_calls - usage.tool_finished
+        requests, llm_calls, tool_calls, tokens = self._answered.get(route, [0, 0, 0, 0])
+        # Calls cancelled in flight count as never made; their tokens were never reported anyway
+        saved = {
+            "llm_cancelled": llm_cancelled,
+            "tool_cancelled": tool_cancelled,
+            "llm_calls": max(0.0, llm_calls / requests - usage.llm_finished) if requests else 0.0,
+            "tool_calls": max(0.0, tool_calls / requests - usage.tool_finished) if requests else 0.0,
+            "tokens": max(0.0, tokens / requests - usage.prompt_tokens - usage.completion_tokens) if requests else 0.0,
+        }
+        self.abandoned[route] = self.abandoned.get(route, 0) + 1
+        self.llm_cancelled += llm_cancelled
+        self.tool_cancelled += tool_cancelled
+        self.llm_calls_saved += saved["llm_calls"]
+        self.tool_calls_saved += saved["tool_calls"]
+        self.tokens_saved += saved["tokens"]
+        ABANDONED_REQUESTS.labels(route).inc()
+        ABANDONED_CALLS.labels("llm", "cancelled").inc(llm_cancelled)
+        ABANDONED_CALLS.labels("tool", "cancelled").inc(tool_cancelled)
+        ABANDONED_CALLS.labels("llm", "saved").inc(saved["llm_calls"])
+        ABANDONED_CALLS.labels("tool", "saved").inc(saved["tool_calls"])
+        ABANDONED_TOKENS_SAVED.inc(saved["tokens"])
+        return saved
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "abandoned": dict(self.abandoned),
+            "answered": {route: totals[0] for route, totals in self._answered.items()},
+            "llm_calls_cancelled": self.llm_cancelled,
+            "tool_calls_cancelled": self.tool_cancelled,
+            "llm_calls_saved": round(self.llm_calls_saved, 1),
+            "tool_calls_saved": round(self.tool_calls_saved, 1),
+            "tokens_saved": round(self.tokens_saved),
+        }
@@ -1,18 +1,15 @@
 import os
 import argparse
 from mcp_client.agent_graph import create_agent_graph
+from mcp_client.fake_llm import ScriptedChatModel
 
 def main():
     parser = argparse.ArgumentParser(description="Visualize the LangGraph agent graph.")
     parser.add_argument("--output", default="agent_graph.png", help="Output filename (default: agent_graph.png)")
     args = parser.parse_args()
 
-    # Mock LLM for visualization 
-    class MockLLM:
-        def bind_tools(self, tools): return self
-        def ainvoke(self, messages): pass
-
-    graph = create_agent_graph(tools=[], llm=MockLLM())
+    # Offline model; only the graph structure is needed
+    graph = create_agent_graph(tools=[], llm=ScriptedChatModel())
     
     try:
         png_data = graph.get_graph().draw_mermaid_png()
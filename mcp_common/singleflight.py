@@ -0,0 +1,106 @@
+"""
+Tool Call Coalescing
+Singleflight for identical concurrent tool calls: while a call for a tool
+name and canonicalized arguments is in flight, further identical calls wait
+for it and share its result instead of doing the same work again.
+
+Coalescing is opt-in per tool (MCP_COALESCE_TOOLS). Only tools whose result
+depends on nothing but their arguments belong on the list, e.g. market data;
+customer-scoped tools are left off so one customer's call can never answer
+another's. Standard library only: used by the MCP server
+(mcp_server.singleflight.CoalescingMiddleware) and by the agent service's
+MCP tools (mcp_client.mcp_utils).
+"""
+
+import os
+import json
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Optional, Tuple
+
+# Market data only: same arguments, same answer for every customer
+DEFAULT_COALESCE_TOOLS = (
+    "get_stock_price",
+    "get_multiple_stock_prices",
+    "get_gold_price",
+    "get_silver_price",
+    "get_precious_metals_prices",
+)
+
+
+def coalesce_tools_from_env() -> FrozenSet[str]:
+    """Tool names from MCP_COALESCE_TOOLS (comma-separated, empty disables coalescing)."""
+    value = os.getenv("MCP_COALESCE_TOOLS")
+    if value is None:
+        return frozenset(DEFAULT_COALESCE_TOOLS)
+    return frozenset(name.strip() for name in value.split(",") if name.strip())
+
+
+def call_key(tool: str, arguments: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+    """Tool name plus arguments as canonical JSON (sorted keys, unset arguments dropped)."""
+    arguments = {k: v for k, v in (arguments or {}).items() if v is not None}
+    return tool, json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Dedupes in-flight async calls by key.
+
+    The first caller's work runs as its own task and every caller, the first
+    included, awaits it shielded: a caller that is cancelled (timeout,
+    disconnect) leaves the others waiting, and the work itself is only
+    cancelled once nobody is waiting for it. Results and errors are shared
+    but never kept after the call completes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns `fn()`'s result, or an identical in-flight call's, and whether it was shared."""
+        self.calls += 1
+        call = self._calls.get(key)
+        shared = call is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._done(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _done(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled() and call.task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
@@ -1,5 +1,17 @@
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
+import os
+import sys
+import json
+import math
+import base64
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+
+from mcp_server.executor import run_blocking
 
 # Mock customer database
 CUSTOMERS = {
@@ -173,28 +185,549 @@ TRANSACTIONS = {
 }
 
 
+MAX_PAGE_SIZE = 100
+
+
+@dataclass
+class TransactionPage:
+    """One page of transactions, newest first. `next_cursor` is None on the last page."""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(date: str, transaction_id: str) -> str:
+    """Opaque pagination cursor pointing just past (date, transaction_id)"""
+    return base64.urlsafe_b64encode(json.dumps([date, transaction_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date, transaction_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(date), str(transaction_id)
+    except Exception:
+        raise ValueError("Invalid cursor") from None
+
+
+def validate_date(value: Optional[str]) -> Optional[str]:
+    """Accepts YYYY-MM-DD (or empty for no bound)"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD") from None
+
+
+EPOCH = date(1970, 1, 1)
+
+
+@lru_cache(maxsize=65536)
+def _to_days(value: str) -> int:
+    """YYYY-MM-DD -> days since 1970-01-01"""
+    return (date.fromisoformat(value) - EPOCH).days
+
+
+@lru_cache(maxsize=65536)
+def _from_days(days: int) -> str:
+    return (EPOCH + timedelta(days=days)).isoformat()
+
+
+def _nan_to_none(value: float) -> Optional[float]:
+    # Missing balances are stored as NaN in the float column
+    return None if value != value else value
+
+
+class _Vocabulary:
+    """Interns a small set of repeated strings (types, statuses, currencies, descriptions) as integer codes"""
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+@dataclass(slots=True)
+class _AccountRecord:
+    """An account with enum fields as vocabulary codes and opening_date as days since 1970-01-01"""
+    account_id: str
+    customer_id: str
+    account_type: int
+    account_number: str
+    balance: float
+    currency: int
+    status: int
+    opening_date: Optional[int]
+    interest_rate: float
+
+
+@dataclass
+class TransactionArrays:
+    """Copies of a customer's transaction columns, oldest first"""
+    days: array          # days since 1970-01-01
+    amounts: array
+    descriptions: array  # codes into `vocabulary`
+    vocabulary: List[str]  # shared and append-only (not a copy); do not modify
+
+
+class _TransactionIndex:
+    """
+    A customer's transactions stored as parallel columns (struct of arrays)
+    sorted by (date, transaction_id): ids, interned account ids, dates as
+    days since 1970-01-01, description and type codes, and amounts/balances
+    as doubles. Appends in date order keep the index sorted; out-of-order
+    inserts mark it dirty and it is re-sorted once on the next query.
+    Not thread-safe: InMemoryRepository holds its transactions lock around
+    every use.
+    """
+
+    __slots__ = ("ids", "accounts", "days", "descriptions", "types", "amounts", "balances", "dirty")
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.accounts: List[str] = []
+        self.days = array("i")
+        self.descriptions = array("I")
+        self.types = array("H")
+        self.amounts = array("d")
+        self.balances = array("d")
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, transaction_id: str, account_id: str, day: int, description: int,
+            type_code: int, amount: float, balance_after: float):
+        if self.ids and (day, transaction_id) < (self.days[-1], self.ids[-1]):
+            self.dirty = True
+        self.ids.append(transaction_id)
+        self.accounts.append(account_id)
+        self.days.append(day)
+        self.descriptions.append(description)
+        self.types.append(type_code)
+        self.amounts.append(amount)
+        self.balances.append(balance_after)
+
+    def _sort(self):
+        days, ids = self.days, self.ids
+        order = sorted(range(len(ids)), key=lambda i: (days[i], ids[i]))
+        self.ids = [ids[i] for i in order]
+        self.accounts = [self.accounts[i] for i in order]
+        for name in ("days", "descriptions", "types", "amounts", "balances"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[i] for i in order]))
+        self.dirty = False
+
+    def bounds(self, start_date: Optional[str], end_date: Optional[str]) -> Tuple[int, int]:
+        """Row range [lo, hi) within inclusive YYYY-MM-DD bounds"""
+        if self.dirty:
+            self._sort()
+        hi = bisect_right(self.days, _to_days(end_date)) if end_date else len(self.ids)
+        lo = bisect_left(self.days, _to_days(start_date)) if start_date else 0
+        return lo, hi
+
+    def position(self, day: int, transaction_id: str) -> int:
+        """First row at or after (day, transaction_id)"""
+        lo = bisect_left(self.days, day)
+        return bisect_left(self.ids, transaction_id, lo, bisect_right(self.days, day, lo))
+
+
+@dataclass
+class BalanceSummary:
+    """A customer's total balance, account count and balance per account type"""
+    total: float = 0.0
+    account_count: int = 0
+    by_type: Dict[str, float] = field(default_factory=dict)
+
+
+def _cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+class _BalanceAggregate:
+    """
+    Materialized balances for one customer, in integer cents so incremental
+    updates add up exactly and never drift from a full recompute.
+    """
+
+    __slots__ = ("total", "count", "by_type")
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+        self.by_type: Dict[str, int] = {}
+
+    def apply(self, account_type: str, delta: int, count: int = 0):
+        self.total += delta
+        self.count += count
+        self.by_type[account_type] = self.by_type.get(account_type, 0) + delta
+
+    def summary(self) -> BalanceSummary:
+        return BalanceSummary(
+            self.total / 100,
+            self.count,
+            {account_type: cents / 100 for account_type, cents in self.by_type.items()},
+        )
+
+
+class InMemoryRepository:
+    """
+    In-memory store for customers, accounts and transactions.
+    Accounts are slotted records and each customer's transactions are
+    columns of typed arrays, with repeated strings interned as integer codes
+    and dates as integers; the get_* methods return plain dicts built on read.
+    Keeps a customer -> accounts index so every lookup is O(1) in the number
+    of accounts, and a per-customer date-sorted transaction index for range
+    queries.
+    Per-customer balance aggregates are updated on every account or balance
+    change, so totals and summaries are O(1); check_aggregates() verifies
+    them against a full recompute.
+    Transaction indexes are read from executor threads (spending analytics)
+    while the event loop adds to them; a lazy re-sort rewrites every column,
+    so adds and reads (sort included) hold `_transactions_lock`.
+    """
+
+    def __init__(self):
+        self.customers: Dict[str, Dict[str, Any]] = {}
+        self.accounts: Dict[str, _AccountRecord] = {}
+        self._transactions: Dict[str, _TransactionIndex] = {}
+        self._transactions_lock = threading.Lock()
+        self._accounts_by_customer: Dict[str, List[_AccountRecord]] = {}
+        self._aggregates: Dict[str, _BalanceAggregate] = {}
+        self._enums = _Vocabulary()
+        self._descriptions = _Vocabulary()
+
+    @classmethod
+    def from_dicts(
+        cls,
+        customers: Dict[str, Dict[str, Any]],
+        accounts: Dict[str, Dict[str, Any]],
+        transactions: Dict[str, List[Dict[str, Any]]],
+    ) -> "InMemoryRepository":
+        repo = cls()
+        for customer in customers.values():
+            repo.add_customer(customer)
+        for account in accounts.values():
+            repo.add_account(account)
+        for customer_id, txns in transactions.items():
+            for txn in txns:
+                repo.add_transaction(customer_id, txn)
+        return repo
+
+    def _account_type(self, account: _AccountRecord) -> str:
+        return self._enums.values[account.account_type].lower()
+
+    def _account_dict(self, account: _AccountRecord) -> Dict[str, Any]:
+        enums = self._enums.values
+        return {
+            "account_id": account.account_id,
+            "customer_id": account.customer_id,
+            "account_type": enums[account.account_type],
+            "account_number": account.account_number,
+            "balance": account.balance,
+            "currency": enums[account.currency],
+            "status": enums[account.status],
+            "opening_date": _from_days(account.opening_date) if account.opening_date is not None else None,
+            "interest_rate": account.interest_rate,
+        }
+
+    def _transaction_dicts(self, index: _TransactionIndex, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        descriptions, enums = self._descriptions.values, self._enums.values
+        ids, accounts, days, codes, types = index.ids, index.accounts, index.days, index.descriptions, index.types
+        amounts, balances = index.amounts, index.balances
+        return [
+            {
+                "transaction_id": ids[i],
+                "account_id": accounts[i],
+                "date": _from_days(days[i]),
+                "description": descriptions[codes[i]],
+                "amount": amounts[i],
+                "type": enums[types[i]],
+                "balance_after": _nan_to_none(balances[i]),
+            }
+            for i in rows
+        ]
+
+    def add_customer(self, customer: Dict[str, Any]):
+        self.customers[customer["customer_id"]] = customer
+
+    def add_account(self, account: Dict[str, Any]):
+        if account["account_id"] in self.accounts:
+            raise ValueError(f"Duplicate account {account['account_id']}")
+        enums = self._enums
+        opening_date = account.get("opening_date")
+        record = _AccountRecord(
+            sys.intern(account["account_id"]),
+            sys.intern(account["customer_id"]),
+            enums.code(account["account_type"]),
+            account.get("account_number"),
+            float(account["balance"]),
+            enums.code(account.get("currency")),
+            enums.code(account.get("status")),
+            _to_days(opening_date) if opening_date else None,
+            account.get("interest_rate"),
+        )
+        self.accounts[record.account_id] = record
+        self._accounts_by_customer.setdefault(record.customer_id, []).append(record)
+        aggregate = self._aggregates.get(record.customer_id)
+        if aggregate is None:
+            aggregate = self._aggregates[record.customer_id] = _BalanceAggregate()
+        aggregate.apply(self._account_type(record), _cents(record.balance), count=1)
+
+    def update_balance(self, account_id: str, balance: float):
+        account = self.accounts.get(account_id)
+        if account is None:
+            raise ValueError(f"Unknown account {account_id}")
+        delta = _cents(balance) - _cents(account.balance)
+        account.balance = float(balance)
+        self._aggregates[account.customer_id].apply(self._account_type(account), delta)
+
+    def add_transaction(self, customer_id: str, transaction: Dict[str, Any]):
+        """Records a historical transaction; its effect is already in the account balance"""
+        balance_after = transaction.get("balance_after")
+        with self._transactions_lock:
+            index = self._transactions.get(customer_id)
+            if index is None:
+                index = self._transactions[customer_id] = _TransactionIndex()
+            index.add(
+                transaction["transaction_id"],
+                sys.intern(transaction["account_id"]),
+                _to_days(transaction["date"]),
+                self._descriptions.code(transaction.get("description")),
+                self._enums.code(transaction.get("type")),
+                transaction["amount"],
+                balance_after if balance_after is not None else math.nan,
+            )
+
+    def post_transaction(self, customer_id: str, transaction: Dict[str, Any]):
+        """Applies a new transaction's amount to its account, sets balance_after and records it"""
+        account = self.accounts.get(transaction["account_id"])
+        if account is None or account.customer_id != customer_id:
+            raise ValueError(f"Unknown account {transaction['account_id']} for customer {customer_id}")
+        balance = (_cents(account.balance) + _cents(transaction["amount"])) / 100
+        self.update_balance(account.account_id, balance)
+        self.add_transaction(customer_id, {**transaction, "balance_after": balance})
+
+    def get_customer(self, customer_id: str) -> Dict[str, Any] | None:
+        return self.customers.get(customer_id)
+
+    def get_account(self, account_id: str) -> Dict[str, Any] | None:
+        account = self.accounts.get(account_id)
+        return self._account_dict(account) if account is not None else None
+
+    def get_accounts_by_customer(self, customer_id: str) -> List[Dict[str, Any]]:
+        return [self._account_dict(a) for a in self._accounts_by_customer.get(customer_id, ())]
+
+    def get_accounts_by_type(self, customer_id: str, account_type: str) -> List[Dict[str, Any]]:
+        # Filters the customer's (few) accounts; cheaper than a per-(customer, type) index at scale
+        account_type = account_type.lower()
+        return [
+            self._account_dict(a) for a in self._accounts_by_customer.get(customer_id, ())
+            if self._account_type(a) == account_type
+        ]
+
+    def get_transactions_by_customer(self, customer_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.get_transactions_page(customer_id, limit=limit).items
+
+    def get_transactions_page(
+        self,
+        customer_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+    ) -> TransactionPage:
+        before = None
+        if cursor:
+            before_date, before_id = decode_cursor(cursor)
+            try:
+                before = (_to_days(before_date), before_id)
+            except ValueError:
+                raise ValueError("Invalid cursor") from None
+        with self._transactions_lock:
+            index = self._transactions.get(customer_id)
+            if index is None:
+                return TransactionPage([])
+            lo, hi = index.bounds(start_date, end_date)
+            if before is not None:
+                hi = min(hi, index.position(*before))
+            # Walk the window newest first
+            stop = max(lo, hi - limit)
+            items = self._transaction_dicts(index, range(hi - 1, stop - 1, -1))
+            next_cursor = encode_cursor(_from_days(index.days[stop]), index.ids[stop]) if stop > lo else None
+        return TransactionPage(items, next_cursor)
+
+    def get_transactions_in_range(
+        self, customer_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        with self._transactions_lock:
+            index = self._transactions.get(customer_id)
+            if index is None:
+                return []
+            return self._transaction_dicts(index, range(*index.bounds(start_date, end_date)))
+
+    def get_transaction_arrays(self, customer_id: str) -> TransactionArrays:
+        """A customer's full history as columns, without building a dict per transaction"""
+        with self._transactions_lock:
+            index = self._transactions.get(customer_id)
+            if index is None:
+                return TransactionArrays(array("i"), array("d"), array("I"), [])
+            index.bounds(None, None)  # sorts the index if needed
+            return TransactionArrays(
+                array("i", index.days), array("d", index.amounts),
+                array("I", index.descriptions), self._descriptions.values,
+            )
+
+    def get_transaction_count(self, customer_id: str) -> int:
+        index = self._transactions.get(customer_id)
+        return len(index) if index is not None else 0
+
+    def get_total_balance(self, customer_id: str) -> float:
+        aggregate = self._aggregates.get(customer_id)
+        return aggregate.total / 100 if aggregate else 0.0
+
+    def get_balance_summary(self, customer_id: str) -> BalanceSummary:
+        aggregate = self._aggregates.get(customer_id)
+        return aggregate.summary() if aggregate else BalanceSummary()
+
+    def check_aggregates(self) -> List[str]:
+        """
+        Recomputes every customer's balances from the accounts and returns a
+        description of each mismatch with the maintained aggregates (empty if consistent).
+        """
+        expected: Dict[str, _BalanceAggregate] = {}
+        for account in self.accounts.values():
+            aggregate = expected.get(account.customer_id)
+            if aggregate is None:
+                aggregate = expected[account.customer_id] = _BalanceAggregate()
+            aggregate.apply(self._account_type(account), _cents(account.balance), count=1)
+
+        problems = []
+        for customer_id in expected.keys() | self._aggregates.keys():
+            want, have = expected.get(customer_id), self._aggregates.get(customer_id)
+            if want is None or have is None:
+                problems.append(f"{customer_id}: aggregate {'missing' if have is None else 'without accounts'}")
+            elif (want.total, want.count) != (have.total, have.count):
+                problems.append(f"{customer_id}: total/count {have.total}/{have.count}, expected {want.total}/{want.count}")
+            elif {t: c for t, c in want.by_type.items() if c} != {t: c for t, c in have.by_type.items() if c}:
+                problems.append(f"{customer_id}: by type {have.by_type}, expected {want.by_type}")
+        return problems
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def _repository_from_env():
+    """DATA_BACKEND=sqlite uses SQLiteRepository at DATA_SQLITE_PATH; the mock dicts are the default"""
+    backend = os.getenv("DATA_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        from mcp_server.sqlite_store import SQLiteRepository
+        repo = SQLiteRepository(
+            os.getenv("DATA_SQLITE_PATH", "banking.db"),
+            readers=int(os.getenv("DATA_SQLITE_READERS", "4")),
+        )
+        if repo.is_empty():
+            repo.seed(CUSTOMERS, ACCOUNTS, TRANSACTIONS)
+        return repo
+    if backend != "memory":
+        raise ValueError(f"Unknown DATA_BACKEND: {backend}")
+    return InMemoryRepository.from_dicts(CUSTOMERS, ACCOUNTS, TRANSACTIONS)
+
+
+def get_repository():
+    """Get the repository backing the data access functions"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = _repository_from_env()
+    return _repository
+
+
+def set_repository(repository):
+    """Replace the repository (e.g. with synthetic data for scale tests)"""
+    global _repository
+    _repository = repository
+
+
+async def run_query(fn, *args):
+    """
+    Runs a data-access callable from an async tool. Backends that do I/O
+    (SQLite) are offloaded to the blocking executor; in-memory lookups run inline.
+    """
+    if getattr(get_repository(), "blocking_io", False):
+        return await run_blocking(fn, *args)
+    return fn(*args)
+
+
 def get_customer_by_id(customer_id: str) -> Dict[str, Any] | None:
     """Get customer information by ID"""
-    return CUSTOMERS.get(customer_id)
+    return get_repository().get_customer(customer_id)
 
 
 def get_accounts_by_customer(customer_id: str) -> List[Dict[str, Any]]:
     """Get all accounts for a customer"""
-    return [acc for acc in ACCOUNTS.values() if acc["customer_id"] == customer_id]
+    return get_repository().get_accounts_by_customer(customer_id)
+
+
+def get_accounts_by_type(customer_id: str, account_type: str) -> List[Dict[str, Any]]:
+    """Get a customer's accounts of one type (checking, savings, investment)"""
+    return get_repository().get_accounts_by_type(customer_id, account_type)
 
 
 def get_account_by_id(account_id: str) -> Dict[str, Any] | None:
     """Get account by account ID"""
-    return ACCOUNTS.get(account_id)
+    return get_repository().get_account(account_id)
 
 
 def get_transactions_by_customer(customer_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-    """Get recent transactions for a customer"""
-    transactions = TRANSACTIONS.get(customer_id, [])
-    return transactions[:limit]
+    """Get recent transactions for a customer, newest first"""
+    return get_repository().get_transactions_by_customer(customer_id, limit)
+
+
+def get_transactions_page(
+    customer_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 10,
+) -> TransactionPage:
+    """
+    Get one page of a customer's transactions, newest first.
+    Dates are inclusive YYYY-MM-DD bounds; pass the returned next_cursor to get the following page.
+    """
+    start_date, end_date = validate_date(start_date), validate_date(end_date)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return get_repository().get_transactions_page(customer_id, start_date, end_date, cursor, limit)
+
+
+def get_transactions_in_range(
+    customer_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Get all of a customer's transactions between two inclusive YYYY-MM-DD dates, oldest first"""
+    start_date, end_date = validate_date(start_date), validate_date(end_date)
+    return get_repository().get_transactions_in_range(customer_id, start_date, end_date)
+
+
+def get_transaction_count(customer_id: str) -> int:
+    """Number of transactions recorded for a customer"""
+    return get_repository().get_transaction_count(customer_id)
 
 
 def get_total_balance(customer_id: str) -> float:
     """Calculate total balance across all accounts for a customer"""
-    accounts = get_accounts_by_customer(customer_id)
-    return sum(acc["balance"] for acc in accounts)
+    return get_repository().get_total_balance(customer_id)
+
+
+def get_balance_summary(customer_id: str) -> BalanceSummary:
+    """Get a customer's total balance, account count and balance per account type"""
+    return get_repository().get_balance_summary(customer_id)
@@ -0,0 +1,50 @@
+"""
+Blocking Work Executor
+Dedicated, size-limited thread pool for blocking I/O done by async tools,
+so slow upstream calls never stall FastMCP's event loop.
+"""
+
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Shared executor for blocking tool work, sized by MCP_BLOCKING_WORKERS"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("MCP_BLOCKING_WORKERS", "8")),
+                thread_name_prefix="mcp-blocking",
+            )
+        return _executor
+
+
+def default_timeout() -> float:
+    """Request-level timeout for blocking tool work (MCP_TOOL_TIMEOUT seconds)"""
+    return float(os.getenv("MCP_TOOL_TIMEOUT", "15"))
+
+
+async def run_blocking(fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Runs `fn(*args, **kwargs)` on the blocking executor and awaits the result.
+
+    After `timeout` seconds the caller gets a TimeoutError and the work is
+    cancelled if it has not started yet; work already running is left to
+    finish in the background (its result still lands in any cache it fills).
+    """
+    if timeout is None:
+        timeout = default_timeout()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_blocking_executor(), functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"timed out after {timeout:g}s") from None
@@ -2,7 +2,8 @@ from fastmcp import FastMCP
 import logging
 import os
 from dotenv import load_dotenv
-from mcp_server.tools import account_info, balance, stock_prices, commodity_prices
+from mcp_server import metrics, prefetch, singleflight
+from mcp_server.tools import account_info, balance, spending, stock_prices, commodity_prices
 
 load_dotenv()
 
@@ -16,12 +17,22 @@ logging.getLogger("uvicorn").setLevel(logging.WARNING)
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 logging.getLogger("watchfiles").setLevel(logging.WARNING)
 
-# Initialize FastMCP server
-mcp = FastMCP("Banking Agent Tools")
+# Initialize FastMCP server; its lifespan runs the background quote prefetcher
+mcp = FastMCP("Banking Agent Tools", lifespan=prefetch.lifespan)
+
+# Tool-call timing and GET /metrics
+metrics.register(mcp)
+
+# Identical concurrent calls of market data tools share one execution
+singleflight.register(mcp)
+
+# Quote cache and prefetch counters at GET /stats
+prefetch.register(mcp)
 
 # Register all banking tools
 account_info.register(mcp)
 balance.register(mcp)
+spending.register(mcp)
 stock_prices.register(mcp)
 commodity_prices.register(mcp)
 
@@ -30,6 +41,7 @@ if __name__ == "__main__":
     logger.info("Available tools:")
     logger.info("  - Account Information (get_account_info, get_account_types)")
     logger.info("  - Balance Checking (check_balance, get_recent_transactions, get_total_portfolio_value)")
+    logger.info("  - Spending Analytics (get_spending_summary)")
     logger.info("  - Stock Prices (get_stock_price, get_multiple_stock_prices)")
     logger.info("  - Commodity Prices (get_gold_price, get_silver_price, get_precious_metals_prices)")
     mcp.run(transport="sse", port=8001)
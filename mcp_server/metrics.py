@@ -0,0 +1,108 @@
+"""
+MCP Server Metrics
+Server-side latency histograms for tool calls and session setup, plus quote
+cache and prefetch metrics, exported in Prometheus text format at
+GET /metrics. Tool calls are logged with the trace id the agent service
+sends in the request's `_meta`.
+"""
+
+import time
+import asyncio
+import logging
+
+from fastmcp.server.middleware import Middleware
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger("mcp_server")
+
+# Own registry, so /metrics only shows this server even when the agent
+# service runs in the same process (load tests)
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 15)
+
+TOOL_SECONDS = Histogram(
+    "mcp_server_tool_duration_seconds", "Server-side time for one tool call",
+    ["tool", "outcome"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+SESSION_INITIALIZE_SECONDS = Histogram(
+    "mcp_server_session_initialize_seconds", "Time to handle a client's initialize request",
+    buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+QUOTE_AGE_SECONDS = Histogram(
+    "mcp_server_quote_age_seconds", "Age of each quote served from the quote cache",
+    ["origin"], buckets=(1, 2.5, 5, 10, 15, 30, 60, 120, 300, 600), registry=REGISTRY,
+)
+QUOTE_PREFETCHES = Counter(
+    "mcp_server_quote_prefetches", "Quotes fetched ahead of demand by the prefetcher",
+    ["outcome"], registry=REGISTRY,
+)
+QUOTE_PREFETCH_DEFERRED = Counter(
+    "mcp_server_quote_prefetch_deferred", "Watchlist refreshes postponed by the upstream rate budget",
+    registry=REGISTRY,
+)
+QUOTE_PREFETCH_WATCHLIST = Gauge(
+    "mcp_server_quote_prefetch_watchlist", "Symbols on the prefetch watchlist",
+    ["kind"], registry=REGISTRY,
+)
+QUOTE_PREFETCH_HIT_RATIO = Gauge(
+    "mcp_server_quote_prefetch_hit_ratio", "Share of quote requests served from prefetched quotes",
+    registry=REGISTRY,
+)
+QUOTE_PREFETCH_MAX_AGE = Gauge(
+    "mcp_server_quote_prefetch_max_age_seconds", "Age of the stalest quote on the watchlist",
+    registry=REGISTRY,
+)
+TOOL_COALESCED = Counter(
+    "mcp_server_tool_coalesced", "Tool calls answered by an identical call already in flight",
+    ["tool"], registry=REGISTRY,
+)
+
+
+def _trace_id(context) -> str | None:
+    """trace_id from the MCP request's `_meta`, if the client sent one."""
+    try:
+        meta = context.fastmcp_context.request_context.meta
+    except (AttributeError, ValueError):
+        return None
+    return getattr(meta, "trace_id", None) if meta is not None else None
+
+
+class MetricsMiddleware(Middleware):
+    """Times every tool call (outcome ok, error or cancelled) and session initialization."""
+
+    async def on_call_tool(self, context, call_next):
+        name = context.message.name
+        trace_id = _trace_id(context)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await call_next(context)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"  # the client sent notifications/cancelled (or went away)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            TOOL_SECONDS.labels(name, outcome).observe(elapsed)
+            logger.info(f"[{trace_id}] Tool {name} {outcome} in {elapsed * 1000:.1f} ms")
+
+    async def on_initialize(self, context, call_next):
+        started = time.perf_counter()
+        try:
+            return await call_next(context)
+        finally:
+            SESSION_INITIALIZE_SECONDS.observe(time.perf_counter() - started)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+def register(mcp):
+    """Installs the timing middleware and the GET /metrics route."""
+    mcp.add_middleware(MetricsMiddleware())
+    mcp.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
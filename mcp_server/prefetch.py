@@ -0,0 +1,230 @@
+"""
+Quote Prefetcher
+Background task that keeps a watchlist of hot symbols fresh in the shared
+quote cache, so user-facing quote tools are answered without waiting on
+upstream.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from mcp_server.executor import run_blocking
+from mcp_server.metrics import (
+    QUOTE_PREFETCH_DEFERRED, QUOTE_PREFETCH_HIT_RATIO, QUOTE_PREFETCH_MAX_AGE, QUOTE_PREFETCH_WATCHLIST,
+    QUOTE_PREFETCHES,
+)
+from mcp_server.quotes import QuoteCache, get_quote_cache
+
+logger = logging.getLogger("mcp_server")
+
+
+def _symbols_from_env(name: str, default: str) -> List[str]:
+    return [s.strip().upper() for s in os.getenv(name, default).split(",") if s.strip()]
+
+
+class QuotePrefetcher:
+    """
+    Refreshes the watchlist every `interval` seconds.
+
+    The watchlist is the configured `symbols` plus up to `learn_top` symbols
+    learned from request counts (counts halve every `half_life` seconds; a
+    symbol needs a score of `min_score` to be prefetched). A symbol is
+    refetched in the last cycle before its quote is `refresh_at` of its TTL
+    old, so it is replaced before it expires.
+
+    Upstream fetches are held to `rate` per second (token bucket of `burst`
+    fetches). The budget covers every upstream fetch the cache makes, so
+    on-demand fetches from user requests leave less room for prefetching;
+    watchlist refreshes that do not fit are deferred to a later cycle,
+    missing and oldest quotes first.
+    """
+
+    def __init__(
+        self,
+        cache: QuoteCache,
+        symbols: Optional[List[str]] = None,
+        interval: float = 5.0,
+        rate: float = 1.0,
+        burst: float = 10.0,
+        refresh_at: float = 0.8,
+        learn_top: int = 20,
+        min_score: float = 3.0,
+        half_life: float = 600.0,
+    ):
+        self.cache = cache
+        self.symbols = [s.upper() for s in symbols or []]
+        self.interval = interval
+        self.rate = rate
+        self.burst = burst
+        self.refresh_at = refresh_at
+        self.learn_top = learn_top
+        self.min_score = min_score
+        self.half_life = half_life
+
+        self.learned: List[str] = []
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._upstream_seen = cache.upstream_fetches
+        self._task: Optional[asyncio.Task] = None
+
+        self.cycles = 0
+        self.fetched = 0
+        self.errors = 0
+        self.deferred = 0
+        self.max_age: Optional[float] = None
+
+    @classmethod
+    def from_env(cls, cache: Optional[QuoteCache] = None) -> "QuotePrefetcher":
+        return cls(
+            cache or get_quote_cache(),
+            symbols=_symbols_from_env("QUOTE_PREFETCH_SYMBOLS", "GC=F,SI=F"),
+            interval=float(os.getenv("QUOTE_PREFETCH_INTERVAL", "5")),
+            rate=float(os.getenv("QUOTE_PREFETCH_RATE", "1")),
+            burst=float(os.getenv("QUOTE_PREFETCH_BURST", "10")),
+            refresh_at=float(os.getenv("QUOTE_PREFETCH_REFRESH_AT", "0.8")),
+            learn_top=int(os.getenv("QUOTE_PREFETCH_LEARN_TOP", "20")),
+            min_score=float(os.getenv("QUOTE_PREFETCH_MIN_SCORE", "3")),
+            half_life=float(os.getenv("QUOTE_PREFETCH_HALF_LIFE", "600")),
+        )
+
+    def start(self):
+        if self._task is None:
+            logger.info(
+                f"Quote prefetcher: every {self.interval:g}s, {self.rate:g} fetches/s, "
+                f"watchlist {', '.join(self.symbols) or '(learned only)'} + top {self.learn_top} learned"
+            )
+            self._task = asyncio.create_task(self._run(), name="quote-prefetcher")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"Quote prefetch cycle failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def watchlist(self) -> List[str]:
+        return list(dict.fromkeys(self.symbols + self.learned))
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        # Charge every upstream fetch since the last cycle, ours and on-demand ones alike
+        upstream = self.cache.upstream_fetches
+        self._tokens = max(-self.burst, self._tokens - (upstream - self._upstream_seen))
+        self._upstream_seen = upstream
+
+    def _due(self, symbols: List[str]) -> List[str]:
+        """Watchlist symbols to refetch, missing quotes first, then by age relative to TTL."""
+        due = []
+        for symbol in symbols:
+            age = self.cache.age(symbol)
+            ttl = self.cache.ttl_for(symbol)
+            if age is None:
+                due.append((float("inf"), symbol))
+            elif age + self.interval >= ttl * self.refresh_at:  # would pass it before the next cycle
+                due.append((age / ttl, symbol))
+        due.sort(reverse=True)
+        return [symbol for _, symbol in due]
+
+    async def run_once(self):
+        """One prefetch cycle: learn hot symbols, refill the budget, refetch what is due."""
+        decay = 0.5 ** (self.interval / self.half_life) if self.half_life > 0 else 1.0
+        configured = set(self.symbols)
+        self.learned = [
+            s for s in self.cache.hot_symbols(self.learn_top + len(configured), self.min_score, decay)
+            if s not in configured
+        ][:self.learn_top]
+        self._refill()
+
+        due = self._due(self.watchlist())
+        batch = due[:max(0, int(self._tokens))]
+        if len(batch) < len(due):
+            self.deferred += len(due) - len(batch)
+            QUOTE_PREFETCH_DEFERRED.inc(len(due) - len(batch))
+
+        if batch:
+            results = await run_blocking(self.cache.prefetch, batch, self.interval, timeout=self.interval + 1)
+            for result in results:
+                if result.error:
+                    self.errors += 1
+                    QUOTE_PREFETCHES.labels("error").inc()
+                    logger.warning(f"Prefetch of {result.symbol} failed: {result.error}")
+                else:
+                    self.fetched += 1
+                    QUOTE_PREFETCHES.labels("ok").inc()
+
+        self.cycles += 1
+        ages = [self.cache.age(s) for s in self.watchlist()]
+        self.max_age = max((a for a in ages if a is not None), default=None)
+        QUOTE_PREFETCH_WATCHLIST.labels("configured").set(len(self.symbols))
+        QUOTE_PREFETCH_WATCHLIST.labels("learned").set(len(self.learned))
+        QUOTE_PREFETCH_HIT_RATIO.set(self.hit_ratio())
+        if self.max_age is not None:
+            QUOTE_PREFETCH_MAX_AGE.set(self.max_age)
+
+    def hit_ratio(self) -> float:
+        """Share of quote requests answered from a prefetched quote."""
+        return self.cache.prefetch_hits / self.cache.requests if self.cache.requests else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "configured": self.symbols,
+            "learned": self.learned,
+            "cycles": self.cycles,
+            "fetched": self.fetched,
+            "errors": self.errors,
+            "deferred": self.deferred,
+            "budget_tokens": round(self._tokens, 2),
+            "hit_ratio": round(self.hit_ratio(), 4),
+            "max_age_s": round(self.max_age, 2) if self.max_age is not None else None,
+        }
+
+
+_prefetcher: Optional[QuotePrefetcher] = None
+
+
+@asynccontextmanager
+async def lifespan(server) -> AsyncIterator[Dict[str, Any]]:
+    """FastMCP server lifespan: runs the prefetcher while the server is up (QUOTE_PREFETCH_ENABLED)."""
+    global _prefetcher
+    if os.getenv("QUOTE_PREFETCH_ENABLED", "true").lower() != "true":
+        yield {}
+        return
+    _prefetcher = QuotePrefetcher.from_env()
+    _prefetcher.start()
+    try:
+        yield {"quote_prefetcher": _prefetcher}
+    finally:
+        await _prefetcher.stop()
+        _prefetcher = None
+
+
+async def stats_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse({
+        "quote_cache": get_quote_cache().stats(),
+        "prefetch": _prefetcher.stats() if _prefetcher is not None else None,
+    })
+
+
+def register(mcp):
+    """Adds GET /stats with quote cache and prefetcher counters."""
+    mcp.custom_route("/stats", methods=["GET"])(stats_endpoint)
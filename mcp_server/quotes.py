@@ -0,0 +1,458 @@
+"""
+Quote Cache
+Shared in-process cache for upstream market quotes (stocks and commodities).
+"""
+
+import os
+import time
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Protocol
+
+from mcp_server.executor import run_blocking
+from mcp_server.metrics import QUOTE_AGE_SECONDS
+
+logger = logging.getLogger("mcp_server")
+
+
+class QuoteSource(Protocol):
+    """Upstream quote provider. `fetch` returns a yfinance-style info dict."""
+
+    def fetch(self, symbol: str) -> Dict[str, Any]: ...
+
+
+class YFinanceQuoteSource:
+    """Fetches quotes from Yahoo Finance."""
+
+    def fetch(self, symbol: str) -> Dict[str, Any]:
+        import yfinance as yf
+        return yf.Ticker(symbol).info
+
+
+class FakeQuoteSource:
+    """
+    Deterministic local quote source for tests and benchmarks.
+    Prices are derived from the symbol, and every fetch sleeps `latency` seconds.
+    """
+
+    def __init__(self, latency: float = 0.0, prices: Optional[Dict[str, float]] = None):
+        self.latency = latency
+        self.prices = prices or {}
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, symbol: str) -> Dict[str, Any]:
+        with self._lock:
+            self.fetches += 1
+        if self.latency:
+            time.sleep(self.latency)
+        price = self.prices.get(symbol, 50 + zlib.crc32(symbol.encode()) % 500)
+        return {
+            "symbol": symbol,
+            "longName": f"{symbol} Inc.",
+            "currentPrice": price,
+            "regularMarketPrice": price,
+            "previousClose": round(price * 0.99, 2),
+            "marketCap": int(price * 1_000_000_000),
+            "volume": 1_000_000,
+        }
+
+
+@dataclass
+class QuoteResult:
+    """Outcome of one symbol in a batch request: either `info` or `error` is set."""
+    symbol: str
+    info: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at", "refreshing", "prefetched")
+
+    def __init__(self, value: Dict[str, Any], fetched_at: float, prefetched: bool = False):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.refreshing = False
+        self.prefetched = prefetched
+
+
+class QuoteCache:
+    """
+    Per-symbol TTL cache with a bounded LRU size.
+
+    - Fresh entries (younger than the symbol's TTL) are served directly.
+    - Stale entries (younger than TTL + `stale_ttl`) are served immediately
+      while one background refresh updates them (stale-while-revalidate).
+    - Concurrent misses for the same symbol share one upstream fetch. Callers
+      joining it wait at most `fetch_timeout` seconds, then get the last
+      cached quote, however old, or a TimeoutError.
+    Errors are never cached; they are raised to every waiting caller.
+
+    Requests are counted per symbol (with decay) so a QuotePrefetcher can
+    learn which symbols are hot, and quotes it fetched ahead of time are
+    tracked separately from ones fetched on demand.
+    """
+
+    def __init__(
+        self,
+        source: QuoteSource,
+        ttl: float = 30.0,
+        stale_ttl: float = 300.0,
+        max_size: int = 1024,
+        ttl_overrides: Optional[Dict[str, float]] = None,
+        refresh_workers: int = 4,
+        batch_workers: int = 16,
+        fetch_timeout: float = 10.0,
+    ):
+        self.source = source
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.ttl_overrides = ttl_overrides or {}
+        self.fetch_timeout = fetch_timeout
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="quote-refresh")
+        self._batch_pool = ThreadPoolExecutor(max_workers=batch_workers, thread_name_prefix="quote-batch")
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.evictions = 0
+        self.upstream_fetches = 0
+        self.join_timeouts = 0
+        self.requests = 0
+        self.prefetch_hits = 0
+        self.prefetched = 0
+        self._demand: Dict[str, float] = {}
+
+    def ttl_for(self, symbol: str) -> float:
+        return self.ttl_overrides.get(symbol, self.ttl)
+
+    def get(self, symbol: str) -> Dict[str, Any]:
+        """Returns the quote info for `symbol`, fetching upstream only when needed."""
+        symbol = symbol.upper()
+        with self._lock:
+            cached = self._cached(symbol)
+            if cached is not None:
+                return cached
+
+            future = self._inflight.get(symbol)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = Future()
+                self._inflight[symbol] = future
+                owner = True
+
+        if not owner:
+            return self._join(symbol, future)
+        return self._fetch(symbol, future)
+
+    def _join(self, symbol: str, future: Future) -> Dict[str, Any]:
+        """Waits for another thread's fetch of `symbol`, so a hung upstream call only holds its own thread."""
+        try:
+            return future.result(timeout=self.fetch_timeout)
+        except TimeoutError:
+            with self._lock:
+                self.join_timeouts += 1
+                entry = self._entries.get(symbol)
+            if entry is None:
+                raise TimeoutError(f"Timed out after {self.fetch_timeout:g}s waiting for a quote for {symbol}") from None
+            logger.warning(f"Quote fetch for {symbol} is hanging, serving the last cached quote")
+            return entry.value
+
+    def peek(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Returns a fresh or stale cached quote without ever blocking on upstream."""
+        with self._lock:
+            return self._cached(symbol.upper())
+
+    def record_request(self, symbol: str):
+        """Counts a user-facing request for `symbol` (feeds hot-symbol learning)."""
+        symbol = symbol.upper()
+        with self._lock:
+            self.requests += 1
+            self._demand[symbol] = self._demand.get(symbol, 0.0) + 1.0
+
+    def hot_symbols(self, limit: int, min_score: float, decay: float = 1.0) -> List[str]:
+        """
+        The `limit` most requested symbols with a decayed request count of at
+        least `min_score`. Counts are multiplied by `decay` first, and symbols
+        nobody asks for any more are forgotten.
+        """
+        with self._lock:
+            if decay != 1.0:
+                self._demand = {s: n * decay for s, n in self._demand.items() if n * decay >= 0.1}
+            ranked = sorted(self._demand.items(), key=lambda item: item[1], reverse=True)
+        return [symbol for symbol, score in ranked[:limit] if score >= min_score]
+
+    def age(self, symbol: str) -> Optional[float]:
+        """Seconds since `symbol` was fetched, or None when it is not cached."""
+        with self._lock:
+            entry = self._entries.get(symbol.upper())
+            return time.monotonic() - entry.fetched_at if entry is not None else None
+
+    def _cached(self, symbol: str) -> Optional[Dict[str, Any]]:
+        # Caller holds self._lock
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry.fetched_at
+        ttl = self.ttl_for(symbol)
+        if age < ttl:
+            self._entries.move_to_end(symbol)
+            self.hits += 1
+            self._served(entry, age)
+            return entry.value
+        if age < ttl + self.stale_ttl:
+            self._entries.move_to_end(symbol)
+            self.stale_hits += 1
+            self._served(entry, age)
+            if not entry.refreshing and symbol not in self._inflight:
+                entry.refreshing = True
+                self._refresher.submit(self._refresh, symbol)
+            return entry.value
+        return None
+
+    def _served(self, entry: _Entry, age: float):
+        # Caller holds self._lock
+        if entry.prefetched:
+            self.prefetch_hits += 1
+        QUOTE_AGE_SECONDS.labels("prefetch" if entry.prefetched else "on_demand").observe(age)
+
+    def get_many(self, symbols: List[str], deadline: Optional[float] = None) -> List[QuoteResult]:
+        """
+        Fetches all `symbols` at once and returns results in the requested order.
+        Cache misses are fetched concurrently on a bounded thread pool; a failing
+        symbol only affects its own result, and symbols still pending after
+        `deadline` seconds are reported as timed out.
+        """
+        symbols = [s.upper() for s in symbols]
+        for symbol in dict.fromkeys(symbols):
+            self.record_request(symbol)
+        futures = {symbol: self._batch_pool.submit(self.get, symbol) for symbol in dict.fromkeys(symbols)}
+        wait(futures.values(), timeout=deadline)
+        results = {symbol: self._result(symbol, future) for symbol, future in futures.items()}
+        return [results[symbol] for symbol in symbols]
+
+    def _result(self, symbol: str, future: Future) -> QuoteResult:
+        try:
+            if not future.done():
+                return QuoteResult(symbol, error="Timed out fetching quote")
+            return QuoteResult(symbol, info=future.result())
+        except Exception as e:
+            return QuoteResult(symbol, error=str(e))
+
+    def prefetch(self, symbols: List[str], deadline: Optional[float] = None) -> List[QuoteResult]:
+        """
+        Fetches `symbols` from upstream ahead of demand on the refresh pool,
+        even if they are still fresh. A symbol already being fetched joins
+        that fetch instead.
+        """
+        futures = {symbol.upper(): self._refresher.submit(self._prefetch, symbol.upper()) for symbol in symbols}
+        wait(futures.values(), timeout=deadline)
+        return [self._result(symbol, future) for symbol, future in futures.items()]
+
+    def _prefetch(self, symbol: str) -> Dict[str, Any]:
+        with self._lock:
+            future = self._inflight.get(symbol)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[symbol] = future
+                self.prefetched += 1
+        if not owner:
+            return self._join(symbol, future)
+        return self._fetch(symbol, future, prefetched=True)
+
+    def put(self, symbol: str, value: Dict[str, Any]):
+        """Stores a quote fetched elsewhere (e.g. by a batch request)."""
+        symbol = symbol.upper()
+        with self._lock:
+            self._store(symbol, value)
+
+    def _fetch(self, symbol: str, future: Future, prefetched: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            self.upstream_fetches += 1
+        try:
+            value = self.source.fetch(symbol)
+        except BaseException as e:
+            with self._lock:
+                self.errors += 1
+                self._inflight.pop(symbol, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._store(symbol, value, prefetched)
+            self._inflight.pop(symbol, None)
+        future.set_result(value)
+        return value
+
+    def _refresh(self, symbol: str):
+        with self._lock:
+            if symbol in self._inflight:
+                return
+            future = Future()
+            self._inflight[symbol] = future
+            self.refreshes += 1
+        try:
+            self._fetch(symbol, future)
+        except Exception as e:
+            logger.warning(f"Background refresh for {symbol} failed: {e}")
+            with self._lock:
+                entry = self._entries.get(symbol)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def _store(self, symbol: str, value: Dict[str, Any], prefetched: bool = False):
+        self._entries[symbol] = _Entry(value, time.monotonic(), prefetched)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "evictions": self.evictions,
+                "upstream_fetches": self.upstream_fetches,
+                "join_timeouts": self.join_timeouts,
+                "requests": self.requests,
+                "prefetched": self.prefetched,
+                "prefetch_hits": self.prefetch_hits,
+            }
+
+
+def _ttl_overrides_from_env() -> Dict[str, float]:
+    """Parses QUOTE_CACHE_TTL_OVERRIDES, e.g. "GC=F:60,SI=F:60,AAPL:10"."""
+    overrides = {}
+    for item in os.getenv("QUOTE_CACHE_TTL_OVERRIDES", "").split(","):
+        if ":" in item:
+            symbol, ttl = item.rsplit(":", 1)
+            overrides[symbol.strip().upper()] = float(ttl)
+    return overrides
+
+
+def _source_from_env() -> QuoteSource:
+    """QUOTE_SOURCE=fake serves deterministic local quotes (latency from FAKE_QUOTE_LATENCY)."""
+    if os.getenv("QUOTE_SOURCE", "yfinance").lower() == "fake":
+        return FakeQuoteSource(latency=float(os.getenv("FAKE_QUOTE_LATENCY", "0")))
+    return YFinanceQuoteSource()
+
+
+_quote_cache: Optional[QuoteCache] = None
+_quote_cache_lock = threading.Lock()
+
+
+def get_quote_cache() -> QuoteCache:
+    """Shared quote cache, configured from QUOTE_CACHE_* environment variables on first use"""
+    global _quote_cache
+    with _quote_cache_lock:
+        if _quote_cache is None:
+            _quote_cache = QuoteCache(
+                _source_from_env(),
+                ttl=float(os.getenv("QUOTE_CACHE_TTL", "30")),
+                stale_ttl=float(os.getenv("QUOTE_CACHE_STALE_TTL", "300")),
+                max_size=int(os.getenv("QUOTE_CACHE_MAX_SIZE", "1024")),
+                ttl_overrides=_ttl_overrides_from_env(),
+                batch_workers=int(os.getenv("QUOTE_BATCH_WORKERS", "16")),
+                fetch_timeout=float(os.getenv("QUOTE_FETCH_TIMEOUT", "10")),
+            )
+        return _quote_cache
+
+
+def get_quote(symbol: str) -> Dict[str, Any]:
+    """Get quote info for a symbol through the shared cache"""
+    cache = get_quote_cache()
+    cache.record_request(symbol)
+    return cache.get(symbol)
+
+
+def get_quotes(symbols: List[str], deadline: Optional[float] = None) -> List[QuoteResult]:
+    """Get quote info for several symbols at once, in the requested order"""
+    if deadline is None:
+        deadline = float(os.getenv("QUOTE_BATCH_DEADLINE", "10"))
+    return get_quote_cache().get_many(symbols, deadline)
+
+
+def quote_as_of(symbols: List[str]) -> str:
+    """
+    When the quotes served for `symbols` were fetched (the oldest of them),
+    as a local ISO timestamp. Cached quotes can be up to TTL + stale TTL old.
+    """
+    cache = get_quote_cache()
+    age = max((cache.age(symbol) or 0.0 for symbol in symbols), default=0.0)
+    return (datetime.now() - timedelta(seconds=age)).isoformat(timespec="seconds")
+
+
+async def aget_quote(symbol: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Async variant of get_quote. Cached quotes are returned inline; upstream
+    fetches run on the blocking executor and are bounded by `timeout`.
+    """
+    cache = get_quote_cache()
+    cache.record_request(symbol)
+    cached = cache.peek(symbol)
+    if cached is not None:
+        return cached
+    return await run_blocking(cache.get, symbol, timeout=timeout)
+
+
+async def aget_quotes(symbols: List[str], deadline: Optional[float] = None) -> List[QuoteResult]:
+    """
+    Async variant of get_quotes. Cached quotes are returned inline; the
+    misses are fetched together by one get_many batch (on the quote batch
+    pool), which holds a single blocking-executor worker.
+    """
+    if deadline is None:
+        deadline = float(os.getenv("QUOTE_BATCH_DEADLINE", "10"))
+    cache = get_quote_cache()
+    symbols = [s.upper() for s in symbols]
+    results: Dict[str, QuoteResult] = {}
+    misses = []
+    for symbol in dict.fromkeys(symbols):
+        cached = cache.peek(symbol)
+        if cached is None:
+            misses.append(symbol)  # get_many records the request
+        else:
+            cache.record_request(symbol)
+            results[symbol] = QuoteResult(symbol, info=cached)
+
+    if misses:
+        try:
+            # get_many stops waiting at the deadline itself; the margin covers the hop to the executor
+            fetched = await run_blocking(cache.get_many, misses, deadline, timeout=deadline + 1)
+        except TimeoutError:
+            fetched = [QuoteResult(symbol, error="Timed out fetching quote") for symbol in misses]
+        results.update((result.symbol, result) for result in fetched)
+    return [results[symbol] for symbol in symbols]
+
+
+def set_quote_source(source: QuoteSource):
+    """Swap the upstream quote source (e.g. a FakeQuoteSource for tests) and drop cached quotes"""
+    cache = get_quote_cache()
+    cache.source = source
+    cache.clear()
@@ -0,0 +1,41 @@
+"""
+Tool Call Coalescing (server side)
+Installs mcp_common.singleflight as FastMCP middleware for the tools listed
+in MCP_COALESCE_TOOLS.
+"""
+
+import logging
+from typing import FrozenSet
+
+from fastmcp.server.middleware import Middleware
+
+from mcp_common.singleflight import SingleFlight, call_key, coalesce_tools_from_env
+from mcp_server.metrics import TOOL_COALESCED
+
+logger = logging.getLogger("mcp_server")
+
+
+class CoalescingMiddleware(Middleware):
+    """Shares one execution between identical concurrent calls of the opted-in tools."""
+
+    def __init__(self, tools: FrozenSet[str]):
+        self.tools = tools
+        self.flight = SingleFlight()
+
+    async def on_call_tool(self, context, call_next):
+        name = context.message.name
+        if name not in self.tools:
+            return await call_next(context)
+
+        result, shared = await self.flight.do(call_key(name, context.message.arguments), lambda: call_next(context))
+        if shared:
+            TOOL_COALESCED.labels(name).inc()
+        return result
+
+
+def register(mcp):
+    """Installs the coalescing middleware for the tools in MCP_COALESCE_TOOLS."""
+    tools = coalesce_tools_from_env()
+    if tools:
+        logger.info(f"Coalescing identical concurrent calls of: {', '.join(sorted(tools))}")
+        mcp.add_middleware(CoalescingMiddleware(tools))
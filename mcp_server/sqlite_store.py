@@ -0,0 +1,367 @@
+"""
+SQLite Store
+Optional persistent backend for customers, accounts and transactions.
+Same interface as data.InMemoryRepository, selected with DATA_BACKEND=sqlite.
+
+Bulk load CSV/JSONL files with:
+
+    python -m mcp_server.sqlite_store load --db banking.db accounts accounts.csv
+"""
+
+import os
+import csv
+import json
+import time
+import queue
+import sqlite3
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from mcp_server.data import BalanceSummary, TransactionPage, decode_cursor, encode_cursor
+
+logger = logging.getLogger("mcp_server")
+
+COLUMNS = {
+    "customers": ["customer_id", "name", "email", "phone", "status", "joined_date"],
+    "accounts": [
+        "account_id", "customer_id", "account_type", "account_number", "balance",
+        "currency", "status", "opening_date", "interest_rate",
+    ],
+    "transactions": [
+        "transaction_id", "customer_id", "account_id", "date", "description",
+        "amount", "type", "balance_after",
+    ],
+}
+
+# Transactions are returned without customer_id, like the in-memory records
+TRANSACTION_FIELDS = [c for c in COLUMNS["transactions"] if c != "customer_id"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    phone TEXT,
+    status TEXT,
+    joined_date TEXT
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    account_type TEXT NOT NULL,
+    account_number TEXT,
+    balance REAL NOT NULL DEFAULT 0,
+    currency TEXT,
+    status TEXT,
+    opening_date TEXT,
+    interest_rate REAL
+);
+CREATE INDEX IF NOT EXISTS idx_accounts_customer_type ON accounts (customer_id, account_type);
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    description TEXT,
+    amount REAL NOT NULL,
+    type TEXT,
+    balance_after REAL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_customer_date ON transactions (customer_id, date, transaction_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions (account_id);
+"""
+
+# Statements are kept as constants so each connection's statement cache reuses them
+SQL_CUSTOMER = "SELECT * FROM customers WHERE customer_id = ?"
+SQL_ACCOUNT = "SELECT * FROM accounts WHERE account_id = ?"
+SQL_ACCOUNTS_BY_CUSTOMER = "SELECT * FROM accounts WHERE customer_id = ? ORDER BY rowid"
+# Case-insensitive like the in-memory repository; the index still narrows to the customer
+SQL_ACCOUNTS_BY_TYPE = "SELECT * FROM accounts WHERE customer_id = ? AND lower(account_type) = ? ORDER BY rowid"
+SQL_TOTAL_BALANCE = "SELECT COALESCE(SUM(balance), 0) AS total FROM accounts WHERE customer_id = ?"
+SQL_BALANCE_BY_TYPE = (
+    "SELECT lower(account_type) AS account_type, COUNT(*) AS count, SUM(balance) AS total "
+    "FROM accounts WHERE customer_id = ? GROUP BY lower(account_type)"
+)
+SQL_UPDATE_BALANCE = "UPDATE accounts SET balance = ? WHERE account_id = ?"
+_TRANSACTION_SELECT = f"SELECT {', '.join(TRANSACTION_FIELDS)} FROM transactions"
+_NEWEST_FIRST = "ORDER BY date DESC, transaction_id DESC LIMIT ?"
+SQL_TRANSACTIONS_BY_CUSTOMER = f"{_TRANSACTION_SELECT} WHERE customer_id = ? {_NEWEST_FIRST}"
+SQL_TRANSACTION_COUNT = "SELECT COUNT(*) AS count FROM transactions WHERE customer_id = ?"
+SQL_TRANSACTIONS_RANGE = (
+    f"{_TRANSACTION_SELECT} WHERE customer_id = ? AND date >= ? AND date <= ? ORDER BY date, transaction_id"
+)
+# Unused bounds are passed as '' / '\uffff' so one statement covers every filter combination.
+# The cursor date is folded into the upper date bound so it limits the index range.
+SQL_TRANSACTIONS_PAGE = (
+    f"{_TRANSACTION_SELECT} WHERE customer_id = ? AND date >= ? AND date <= ? "
+    f"AND (date < ? OR transaction_id < ?) {_NEWEST_FIRST}"
+)
+
+def _insert_sql(table: str, null_empty: bool = False) -> str:
+    columns = COLUMNS[table]
+    value = "NULLIF(?, '')" if null_empty else "?"
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([value] * len(columns))})"
+
+
+def _dict_row(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+class SQLiteRepository:
+    """
+    SQLite (WAL mode) repository.
+    Reads go through a fixed pool of connections that any thread can check
+    out, so async tools can run queries on the blocking executor; writes are
+    serialized on a single writer connection.
+    """
+
+    # Queries do file I/O, so async tools offload them (see data.run_query)
+    blocking_io = True
+
+    def __init__(self, path: str, readers: int = 4):
+        if path == ":memory:":
+            raise ValueError("SQLiteRepository needs a file path so reader connections share the database")
+        self.path = path
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._write_lock = threading.Lock()
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(readers):
+            self._readers.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.row_factory = _dict_row
+        return conn
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        self._writer.close()
+
+    # Writes
+
+    def add_customer(self, customer: Dict[str, Any]):
+        self._insert("customers", [customer])
+
+    def add_account(self, account: Dict[str, Any]):
+        self._insert("accounts", [account])
+
+    def add_transaction(self, customer_id: str, transaction: Dict[str, Any]):
+        self._insert("transactions", [{**transaction, "customer_id": customer_id}])
+
+    def update_balance(self, account_id: str, balance: float):
+        with self._write_lock:
+            if self._writer.execute(SQL_UPDATE_BALANCE, (balance, account_id)).rowcount == 0:
+                raise ValueError(f"Unknown account {account_id}")
+
+    def post_transaction(self, customer_id: str, transaction: Dict[str, Any]):
+        """Applies a new transaction's amount to its account, sets balance_after and records it"""
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                account = self._writer.execute(SQL_ACCOUNT, (transaction["account_id"],)).fetchone()
+                if account is None or account["customer_id"] != customer_id:
+                    raise ValueError(f"Unknown account {transaction['account_id']} for customer {customer_id}")
+                balance = round(account["balance"] + transaction["amount"], 2)
+                self._writer.execute(SQL_UPDATE_BALANCE, (balance, account["account_id"]))
+                record = {**transaction, "customer_id": customer_id, "balance_after": balance}
+                self._writer.execute(_insert_sql("transactions"), [record.get(c) for c in COLUMNS["transactions"]])
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+
+    def _insert(self, table: str, records: Iterable[Dict[str, Any]]):
+        columns = COLUMNS[table]
+        with self._write_lock:
+            self._writer.executemany(_insert_sql(table), ([r.get(c) for c in columns] for r in records))
+
+    def is_empty(self) -> bool:
+        with self._read() as conn:
+            return conn.execute("SELECT 1 FROM customers LIMIT 1").fetchone() is None
+
+    def seed(self, customers: Dict, accounts: Dict, transactions: Dict):
+        """Loads the mock dicts into an empty database."""
+        with self._write_lock:
+            self._writer.execute("BEGIN")
+            try:
+                for table, records in (
+                    ("customers", customers.values()),
+                    ("accounts", accounts.values()),
+                    ("transactions", (
+                        {**txn, "customer_id": cid} for cid, txns in transactions.items() for txn in txns
+                    )),
+                ):
+                    columns = COLUMNS[table]
+                    self._writer.executemany(_insert_sql(table), ([r.get(c) for c in columns] for r in records))
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+
+    def bulk_load(self, table: str, path: str, batch_size: int = 50_000) -> int:
+        """
+        Imports a CSV (with header) or JSONL file into `table` in one transaction.
+        Returns the number of rows loaded.
+        """
+        if table not in COLUMNS:
+            raise ValueError(f"Unknown table: {table}")
+        columns = COLUMNS[table]
+        # Empty CSV cells are missing values (NULL), as in the in-memory loader
+        sql = _insert_sql(table, null_empty=True)
+        rows = _read_rows(path, columns)
+        loaded = 0
+        with self._write_lock:
+            # A large page cache keeps index pages in memory while rows stream in
+            self._writer.execute("PRAGMA synchronous=OFF")
+            self._writer.execute("PRAGMA cache_size=-262144")
+            self._writer.execute("BEGIN")
+            try:
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        self._writer.executemany(sql, batch)
+                        loaded += len(batch)
+                        batch = []
+                if batch:
+                    self._writer.executemany(sql, batch)
+                    loaded += len(batch)
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            finally:
+                self._writer.execute("PRAGMA synchronous=NORMAL")
+                self._writer.execute("PRAGMA cache_size=-2000")
+            self._writer.execute(f"ANALYZE {table}")
+        return loaded
+
+    # Reads
+
+    def get_customer(self, customer_id: str) -> Dict[str, Any] | None:
+        with self._read() as conn:
+            return conn.execute(SQL_CUSTOMER, (customer_id,)).fetchone()
+
+    def get_account(self, account_id: str) -> Dict[str, Any] | None:
+        with self._read() as conn:
+            return conn.execute(SQL_ACCOUNT, (account_id,)).fetchone()
+
+    def get_accounts_by_customer(self, customer_id: str) -> List[Dict[str, Any]]:
+        with self._read() as conn:
+            return conn.execute(SQL_ACCOUNTS_BY_CUSTOMER, (customer_id,)).fetchall()
+
+    def get_accounts_by_type(self, customer_id: str, account_type: str) -> List[Dict[str, Any]]:
+        with self._read() as conn:
+            return conn.execute(SQL_ACCOUNTS_BY_TYPE, (customer_id, account_type.lower())).fetchall()
+
+    def get_transactions_by_customer(self, customer_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        with self._read() as conn:
+            return conn.execute(SQL_TRANSACTIONS_BY_CUSTOMER, (customer_id, limit)).fetchall()
+
+    def get_transactions_page(
+        self,
+        customer_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+    ) -> TransactionPage:
+        before_date, before_id = decode_cursor(cursor) if cursor else ("\uffff", "")
+        upper = min(end_date or "\uffff", before_date)
+        params = (customer_id, start_date or "", upper, before_date, before_id, limit + 1)
+        with self._read() as conn:
+            rows = conn.execute(SQL_TRANSACTIONS_PAGE, params).fetchall()
+        # One extra row tells whether another page exists
+        if len(rows) <= limit:
+            return TransactionPage(rows)
+        rows = rows[:limit]
+        return TransactionPage(rows, encode_cursor(rows[-1]["date"], rows[-1]["transaction_id"]))
+
+    def get_transactions_in_range(
+        self, customer_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        params = (customer_id, start_date or "", end_date or "\uffff")
+        with self._read() as conn:
+            return conn.execute(SQL_TRANSACTIONS_RANGE, params).fetchall()
+
+    def get_transaction_count(self, customer_id: str) -> int:
+        with self._read() as conn:
+            return conn.execute(SQL_TRANSACTION_COUNT, (customer_id,)).fetchone()["count"]
+
+    def get_total_balance(self, customer_id: str) -> float:
+        with self._read() as conn:
+            return conn.execute(SQL_TOTAL_BALANCE, (customer_id,)).fetchone()["total"]
+
+    def get_balance_summary(self, customer_id: str) -> BalanceSummary:
+        # Aggregated on read: one pass over the customer's entries in the (customer_id, account_type) index
+        with self._read() as conn:
+            rows = conn.execute(SQL_BALANCE_BY_TYPE, (customer_id,)).fetchall()
+        return BalanceSummary(
+            round(sum(r["total"] for r in rows), 2),
+            sum(r["count"] for r in rows),
+            {r["account_type"]: round(r["total"], 2) for r in rows},
+        )
+
+
+def _read_rows(path: str, columns: List[str], chunk_bytes: int = 8 << 20) -> Iterator[tuple]:
+    """Yields rows as column-ordered tuples from a CSV or JSONL file."""
+    with open(path, newline="") as f:
+        if path.endswith(".jsonl") or path.endswith(".ndjson"):
+            pick = itemgetter(*columns)
+            while True:
+                # Parsing a chunk of lines as one JSON array is much faster than line by line
+                lines = [line for line in f.readlines(chunk_bytes) if line.strip()]
+                if not lines:
+                    break
+                for record in json.loads("[" + ",".join(lines) + "]"):
+                    try:
+                        yield pick(record)
+                    except KeyError:
+                        yield tuple(record.get(c) for c in columns)
+        else:
+            reader = csv.reader(f)
+            header = next(reader)
+            missing = [c for c in columns if c not in header]
+            if missing:
+                raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+            # REAL columns convert numeric text on insert, so rows only need reordering
+            # (empty cells become NULL in the insert, see bulk_load)
+            yield from map(itemgetter(*(header.index(c) for c in columns)), reader)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the SQLite banking data store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load", help="Bulk load a CSV or JSONL file into a table")
+    load.add_argument("table", choices=sorted(COLUMNS))
+    load.add_argument("path")
+    load.add_argument("--db", default=os.getenv("DATA_SQLITE_PATH", "banking.db"))
+    args = parser.parse_args()
+
+    repo = SQLiteRepository(args.db, readers=1)
+    start = time.perf_counter()
+    count = repo.bulk_load(args.table, args.path)
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {count:,} rows into {args.table} in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s)")
+    repo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Synthetic Data
+Generates large, deterministic customer/account/transaction datasets for
+scale tests and benchmarks.
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List
+
+from mcp_server.data import InMemoryRepository
+
+ACCOUNT_TYPES = ["checking", "savings", "investment"]
+INTEREST_RATES = {"checking": 0.5, "savings": 2.5, "investment": 0.0}
+DESCRIPTIONS = [
+    "Grocery Store", "Salary Deposit", "Interest Credit", "Electric Bill", "ATM Withdrawal",
+    "Restaurant", "Online Shopping", "Gas Station", "Rent Payment", "Stock Purchase",
+]
+
+
+def customer_id(n: int) -> str:
+    return f"C{n:08d}"
+
+
+def account_id(n: int) -> str:
+    return f"A{n:09d}"
+
+
+def iter_customers(num_customers: int) -> Iterator[Dict[str, Any]]:
+    for n in range(num_customers):
+        yield {
+            "customer_id": customer_id(n),
+            "name": f"Customer {n}",
+            "email": f"customer{n}@example.com",
+            "phone": f"+1-555-{n % 10000:04d}",
+            "status": "active",
+            "joined_date": "2020-01-15",
+        }
+
+
+def iter_accounts(num_accounts: int, accounts_per_customer: int = 3, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for n in range(num_accounts):
+        account_type = ACCOUNT_TYPES[n % accounts_per_customer % len(ACCOUNT_TYPES)]
+        yield {
+            "account_id": account_id(n),
+            "customer_id": customer_id(n // accounts_per_customer),
+            "account_type": account_type,
+            "account_number": f"****{n % 10000:04d}",
+            "balance": round(rng.uniform(0, 50000), 2),
+            "currency": "USD",
+            "status": "active",
+            "opening_date": "2020-01-15",
+            "interest_rate": INTEREST_RATES[account_type],
+        }
+
+
+def iter_transactions(
+    num_transactions: int,
+    num_accounts: int,
+    accounts_per_customer: int = 3,
+    days: int = 365,
+    seed: int = 0,
+    start: date | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """Transactions spread over `num_accounts` accounts and the `days` before `start` (default today)."""
+    rng = random.Random(seed)
+    start = start or date.today()
+    for n in range(num_transactions):
+        acc = rng.randrange(num_accounts)
+        amount = round(rng.uniform(-500, 500), 2)
+        yield {
+            "transaction_id": f"T{n:010d}",
+            "account_id": account_id(acc),
+            "customer_id": customer_id(acc // accounts_per_customer),
+            "date": (start - timedelta(days=rng.randrange(days))).strftime("%Y-%m-%d"),
+            "description": DESCRIPTIONS[rng.randrange(len(DESCRIPTIONS))],
+            "amount": amount,
+            "type": "credit" if amount >= 0 else "debit",
+            "balance_after": round(rng.uniform(0, 50000), 2),
+        }
+
+
+def generate_repository(
+    num_accounts: int,
+    accounts_per_customer: int = 3,
+    num_transactions: int = 0,
+    seed: int = 0,
+) -> InMemoryRepository:
+    """Builds an InMemoryRepository with `num_accounts` accounts (and their customers)."""
+    repo = InMemoryRepository()
+    num_customers = -(-num_accounts // accounts_per_customer)
+    for customer in iter_customers(num_customers):
+        repo.add_customer(customer)
+    for account in iter_accounts(num_accounts, accounts_per_customer, seed):
+        repo.add_account(account)
+    for txn in iter_transactions(num_transactions, num_accounts, accounts_per_customer, seed=seed):
+        repo.add_transaction(txn.pop("customer_id"), txn)
+    return repo
+
+
+def sample_customer_ids(num_accounts: int, count: int, accounts_per_customer: int = 3, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    num_customers = -(-num_accounts // accounts_per_customer)
+    return [customer_id(rng.randrange(num_customers)) for _ in range(count)]
@@ -1,5 +1,6 @@
 import logging
 from mcp_server.data import (
+    run_query,
     get_customer_by_id,
     get_accounts_by_customer,
     get_account_by_id
@@ -8,11 +9,46 @@ from mcp_server.data import (
 logger = logging.getLogger("mcp_server")
 
 
+def _get_account_info(customer_id: str) -> dict:
+    customer = get_customer_by_id(customer_id)
+    if not customer:
+        return {"error": f"Customer {customer_id} not found."}
+    
+    accounts = get_accounts_by_customer(customer_id)
+    return {
+        "customer": {
+            "name": customer['name'],
+            "customer_id": customer['customer_id'],
+            "email": customer['email'],
+            "phone": customer['phone'],
+            "status": customer['status'],
+            "member_since": customer['joined_date'],
+        },
+        "accounts": [
+            {
+                "account_type": acc['account_type'],
+                "account_number": acc['account_number'],
+                "balance": acc['balance'],
+                "currency": acc['currency'],
+                "status": acc['status'],
+                "opening_date": acc['opening_date'],
+                "interest_rate_pct": acc['interest_rate'],
+            }
+            for acc in accounts
+        ],
+    }
+
+
+def _get_account_types(customer_id: str) -> dict:
+    accounts = get_accounts_by_customer(customer_id)
+    return {"customer_id": customer_id, "account_types": [acc['account_type'] for acc in accounts]}
+
+
 def register(mcp):
     """Register account information tools with the MCP server"""
-    
+
     @mcp.tool()
-    def get_account_info(customer_id: str) -> str:
+    async def get_account_info(customer_id: str) -> dict:
         """
         Get comprehensive account information for a customer.
         
@@ -20,41 +56,13 @@ def register(mcp):
             customer_id: The customer ID (e.g., C001)
             
         Returns:
-            Formatted account information including all accounts
+            Customer details and all of the customer's accounts
         """
         logger.info(f"Tool used: get_account_info (Customer: {customer_id})")
-        
-        customer = get_customer_by_id(customer_id)
-        if not customer:
-            return f"Error: Customer {customer_id} not found."
-        
-        accounts = get_accounts_by_customer(customer_id)
-        if not accounts:
-            return f"No accounts found for customer {customer_id}."
-        
-        # Format customer info
-        result = f"**Customer Information**\n"
-        result += f"- Name: {customer['name']}\n"
-        result += f"- Customer ID: {customer['customer_id']}\n"
-        result += f"- Email: {customer['email']}\n"
-        result += f"- Phone: {customer['phone']}\n"
-        result += f"- Status: {customer['status']}\n"
-        result += f"- Member Since: {customer['joined_date']}\n\n"
-        
-        # Format accounts
-        result += f"**Accounts ({len(accounts)})**\n\n"
-        for acc in accounts:
-            result += f"### {acc['account_type'].title()} Account\n"
-            result += f"- Account Number: {acc['account_number']}\n"
-            result += f"- Balance: ${acc['balance']:,.2f} {acc['currency']}\n"
-            result += f"- Status: {acc['status']}\n"
-            result += f"- Opening Date: {acc['opening_date']}\n"
-            result += f"- Interest Rate: {acc['interest_rate']}%\n\n"
-        
-        return result
-    
+        return await run_query(_get_account_info, customer_id)
+
     @mcp.tool()
-    def get_account_types(customer_id: str) -> str:
+    async def get_account_types(customer_id: str) -> dict:
         """
         Get a list of account types for a customer.
         
@@ -65,10 +73,4 @@ def register(mcp):
             List of account types
         """
         logger.info(f"Tool used: get_account_types (Customer: {customer_id})")
-        
-        accounts = get_accounts_by_customer(customer_id)
-        if not accounts:
-            return f"No accounts found for customer {customer_id}."
-        
-        account_types = [acc['account_type'].title() for acc in accounts]
-        return f"Account types for {customer_id}: {', '.join(account_types)}"
+        return await run_query(_get_account_types, customer_id)
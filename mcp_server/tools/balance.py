@@ -1,19 +1,88 @@
 import logging
 from mcp_server.data import (
+    run_query,
     get_accounts_by_customer,
+    get_accounts_by_type,
     get_account_by_id,
-    get_transactions_by_customer,
-    get_total_balance
+    get_transactions_page,
+    get_balance_summary
 )
 
 logger = logging.getLogger("mcp_server")
 
 
+def _check_balance(customer_id: str, account_type: str = "all") -> dict:
+    if account_type.lower() == "all":
+        accounts = get_accounts_by_customer(customer_id)
+        if not accounts:
+            return {"error": f"No accounts found for customer {customer_id}."}
+        
+        return {
+            "customer_id": customer_id,
+            "accounts": [{"account_type": acc['account_type'], "balance": acc['balance']} for acc in accounts],
+            "total_balance": get_balance_summary(customer_id).total,
+            "currency": "USD",
+        }
+    else:
+        # Find specific account type
+        matching_accounts = get_accounts_by_type(customer_id, account_type)
+        if not matching_accounts:
+            if not get_accounts_by_customer(customer_id):
+                return {"error": f"No accounts found for customer {customer_id}."}
+            return {"error": f"No {account_type} account found for customer {customer_id}."}
+        
+        acc = matching_accounts[0]
+        return {
+            "customer_id": customer_id,
+            "account_type": acc['account_type'],
+            "account_number": acc['account_number'],
+            "balance": acc['balance'],
+            "currency": acc['currency'],
+            "status": acc['status'],
+        }
+
+
+def _get_recent_transactions(customer_id: str, limit: int = 5, start_date: str = "",
+                             end_date: str = "", cursor: str = "") -> dict:
+    try:
+        page = get_transactions_page(customer_id, start_date, end_date, cursor, limit)
+    except ValueError as e:
+        return {"error": str(e)}
+    
+    # Debits are negative; pages are capped at MAX_PAGE_SIZE entries
+    return {
+        "customer_id": customer_id,
+        "transactions": [
+            {
+                "date": txn['date'],
+                "description": txn['description'],
+                "amount": abs(txn['amount']) if txn['type'] == 'credit' else -abs(txn['amount']),
+                "balance_after": txn['balance_after'],
+            }
+            for txn in page.items
+        ],
+        "next_cursor": page.next_cursor,
+    }
+
+
+def _get_total_portfolio_value(customer_id: str) -> dict:
+    summary = get_balance_summary(customer_id)
+    if summary.account_count == 0:
+        return {"error": f"No accounts found for customer {customer_id}."}
+    
+    return {
+        "customer_id": customer_id,
+        "total_value": summary.total,
+        "currency": "USD",
+        "account_count": summary.account_count,
+    }
+
+
 def register(mcp):
     """Register balance checking tools with the MCP server"""
-    
+
     @mcp.tool()
-    def check_balance(customer_id: str, account_type: str = "all") -> str:
+    async def check_balance(customer_id: str, account_type: str = "all") -> dict:
         """
         Check account balance for a customer.
         
@@ -25,62 +94,30 @@ def register(mcp):
             Account balance information
         """
         logger.info(f"Tool used: check_balance (Customer: {customer_id}, Type: {account_type})")
-        
-        accounts = get_accounts_by_customer(customer_id)
-        if not accounts:
-            return f"No accounts found for customer {customer_id}."
-        
-        if account_type.lower() == "all":
-            result = f"**Balance Summary for Customer {customer_id}**\n\n"
-            total = 0
-            for acc in accounts:
-                result += f"- {acc['account_type'].title()}: ${acc['balance']:,.2f}\n"
-                total += acc['balance']
-            result += f"\n**Total Balance: ${total:,.2f} USD**"
-            return result
-        else:
-            # Find specific account type
-            matching_accounts = [acc for acc in accounts if acc['account_type'].lower() == account_type.lower()]
-            if not matching_accounts:
-                return f"No {account_type} account found for customer {customer_id}."
-            
-            acc = matching_accounts[0]
-            result = f"**{acc['account_type'].title()} Account Balance**\n"
-            result += f"- Account Number: {acc['account_number']}\n"
-            result += f"- Balance: ${acc['balance']:,.2f} {acc['currency']}\n"
-            result += f"- Status: {acc['status']}"
-            return result
-    
+        return await run_query(_check_balance, customer_id, account_type)
+
     @mcp.tool()
-    def get_recent_transactions(customer_id: str, limit: int = 5) -> str:
+    async def get_recent_transactions(customer_id: str, limit: int = 5, start_date: str = "",
+                                      end_date: str = "", cursor: str = "") -> dict:
         """
-        Get recent transactions for a customer.
+        Get recent transactions for a customer, newest first.
         
         Args:
             customer_id: The customer ID (e.g., C001)
-            limit: Number of recent transactions to retrieve (default: 5)
+            limit: Number of transactions per page (default: 5, max: 100)
+            start_date: Only include transactions on or after this date (YYYY-MM-DD, optional)
+            end_date: Only include transactions on or before this date (YYYY-MM-DD, optional)
+            cursor: Next cursor from a previous call, to fetch the following page (optional)
             
         Returns:
-            Recent transaction history
+            Recent transaction history (debits as negative amounts) and the next page's cursor
         """
-        logger.info(f"Tool used: get_recent_transactions (Customer: {customer_id}, Limit: {limit})")
-        
-        transactions = get_transactions_by_customer(customer_id, limit)
-        if not transactions:
-            return f"No recent transactions found for customer {customer_id}."
-        
-        result = f"**Recent Transactions for Customer {customer_id}**\n\n"
-        for txn in transactions:
-            sign = "+" if txn['type'] == 'credit' else "-"
-            result += f"### {txn['date']}\n"
-            result += f"- Description: {txn['description']}\n"
-            result += f"- Amount: {sign}${abs(txn['amount']):,.2f}\n"
-            result += f"- Balance After: ${txn['balance_after']:,.2f}\n\n"
-        
-        return result
-    
+        logger.info(f"Tool used: get_recent_transactions (Customer: {customer_id}, Limit: {limit}, "
+                    f"Range: {start_date or '-'}..{end_date or '-'})")
+        return await run_query(_get_recent_transactions, customer_id, limit, start_date, end_date, cursor)
+
     @mcp.tool()
-    def get_total_portfolio_value(customer_id: str) -> str:
+    async def get_total_portfolio_value(customer_id: str) -> dict:
         """
         Get total portfolio value across all accounts for a customer.
         
@@ -91,13 +128,4 @@ def register(mcp):
             Total portfolio value
         """
         logger.info(f"Tool used: get_total_portfolio_value (Customer: {customer_id})")
-        
-        total = get_total_balance(customer_id)
-        if total == 0:
-            return f"No accounts found for customer {customer_id}."
-        
-        accounts = get_accounts_by_customer(customer_id)
-        result = f"**Total Portfolio Value for Customer {customer_id}**\n\n"
-        result += f"Total Value: ${total:,.2f} USD\n"
-        result += f"Accounts: {len(accounts)}\n"
-        return result
+        return await run_query(_get_total_portfolio_value, customer_id)
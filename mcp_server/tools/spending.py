@@ -0,0 +1,241 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from mcp_server.data import (
+    TransactionArrays,
+    get_repository,
+    get_transaction_count,
+    get_transactions_in_range,
+    validate_date
+)
+from mcp_server.executor import run_blocking
+
+logger = logging.getLogger("mcp_server")
+
+# Descriptions are matched (lowercased) against these keywords in order; first match wins
+CATEGORIES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("Groceries", ("grocery", "supermarket")),
+    ("Dining", ("restaurant", "cafe", "coffee")),
+    ("Utilities", ("electric", "water bill", "internet", "phone bill")),
+    ("Housing", ("rent", "mortgage")),
+    ("Transport", ("gas station", "fuel", "uber", "transit")),
+    ("Shopping", ("shopping", "amazon", "store")),
+    ("Cash", ("atm",)),
+    ("Investments", ("stock", "investment")),
+    ("Income", ("salary", "payroll")),
+    ("Interest", ("interest",)),
+]
+OTHER = "Other"
+# Months listed in the tool output (most recent)
+MAX_MONTHS = 12
+_CATEGORY_NAMES = [name for name, _ in CATEGORIES] + [OTHER]
+
+
+def categorize(description: str) -> str:
+    text = description.lower()
+    for name, keywords in CATEGORIES:
+        if any(k in text for k in keywords):
+            return name
+    return OTHER
+
+
+@dataclass
+class TransactionColumns:
+    """
+    A customer's transactions, oldest first, as parallel NumPy arrays.
+    Amounts are int64 cents, dates datetime64[D]; descriptions are
+    factorized into int32 codes into `descriptions`.
+    """
+    amounts: np.ndarray
+    days: np.ndarray
+    codes: np.ndarray
+    descriptions: List[str]
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "TransactionColumns":
+        n = len(records)
+        amounts = np.fromiter(map(itemgetter("amount"), records), dtype=np.float64, count=n)
+        days = np.array(list(map(itemgetter("date"), records)), dtype="datetime64[D]")
+        lookup: Dict[str, int] = {}
+        codes = np.fromiter(
+            (lookup.setdefault(d, len(lookup)) for d in map(itemgetter("description"), records)),
+            dtype=np.int32, count=n,
+        )
+        return cls(np.rint(amounts * 100).astype(np.int64), days, codes, list(lookup))
+
+    @classmethod
+    def from_arrays(cls, arrays: TransactionArrays) -> "TransactionColumns":
+        """From a repository's stored columns, without going through dicts"""
+        amounts = np.frombuffer(arrays.amounts, dtype=np.float64)
+        days = np.frombuffer(arrays.days, dtype=np.int32).astype(np.int64).view("datetime64[D]")
+        # The vocabulary is shared by all customers; keep (and later categorize) only this one's descriptions
+        used, codes = np.unique(np.frombuffer(arrays.descriptions, dtype=np.uint32), return_inverse=True)
+        descriptions = [arrays.vocabulary[i] for i in used.tolist()]
+        return cls(np.rint(amounts * 100).astype(np.int64), days, codes.astype(np.int32), descriptions)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def between(self, start_date: Optional[str], end_date: Optional[str]) -> "TransactionColumns":
+        """Rows within inclusive YYYY-MM-DD bounds (binary search, the rows are date-sorted)"""
+        lo = np.searchsorted(self.days, np.datetime64(start_date), "left") if start_date else 0
+        hi = np.searchsorted(self.days, np.datetime64(end_date), "right") if end_date else len(self)
+        return TransactionColumns(self.amounts[lo:hi], self.days[lo:hi], self.codes[lo:hi], self.descriptions)
+
+    def matching(self, query: str) -> "TransactionColumns":
+        """Rows whose category is `query` or whose description contains it (case-insensitive)"""
+        query = query.lower()
+        keep = np.array(
+            [query in d.lower() or categorize(d).lower() == query for d in self.descriptions], dtype=bool
+        )
+        mask = keep[self.codes] if len(self.descriptions) else np.zeros(0, dtype=bool)
+        return TransactionColumns(self.amounts[mask], self.days[mask], self.codes[mask], self.descriptions)
+
+
+_columns_cache: "OrderedDict[str, Tuple[Any, TransactionColumns]]" = OrderedDict()
+_columns_lock = threading.Lock()
+
+
+def load_columns(customer_id: str) -> TransactionColumns:
+    """
+    A customer's full transaction history as columns. Building them touches
+    every record, so they are kept in a small LRU (SPENDING_CACHE_SIZE
+    customers) and rebuilt only when the transaction count changes
+    (transactions are append-only) or the repository is replaced.
+    """
+    repository = get_repository()
+    count = get_transaction_count(customer_id)
+    with _columns_lock:
+        entry = _columns_cache.get(customer_id)
+        if entry is not None and entry[0] is repository and len(entry[1]) == count:
+            _columns_cache.move_to_end(customer_id)
+            return entry[1]
+    if hasattr(repository, "get_transaction_arrays"):
+        columns = TransactionColumns.from_arrays(repository.get_transaction_arrays(customer_id))
+    else:
+        columns = TransactionColumns.from_records(get_transactions_in_range(customer_id))
+    with _columns_lock:
+        _columns_cache[customer_id] = (repository, columns)
+        _columns_cache.move_to_end(customer_id)
+        while len(_columns_cache) > int(os.getenv("SPENDING_CACHE_SIZE", "32")):
+            _columns_cache.popitem(last=False)
+    return columns
+
+
+@dataclass
+class SpendingSummary:
+    """Totals in dollars; breakdowns are sorted by amount spent, months oldest first"""
+    count: int
+    spent: float
+    received: float
+    by_category: List[Tuple[str, float]]
+    by_description: List[Tuple[str, float]]
+    monthly: List[Tuple[str, float, float]]
+
+    @property
+    def net(self) -> float:
+        return self.received - self.spent
+
+
+def summarize(columns: TransactionColumns, top: int = 5) -> SpendingSummary:
+    """Debits (negative amounts) count as spending, credits as money received"""
+    if not len(columns):
+        return SpendingSummary(0, 0.0, 0.0, [], [], [])
+    amounts = columns.amounts
+    spent = np.where(amounts < 0, -amounts, 0)
+    received = np.where(amounts > 0, amounts, 0)
+
+    # Per-description sums, then rolled up to categories through the (small) description table
+    by_description = np.bincount(columns.codes, weights=spent, minlength=len(columns.descriptions))
+    category_of = np.array([_CATEGORY_NAMES.index(categorize(d)) for d in columns.descriptions], dtype=np.int64)
+    by_category = np.bincount(category_of, weights=by_description, minlength=len(_CATEGORY_NAMES))
+
+    months = columns.days.astype("datetime64[M]")
+    first = months.min()
+    bucket = (months - first).astype(np.int64)
+    monthly_spent = np.bincount(bucket, weights=spent)
+    monthly_received = np.bincount(bucket, weights=received)
+    active = np.flatnonzero(np.bincount(bucket))
+
+    def ranked(names, cents):
+        order = np.argsort(-cents, kind="stable")[:top]
+        return [(names[i], float(cents[i]) / 100) for i in order if cents[i] > 0]
+
+    return SpendingSummary(
+        count=len(columns),
+        spent=int(spent.sum()) / 100,
+        received=int(received.sum()) / 100,
+        by_category=ranked(_CATEGORY_NAMES, by_category),
+        by_description=ranked(columns.descriptions, by_description),
+        monthly=[(str(first + i), float(monthly_spent[i]) / 100, float(monthly_received[i]) / 100) for i in active],
+    )
+
+
+def _get_spending_summary(customer_id: str, start_date: str = "", end_date: str = "",
+                          category: str = "", top: int = 5, last_days: int = 0) -> dict:
+    if last_days > 0:
+        start_date = (date.today() - timedelta(days=last_days - 1)).isoformat()
+    try:
+        start, end = validate_date(start_date), validate_date(end_date)
+    except ValueError as e:
+        return {"error": str(e)}
+    columns = load_columns(customer_id).between(start, end)
+    if category:
+        columns = columns.matching(category)
+
+    summary = summarize(columns, max(1, min(top, 20)))
+    months = summary.monthly[-MAX_MONTHS:]
+    return {
+        "customer_id": customer_id,
+        "start_date": start_date or None,
+        "end_date": end_date or None,
+        "category": category or None,
+        "transactions": summary.count,
+        "spent": summary.spent,
+        "received": summary.received,
+        "net": round(summary.net, 2),
+        "spent_by_category": [{"category": name, "spent": amount} for name, amount in summary.by_category],
+        "top_descriptions": [{"description": name, "spent": amount} for name, amount in summary.by_description],
+        "monthly": [{"month": month, "spent": spent, "received": received} for month, spent, received in months],
+        "months_omitted": len(summary.monthly) - len(months) or None,
+    }
+
+
+def register(mcp):
+    """Register spending analytics tools with the MCP server"""
+
+    @mcp.tool()
+    async def get_spending_summary(customer_id: str, start_date: str = "", end_date: str = "",
+                                   category: str = "", top: int = 5, last_days: int = 0) -> dict:
+        """
+        Summarize a customer's spending: totals, spending by category and description,
+        monthly spent/received and credit vs debit sums. Use this instead of adding up
+        transactions for questions like "how much did I spend on groceries last quarter".
+
+        Args:
+            customer_id: The customer ID (e.g., C001)
+            start_date: Only include transactions on or after this date (YYYY-MM-DD, optional)
+            end_date: Only include transactions on or before this date (YYYY-MM-DD, optional)
+            category: Only include one category (e.g., Groceries, Dining, Utilities) or
+                transactions whose description contains this text (optional)
+            top: Number of categories and descriptions to list (default: 5)
+            last_days: Only include the last N days, including today (e.g., 90 for the last
+                quarter); overrides start_date (optional)
+
+        Returns:
+            Compact spending summary
+        """
+        period = f"last {last_days}d" if last_days > 0 else f"{start_date or '-'}..{end_date or '-'}"
+        logger.info(f"Tool used: get_spending_summary (Customer: {customer_id}, Range: {period}, "
+                    f"Category: {category or '-'})")
+        # Loading and summarizing can take a while for long histories, so it always leaves the event loop;
+        # repositories hand out their columns to other threads as snapshots taken under their lock
+        return await run_blocking(_get_spending_summary, customer_id, start_date, end_date, category, top, last_days)
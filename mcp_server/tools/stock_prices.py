@@ -1,15 +1,22 @@
 import logging
-import yfinance as yf
-from datetime import datetime
+from mcp_server.quotes import aget_quote, aget_quotes, quote_as_of
 
 logger = logging.getLogger("mcp_server")
 
 
+def _price_change(price: float, previous_close: float) -> dict:
+    change = price - previous_close if previous_close else 0
+    return {
+        "change": round(change, 2),
+        "change_pct": round(change / previous_close * 100, 2) if previous_close else 0,
+    }
+
+
 def register(mcp):
     """Register stock price tools with the MCP server"""
     
     @mcp.tool()
-    def get_stock_price(symbol: str) -> str:
+    async def get_stock_price(symbol: str) -> dict:
         """
         Get current stock price for a given symbol.
         
@@ -22,43 +29,31 @@ def register(mcp):
         logger.info(f"Tool used: get_stock_price (Symbol: {symbol})")
         
         try:
-            ticker = yf.Ticker(symbol.upper())
-            info = ticker.info
+            info = await aget_quote(symbol.upper())
             
-            # Get current price
             current_price = info.get('currentPrice') or info.get('regularMarketPrice')
             if not current_price:
-                return f"Unable to fetch price for {symbol}. Please verify the symbol is correct."
+                return {"error": f"Unable to fetch price for {symbol}. Please verify the symbol is correct."}
             
-            # Get additional info
             previous_close = info.get('previousClose', 0)
-            change = current_price - previous_close if previous_close else 0
-            change_percent = (change / previous_close * 100) if previous_close else 0
-            
-            company_name = info.get('longName', symbol)
-            market_cap = info.get('marketCap')
-            volume = info.get('volume')
-            
-            result = f"**{company_name} ({symbol.upper()})**\n\n"
-            result += f"- Current Price: ${current_price:.2f}\n"
-            result += f"- Previous Close: ${previous_close:.2f}\n"
-            result += f"- Change: ${change:+.2f} ({change_percent:+.2f}%)\n"
-            
-            if market_cap:
-                result += f"- Market Cap: ${market_cap:,.0f}\n"
-            if volume:
-                result += f"- Volume: {volume:,}\n"
-            
-            result += f"\n*Data as of {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*"
-            
-            return result
+            return {
+                "symbol": symbol.upper(),
+                "name": info.get('longName', symbol),
+                "price": round(current_price, 2),
+                "previous_close": round(previous_close, 2),
+                **_price_change(current_price, previous_close),
+                "market_cap": info.get('marketCap'),
+                "volume": info.get('volume'),
+                "currency": "USD",
+                "as_of": quote_as_of([symbol]),
+            }
             
         except Exception as e:
             logger.error(f"Error fetching stock price for {symbol}: {e}")
-            return f"Error fetching stock price for {symbol}: {str(e)}"
+            return {"error": f"Error fetching stock price for {symbol}: {str(e)}"}
     
     @mcp.tool()
-    def get_multiple_stock_prices(symbols: str) -> str:
+    async def get_multiple_stock_prices(symbols: str) -> dict:
         """
         Get current prices for multiple stocks.
         
@@ -70,30 +65,26 @@ def register(mcp):
         """
         logger.info(f"Tool used: get_multiple_stock_prices (Symbols: {symbols})")
         
-        symbol_list = [s.strip().upper() for s in symbols.split(',')]
-        
-        result = f"**Stock Prices for {len(symbol_list)} Symbols**\n\n"
+        symbol_list = [s.strip().upper() for s in symbols.split(',') if s.strip()]
         
-        for symbol in symbol_list:
-            try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                
-                current_price = info.get('currentPrice') or info.get('regularMarketPrice')
-                previous_close = info.get('previousClose', 0)
-                change = current_price - previous_close if current_price and previous_close else 0
-                change_percent = (change / previous_close * 100) if previous_close else 0
-                
-                if current_price:
-                    result += f"### {symbol}\n"
-                    result += f"- Price: ${current_price:.2f}\n"
-                    result += f"- Change: ${change:+.2f} ({change_percent:+.2f}%)\n\n"
-                else:
-                    result += f"### {symbol}\n- Unable to fetch price\n\n"
-                    
-            except Exception as e:
-                logger.error(f"Error fetching {symbol}: {e}")
-                result += f"### {symbol}\n- Error: {str(e)}\n\n"
+        # Fetch all symbols at once; one failing symbol does not affect the others
+        quotes = []
+        for quote in await aget_quotes(symbol_list):
+            if quote.error:
+                logger.error(f"Error fetching {quote.symbol}: {quote.error}")
+                quotes.append({"symbol": quote.symbol, "error": quote.error})
+                continue
+            
+            info = quote.info
+            current_price = info.get('currentPrice') or info.get('regularMarketPrice')
+            if not current_price:
+                quotes.append({"symbol": quote.symbol, "error": "Unable to fetch price"})
+                continue
+            quotes.append({
+                "symbol": quote.symbol,
+                "price": round(current_price, 2),
+                **_price_change(current_price, info.get('previousClose', 0)),
+            })
         
-        result += f"*Data as of {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*"
-        return result
+        fetched = [q["symbol"] for q in quotes if "error" not in q]
+        return {"quotes": quotes, "currency": "USD", "as_of": quote_as_of(fetched)}
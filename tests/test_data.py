@@ -0,0 +1,59 @@
+"""InMemoryRepository transaction indexes under concurrent reads and writes."""
+
+import random
+import threading
+from datetime import date, timedelta
+
+from mcp_server.data import InMemoryRepository
+
+START = date(2024, 1, 1)
+
+
+def _transaction(n: int, day: int) -> dict:
+    # The amount and description encode the day, so a row read from mismatched columns shows
+    return {
+        "transaction_id": f"T{n:07d}",
+        "account_id": "A001",
+        "date": (START + timedelta(days=day)).isoformat(),
+        "description": f"day {day}",
+        "amount": float(day),
+        "type": "debit",
+        "balance_after": None,
+    }
+
+
+def test_reads_see_consistent_rows_while_out_of_order_inserts_resort():
+    repository = InMemoryRepository()
+    for n in range(20_000):
+        repository.add_transaction("C001", _transaction(n, n % 700))
+    stop = threading.Event()
+    errors = []
+
+    first_day = (START - date(1970, 1, 1)).days
+
+    def read():
+        while not stop.is_set():
+            arrays = repository.get_transaction_arrays("C001")
+            rows = zip(arrays.days, arrays.amounts, arrays.descriptions)
+            if any(day - first_day != amount or arrays.vocabulary[code] != f"day {day - first_day}"
+                   for day, amount, code in rows):
+                errors.append("arrays")
+                return
+            for item in repository.get_transactions_page("C001", limit=50).items:
+                if item["description"] != f"day {int(item['amount'])}":
+                    errors.append(item)
+                    return
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    rng = random.Random(0)
+    for n in range(20_000, 20_300):
+        repository.add_transaction("C001", _transaction(n, rng.randrange(700)))  # out of order: re-sorts
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert not errors
+    arrays = repository.get_transaction_arrays("C001")
+    assert list(arrays.days) == sorted(arrays.days)
@@ -0,0 +1,203 @@
+"""
+ResilientChatModel against scripted fake models (mcp_client.fake_llm) with
+fixed latencies and failures: deadlines, failover, circuit breakers and
+hedging. Calls run on the real per-provider scheduler, offline.
+"""
+
+import time
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from mcp_client import llm_resilience
+from mcp_client.fake_llm import FakeProviderError
+from mcp_client.llm_config import get_llm
+from mcp_client.llm_resilience import (
+    CircuitBreaker, CircuitOpenError, LLMDeadlineError, ResiliencePolicy, ResilienceStats, ResilientChatModel,
+)
+
+MESSAGES = [SystemMessage("Decide the next action"), HumanMessage("What is my balance?")]
+CONFIG = {"metadata": {"langgraph_node": "agent"}}
+
+
+@pytest.fixture(autouse=True)
+def fresh_registries(monkeypatch):
+    """Breakers, latency windows and counters are process-wide; start each test without them."""
+    monkeypatch.setattr(llm_resilience, "_breakers", {})
+    monkeypatch.setattr(llm_resilience, "_latencies", {})
+    monkeypatch.setattr(llm_resilience, "_stats", ResilienceStats())
+
+
+def fake(name: str, latency: float = 0.0, failure_rate: float = 0.0):
+    """A scheduled fake model ("fake/<name>") with a fixed first-token latency."""
+    llm = get_llm(0, provider="fake", model=name)
+    llm.model.latency = latency
+    llm.model.latency_sigma = 0.0
+    llm.model.failure_rate = failure_rate
+    return llm
+
+
+def resilient(primary, fallback=None, **policy) -> ResilientChatModel:
+    policy = {"deadline": 2.0, "hedge": False, "breaker_failures": 1, "breaker_reset": 60.0, **policy}
+    return ResilientChatModel(primary=primary, fallback=fallback, policy=ResiliencePolicy(**policy))
+
+
+def invoke(llm: ResilientChatModel):
+    return asyncio.run(llm.ainvoke(MESSAGES, config=CONFIG))
+
+
+def breaker(name: str) -> CircuitBreaker:
+    return llm_resilience._breakers[f"fake/{name}"]
+
+
+def stats() -> dict:
+    return llm_resilience.resilience_stats()
+
+
+def test_deadline_cancels_slow_call():
+    llm = resilient(fake("slow", latency=1.0), deadline=0.2, breaker_failures=2)
+
+    started = time.perf_counter()
+    with pytest.raises(LLMDeadlineError):
+        invoke(llm)
+
+    assert time.perf_counter() - started < 0.6
+    assert stats()["deadline_exceeded"] == 1
+    assert breaker("slow").stats() == {"state": "closed", "consecutive_failures": 1, "opened": 0, "rejected": 0}
+
+
+def test_deadline_covers_hedge():
+    llm = resilient(fake("slow-a", latency=1.0), fake("slow-b", latency=1.0), deadline=0.3,
+                    hedge=True, hedge_initial_delay=0.1)
+
+    with pytest.raises(LLMDeadlineError):
+        invoke(llm)
+
+    assert stats()["hedged"] == 1
+    assert breaker("slow-a").state == breaker("slow-b").state == CircuitBreaker.OPEN
+
+
+def test_failover_to_fallback_then_circuit_opens():
+    llm = resilient(fake("down", failure_rate=1.0), fake("backup"))
+
+    assert invoke(llm).content
+    assert stats()["failovers"] == 1
+    assert breaker("down").state == CircuitBreaker.OPEN
+    assert breaker("backup").state == CircuitBreaker.CLOSED
+
+    # The open circuit is skipped without calling the primary
+    assert invoke(llm).content
+    assert stats()["failovers"] == 2
+    assert breaker("down").stats() == {"state": "open", "consecutive_failures": 1, "opened": 1, "rejected": 1}
+
+
+def test_error_without_fallback_is_raised():
+    llm = resilient(fake("alone-down", failure_rate=1.0))
+
+    with pytest.raises(FakeProviderError):
+        invoke(llm)
+    with pytest.raises(CircuitOpenError):
+        invoke(llm)
+
+    assert stats()["circuit_rejected"] == 1
+
+
+def test_half_open_trial_closes_circuit():
+    primary = fake("flaky", latency=0.2, failure_rate=1.0)
+    llm = resilient(primary, fake("standby"), breaker_reset=0.1)
+    invoke(llm)
+    assert breaker("flaky").state == CircuitBreaker.OPEN
+
+    time.sleep(0.15)
+    primary.model.failure_rate = 0.0
+
+    async def concurrent():
+        trial = asyncio.ensure_future(llm.ainvoke(MESSAGES, config=CONFIG))
+        await asyncio.sleep(0.05)
+        # Only one trial call goes to the half-open primary; this one fails over
+        assert breaker("flaky").state == CircuitBreaker.HALF_OPEN
+        started = time.perf_counter()
+        await llm.ainvoke(MESSAGES, config=CONFIG)
+        other = time.perf_counter() - started
+        await trial
+        return other
+
+    assert asyncio.run(concurrent()) < 0.1  # answered by the standby, not the 0.2 s primary
+    assert breaker("flaky").stats() == {"state": "closed", "consecutive_failures": 0, "opened": 1, "rejected": 1}
+    assert stats()["failovers"] == 2
+
+
+def test_half_open_trial_failure_reopens_circuit():
+    llm = resilient(fake("still-down", failure_rate=1.0), fake("spare"), breaker_failures=3, breaker_reset=0.1)
+    for _ in range(3):
+        invoke(llm)
+    assert breaker("still-down").state == CircuitBreaker.OPEN
+
+    time.sleep(0.15)
+    invoke(llm)
+
+    # One failed trial is enough to re-open, without waiting for `breaker_failures` in a row
+    assert breaker("still-down").stats() == {"state": "open", "consecutive_failures": 4, "opened": 2, "rejected": 0}
+    assert breaker("spare").state == CircuitBreaker.CLOSED
+
+
+def test_hedge_won_by_fallback():
+    llm = resilient(fake("tail", latency=0.5), fake("quick", latency=0.05), hedge=True, hedge_initial_delay=0.1)
+
+    started = time.perf_counter()
+    invoke(llm)
+
+    assert time.perf_counter() - started < 0.4
+    assert stats()["hedged"] == 1
+    assert stats()["hedges_won_by_fallback"] == 1
+    # The cancelled primary is neither a success nor a failure
+    assert breaker("tail").stats() == {"state": "closed", "consecutive_failures": 0, "opened": 0, "rejected": 0}
+    assert breaker("quick").state == CircuitBreaker.CLOSED
+
+
+def test_hedge_won_by_primary():
+    llm = resilient(fake("steady", latency=0.15), fake("laggard", latency=0.5), hedge=True, hedge_initial_delay=0.1)
+
+    started = time.perf_counter()
+    invoke(llm)
+
+    assert time.perf_counter() - started < 0.4
+    assert stats()["hedged"] == 1
+    assert stats()["hedges_won_by_fallback"] == 0
+    assert breaker("steady").state == breaker("laggard").state == CircuitBreaker.CLOSED
+
+
+def test_no_hedge_before_delay():
+    llm = resilient(fake("prompt", latency=0.05), fake("unused", latency=0.05), hedge=True, hedge_initial_delay=0.3)
+
+    invoke(llm)
+
+    assert stats()["hedged"] == 0
+    assert "fake/unused" not in llm_resilience._breakers
+
+
+def test_hedge_delay_follows_primary_latency():
+    llm = resilient(fake("measured", latency=0.05), fake("other"), hedge=True, hedge_initial_delay=1.0,
+                    hedge_min_samples=5, hedge_min_delay=0.01)
+    assert llm.hedge_delay("fake/measured", "invoke") == 1.0
+
+    for _ in range(5):
+        invoke(llm)
+
+    assert 0.05 <= llm.hedge_delay("fake/measured", "invoke") < 0.1
+    assert stats()["hedged"] == 0
+
+
+def test_stream_hedged_on_first_chunk():
+    llm = resilient(fake("slow-stream", latency=0.5), fake("fast-stream", latency=0.05), hedge=True,
+                    hedge_initial_delay=0.1)
+
+    async def stream():
+        return [chunk.content async for chunk in llm.astream(MESSAGES, config=CONFIG)]
+
+    started = time.perf_counter()
+    assert "".join(asyncio.run(stream()))
+    assert time.perf_counter() - started < 0.4
+    assert stats()["hedges_won_by_fallback"] == 1
+    assert breaker("slow-stream").state == CircuitBreaker.CLOSED
@@ -0,0 +1,54 @@
+"""LLMScheduler queueing: slots, the tokens-per-minute bucket and the queue deadline."""
+
+import time
+import asyncio
+
+import pytest
+
+from mcp_client.llm_config import LLMOverloadedError, LLMScheduler
+
+
+def test_waits_for_token_refill_with_nothing_in_flight():
+    # 6000 TPM refills 100 tokens a second
+    scheduler = LLMScheduler("test", concurrency=4, tpm=6000, queue_deadline=5.0)
+    scheduler._tokens = 0.0
+
+    async def call():
+        started = time.perf_counter()
+        reserved = await scheduler.acquire("agent", None, 100)
+        waited = time.perf_counter() - started
+        scheduler.release(reserved)
+        return waited
+
+    waited = asyncio.run(call())
+    assert 0.9 <= waited < 1.5
+    assert scheduler.queue_timeouts == 0
+
+
+def test_waits_for_slot():
+    scheduler = LLMScheduler("test", concurrency=1, queue_deadline=5.0)
+
+    async def call(hold: float):
+        await scheduler.acquire("agent", None, 0)
+        await asyncio.sleep(hold)
+        scheduler.release(0)
+        return time.perf_counter()
+
+    async def both():
+        started = time.perf_counter()
+        first, second = await asyncio.gather(call(0.2), call(0.0))
+        return first - started, second - started
+
+    first, second = asyncio.run(both())
+    assert second >= first >= 0.2
+    assert scheduler.queued == 1
+
+
+def test_queue_deadline():
+    scheduler = LLMScheduler("test", concurrency=4, tpm=600, queue_deadline=0.2)
+    scheduler._tokens = 0.0
+
+    with pytest.raises(LLMOverloadedError):
+        asyncio.run(scheduler.acquire("agent", None, 500))  # 50 s of refill
+    assert scheduler.queue_timeouts == 1
+    assert scheduler.waiting == 0
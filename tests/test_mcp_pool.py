@@ -0,0 +1,53 @@
+"""MCPSessionPool against the MCP server, served in-process over SSE."""
+
+import time
+import asyncio
+
+import pytest
+
+from benchmarks.bench_chat_load import _free_port, _serve
+from mcp_client.mcp_utils import MCPSessionPool
+from mcp_server.main import mcp
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setenv("QUOTE_PREFETCH_ENABLED", "false")
+
+
+async def _with_pool(size: int, test):
+    port = _free_port()
+    server, task = await _serve(mcp.http_app(transport="sse"), port)
+    pool = MCPSessionPool(f"http://127.0.0.1:{port}/sse", size=size, acquire_timeout=1.0)
+    try:
+        await pool.start()
+        return await test(pool)
+    finally:
+        await pool.close()
+        server.should_exit = True
+        await task
+
+
+def test_requests_share_sessions():
+    """More concurrent requests than sessions, each holding its session (as for LLM time) and calling tools."""
+
+    async def request(pool: MCPSessionPool):
+        async with pool.session() as session:
+            await asyncio.sleep(0.5)
+            result = await session.call_tool("get_account_types", arguments={"customer_id": "C001"})
+            assert not result.isError
+            return result.structuredContent["account_types"]
+
+    async def test(pool: MCPSessionPool):
+        started = time.perf_counter()
+        results = await asyncio.gather(*(request(pool) for _ in range(8)))
+        return time.perf_counter() - started, results, pool.metrics()
+
+    elapsed, results, metrics = asyncio.run(_with_pool(2, test))
+
+    assert all(results)
+    assert elapsed < 1.5  # not 8 x 0.5 s one after the other, nor a 1 s acquire timeout
+    assert metrics["connected"] == 2
+    assert metrics["acquire_timeouts"] == 0
+    assert metrics["checkouts"] == 8
+    assert metrics["in_use"] == 0
@@ -0,0 +1,82 @@
+"""QuoteCache against scripted upstream sources."""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from mcp_server.quotes import FakeQuoteSource, QuoteCache, get_quote, get_quote_cache, quote_as_of, set_quote_source
+
+
+class HangingSource:
+    """Answers like FakeQuoteSource until `hang` is set, then blocks until `release` is."""
+
+    def __init__(self):
+        self.fake = FakeQuoteSource()
+        self.hang = threading.Event()
+        self.release = threading.Event()
+
+    def fetch(self, symbol):
+        if self.hang.is_set():
+            self.release.wait(10)
+        return self.fake.fetch(symbol)
+
+
+@pytest.fixture
+def source():
+    source = HangingSource()
+    yield source
+    source.release.set()
+
+
+def test_join_of_hung_fetch_times_out(source):
+    cache = QuoteCache(source, fetch_timeout=0.2)
+    source.hang.set()
+    with ThreadPoolExecutor(2) as pool:
+        owner = pool.submit(cache.get, "AAPL")
+        time.sleep(0.05)
+        started = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            cache.get("AAPL")
+        assert time.perf_counter() - started < 0.5
+        source.release.set()
+        assert owner.result()["symbol"] == "AAPL"
+    assert cache.stats()["join_timeouts"] == 1
+
+
+def test_join_of_hung_fetch_serves_last_quote(source):
+    cache = QuoteCache(source, ttl=0.05, stale_ttl=0.0, fetch_timeout=0.2)
+    first = cache.get("MSFT")
+    time.sleep(0.1)  # past TTL and stale window: the next get refetches
+    source.hang.set()
+    with ThreadPoolExecutor(2) as pool:
+        pool.submit(cache.get, "MSFT")
+        time.sleep(0.05)
+        assert cache.get("MSFT") == first
+        source.release.set()
+    assert cache.stats()["join_timeouts"] == 1
+
+
+def test_batch_does_not_wait_on_hung_fetch(source):
+    cache = QuoteCache(source, fetch_timeout=0.2)
+    source.hang.set()
+    with ThreadPoolExecutor(1) as pool:
+        pool.submit(cache.get, "GOOG")
+        time.sleep(0.05)
+        results = cache.get_many(["GOOG"], deadline=5.0)
+        source.release.set()
+    assert results[0].error and "Timed out" in results[0].error
+
+
+def test_as_of_is_fetch_time_of_cached_quote():
+    set_quote_source(FakeQuoteSource())
+    get_quote("AAPL")
+    get_quote("MSFT")
+    get_quote_cache()._entries["MSFT"].fetched_at -= 120  # served stale, fetched two minutes ago
+
+    now = datetime.now()
+    assert abs(datetime.fromisoformat(quote_as_of(["AAPL"])) - now) < timedelta(seconds=2)
+    as_of = datetime.fromisoformat(quote_as_of(["AAPL", "MSFT"]))
+    assert abs(as_of - (now - timedelta(seconds=120))) < timedelta(seconds=2)
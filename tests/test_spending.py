@@ -0,0 +1,67 @@
+"""Spending analytics over the in-memory repository."""
+
+import random
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from mcp_server.data import InMemoryRepository, get_repository, set_repository
+from mcp_server.tools.spending import _get_spending_summary
+
+START = date(2024, 1, 1)
+# Each description has its own amount, so rows mixed up between columns show in the totals
+KINDS = [("Grocery store", -10.0), ("Coffee shop", -3.0), ("Salary payroll", 1000.0)]
+
+
+def _transaction(n: int, day: int) -> dict:
+    description, amount = KINDS[n % len(KINDS)]
+    return {
+        "transaction_id": f"T{n:07d}",
+        "account_id": "A001",
+        "date": (START + timedelta(days=day)).isoformat(),
+        "description": description,
+        "amount": amount,
+        "type": "credit" if amount > 0 else "debit",
+        "balance_after": None,
+    }
+
+
+@pytest.fixture
+def repository():
+    previous = get_repository()
+    repository = InMemoryRepository()
+    set_repository(repository)
+    yield repository
+    set_repository(previous)
+
+
+def test_summary_while_transactions_are_added(repository):
+    """The tool summarizes on executor threads while the event loop adds (and re-sorts) transactions."""
+    for n in range(30_000):
+        repository.add_transaction("C001", _transaction(n, n % 900))
+    stop = threading.Event()
+    errors = []
+
+    def summarize():
+        while not stop.is_set():
+            for category, amount in (("groceries", 10.0), ("dining", 3.0)):
+                summary = _get_spending_summary("C001", category=category)
+                if summary["spent"] != summary["transactions"] * amount or summary["received"]:
+                    errors.append(summary)
+                    return
+
+    readers = [threading.Thread(target=summarize) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    rng = random.Random(0)
+    for n in range(30_000, 30_300):
+        repository.add_transaction("C001", _transaction(n, rng.randrange(900)))
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert not errors
+    summary = _get_spending_summary("C001")
+    assert summary["transactions"] == 30_300
+    assert summary["received"] == 10_100 * 1000.0
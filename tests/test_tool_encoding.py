@@ -0,0 +1,46 @@
+"""
+Structured output of the registered MCP tools, called in-process through a
+FastMCP client, and its encodings (mcp_client.tool_encoding).
+"""
+
+import asyncio
+
+import pytest
+from fastmcp import Client
+
+from mcp_client.tool_encoding import ENCODINGS, encode, encode_result, structured_payload, text_content
+from mcp_server.main import mcp
+from mcp_server.quotes import FakeQuoteSource, set_quote_source
+
+ARGUMENTS = {"customer_id": "C001", "symbol": "AAPL", "symbols": "AAPL,MSFT"}
+
+
+@pytest.fixture(scope="module")
+def results():
+    """One result per registered tool, with required arguments filled from ARGUMENTS."""
+    set_quote_source(FakeQuoteSource())
+
+    async def call_all():
+        async with Client(mcp) as client:
+            return {
+                tool.name: await client.call_tool_mcp(
+                    tool.name, {name: ARGUMENTS[name] for name in tool.inputSchema.get("required", [])}
+                )
+                for tool in await client.list_tools()
+            }
+
+    return asyncio.run(call_all())
+
+
+def test_every_tool_returns_structured_content(results):
+    assert len(results) >= 11
+    for name, result in results.items():
+        assert not result.isError, f"{name}: {text_content(result)}"
+        assert structured_payload(result) is not None, name
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_encodings_use_structured_content(results, encoding):
+    result = results["get_account_types"]
+    # Not the text fallback: the encodings only run on structured content
+    assert encode_result(result, encoding) == encode(result.structuredContent, encoding)